@@ -0,0 +1,259 @@
+"""
+Aggregation queries over a dataset's columnar copy.
+
+A query filters the rows, groups them by zero or more label columns and
+computes metrics for numeric columns. Moments come from pyarrow's hash
+aggregations and percentiles from one NumPy sort per column, so no row is
+handled in Python. Results are cached per dataset and query signature;
+datasets never change after ingest, so entries need no invalidation.
+"""
+import hashlib
+import json
+import re
+
+import numpy as np
+import pyarrow.compute as pc
+
+from .rows import RowQuery, filter_expression
+from .utils import NUMERIC_COLUMNS
+
+
+GROUP_COLUMNS = ['Type', 'Equipment Name']
+MOMENT_METRICS = ['count', 'sum', 'mean', 'min', 'max', 'std']
+DEFAULT_METRICS = ['count', 'mean', 'min', 'max', 'std']
+MAX_GROUPS = 1000
+
+PERCENTILE_METRIC = re.compile(r'^p(\d{1,2}(\.\d+)?|100)$')
+
+# pyarrow aggregation for each moment metric; std is the sample std (ddof=1)
+# like the dataset summary
+ARROW_AGGREGATIONS = {
+    'count': ('count', None),
+    'sum': ('sum', None),
+    'mean': ('mean', None),
+    'min': ('min', None),
+    'max': ('max', None),
+    'std': ('stddev', pc.VarianceOptions(ddof=1)),
+}
+
+
+class AggregateQuery:
+    """
+    Parsed body of an aggregate request.
+    """
+    
+    def __init__(self, group_by=None, metrics=None, columns=None, types=None, ranges=None):
+        self.group_by = group_by or []
+        self.metrics = metrics or list(DEFAULT_METRICS)
+        self.columns = columns or list(NUMERIC_COLUMNS)
+        self.types = types or []
+        self.ranges = ranges or {}
+    
+    def percentiles(self):
+        """Requested percentiles as (metric name, value in [0, 100]) pairs."""
+        return [(metric, float(metric[1:])) for metric in self.metrics
+                if PERCENTILE_METRIC.match(metric)]
+    
+    def row_query(self):
+        """The query's filters as a RowQuery."""
+        return RowQuery(types=self.types, ranges=self.ranges)
+    
+    def referenced_columns(self):
+        """Columns that must be read to answer the query."""
+        needed = set(self.group_by) | set(self.columns) | set(self.ranges)
+        if self.types:
+            needed.add('Type')
+        return [col for col in GROUP_COLUMNS + NUMERIC_COLUMNS if col in needed]
+    
+    def signature(self):
+        """A stable hash of the query, independent of parameter order."""
+        normalized = {
+            'group_by': self.group_by,
+            'metrics': sorted(self.metrics),
+            'columns': sorted(self.columns),
+            'types': sorted(self.types),
+            'ranges': self.ranges,
+        }
+        encoded = json.dumps(normalized, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(encoded.encode()).hexdigest()[:32]
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [part.strip() for part in value.split(',') if part.strip()]
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return None
+
+
+def _unique(values):
+    return list(dict.fromkeys(values))
+
+
+def parse_aggregate_query(data):
+    """
+    Parse a request body into an AggregateQuery.
+    
+    Supported fields:
+        group_by    label column(s) to group by: 'Type' and/or 'Equipment Name'
+        metrics     any of count, sum, mean, min, max, std, median and pNN
+                    (e.g. p90); defaults to count, mean, min, max, std
+        columns     numeric columns to aggregate (default: all)
+        filters     {"Type": [...], "<numeric column>": {"min": x, "max": y}}
+    
+    Lists may also be given as comma-separated strings.
+    
+    Returns: (query, error)
+    """
+    if not isinstance(data, dict):
+        return None, "Request body must be an object"
+    
+    fields = {}
+    for name in ('group_by', 'metrics', 'columns'):
+        values = _as_list(data.get(name))
+        if values is None or not all(isinstance(v, str) for v in values):
+            return None, f"'{name}' must be a list of strings"
+        fields[name] = _unique(values)
+    
+    unknown = [col for col in fields['group_by'] if col not in GROUP_COLUMNS]
+    if unknown:
+        return None, f"Cannot group by: {', '.join(unknown)}"
+    
+    metrics = ['p50' if metric == 'median' else metric for metric in fields['metrics']]
+    unknown = [m for m in metrics if m not in MOMENT_METRICS and not PERCENTILE_METRIC.match(m)]
+    if unknown:
+        return None, f"Unknown metrics: {', '.join(unknown)}"
+    
+    unknown = [col for col in fields['columns'] if col not in NUMERIC_COLUMNS]
+    if unknown:
+        return None, f"Cannot aggregate columns: {', '.join(unknown)}"
+    
+    filters = data.get('filters') or {}
+    if not isinstance(filters, dict):
+        return None, "'filters' must be an object"
+    
+    types = []
+    ranges = {}
+    for col, condition in filters.items():
+        if col == 'Type':
+            types = _as_list(condition)
+            if types is None:
+                return None, "'Type' filter must be a list of types"
+            types = [str(value) for value in types]
+        elif col in NUMERIC_COLUMNS:
+            if not isinstance(condition, dict) or set(condition) - {'min', 'max'}:
+                return None, f"'{col}' filter must be an object with 'min' and/or 'max'"
+            for bound, value in condition.items():
+                if isinstance(value, bool):
+                    return None, f"'{col}' {bound} must be a number"
+                try:
+                    ranges.setdefault(col, {})[bound] = float(value)
+                except (TypeError, ValueError):
+                    return None, f"'{col}' {bound} must be a number"
+        else:
+            return None, f"Cannot filter on unknown column '{col}'"
+    
+    query = AggregateQuery(
+        group_by=fields['group_by'],
+        metrics=_unique(metrics),
+        columns=[col for col in NUMERIC_COLUMNS if col in fields['columns']],
+        types=_unique(types),
+        ranges=ranges,
+    )
+    return query, None
+
+
+def _segment_percentiles(values, starts, counts, percentiles):
+    """
+    Linear-interpolated percentiles of consecutive segments of `values`,
+    each sorted with its `counts` valid values first. Returns a
+    (segments, percentiles) array with NaN for segments without values.
+    """
+    result = np.full((len(starts), len(percentiles)), np.nan)
+    filled = counts > 0
+    if not filled.any():
+        return result
+    starts, last = starts[filled], (counts[filled] - 1)
+    fractions = np.asarray(percentiles, dtype=np.float64) / 100
+    positions = fractions[None, :] * last[:, None]
+    lower = np.floor(positions).astype(np.intp)
+    upper = np.minimum(lower + 1, last[:, None])
+    low_values = values[starts[:, None] + lower]
+    high_values = values[starts[:, None] + upper]
+    result[filled] = low_values + (high_values - low_values) * (positions - lower)
+    return result
+
+
+def aggregate_table(table, query):
+    """
+    Run an AggregateQuery over a pyarrow Table.
+    Returns (body, error); groups are ordered by their keys, missing last.
+    """
+    expression = filter_expression(query.row_query())
+    if expression is not None:
+        table = table.filter(expression)
+    
+    if query.group_by:
+        # Sorting by the keys first lets every group be a contiguous segment,
+        # and a single-threaded group_by emits groups in that order
+        order = pc.sort_indices(
+            table, sort_keys=[(col, 'ascending') for col in query.group_by],
+            null_placement='at_end'
+        )
+        table = table.take(order)
+    
+    aggregations = [([], 'count_all')]
+    for col in query.columns:
+        for metric in query.metrics:
+            if metric in ARROW_AGGREGATIONS:
+                function, options = ARROW_AGGREGATIONS[metric]
+                aggregations.append((col, function, options))
+    grouped = table.group_by(query.group_by, use_threads=False).aggregate(aggregations)
+    
+    if query.group_by and grouped.num_rows > MAX_GROUPS:
+        return None, f"Query produces {grouped.num_rows} groups; at most {MAX_GROUPS} are allowed"
+    
+    sizes = grouped.column('count_all').to_numpy()
+    percentiles = query.percentiles()
+    percentile_values = {}
+    if percentiles:
+        segment_ids = np.repeat(np.arange(len(sizes)), sizes)
+        starts = np.cumsum(sizes) - sizes
+        for col in query.columns:
+            values = table.column(col).to_numpy(zero_copy_only=False).astype(np.float64)
+            # Sorts within each segment (ids are already ascending), NaN last
+            values = values[np.lexsort((values, segment_ids))]
+            counts = np.bincount(segment_ids, weights=~np.isnan(values),
+                                 minlength=len(sizes)).astype(np.int64)
+            percentile_values[col] = _segment_percentiles(
+                values, starts, counts, [q for _, q in percentiles]
+            )
+    
+    rows = grouped.to_pylist()
+    groups = []
+    for index, row in enumerate(rows):
+        statistics = {}
+        for col in query.columns:
+            stats = {}
+            for metric in query.metrics:
+                if metric in ARROW_AGGREGATIONS:
+                    stats[metric] = row[f'{col}_{ARROW_AGGREGATIONS[metric][0]}']
+            for position, (metric, _) in enumerate(percentiles):
+                value = percentile_values[col][index, position]
+                stats[metric] = float(value) if np.isfinite(value) else None
+            statistics[col] = stats
+        groups.append({
+            'key': {col: row[col] for col in query.group_by},
+            'count': row['count_all'],
+            'statistics': statistics,
+        })
+    
+    return {
+        'group_by': query.group_by,
+        'metrics': query.metrics,
+        'columns': query.columns,
+        'count': table.num_rows,
+        'groups': groups,
+    }, None
@@ -0,0 +1,131 @@
+"""
+Comparison of a user's datasets.
+
+Everything is computed from the stored summaries: per-parameter and
+per-type series across datasets, the change from each dataset to the next
+and a least-squares trend per upload. The combined statistics merge the
+stored sketches, so comparing N datasets costs O(N), not O(rows).
+"""
+import numpy as np
+
+from .sketches import merge_sketches
+from .utils import NUMERIC_COLUMNS, summary_from_sketch
+
+
+MAX_COMPARED_DATASETS = 50
+
+# Per-parameter statistics reported as series
+SERIES_STATISTICS = ('mean', 'std', 'min', 'max', 'p50')
+
+
+def parse_dataset_ids(value):
+    """
+    Parse a comma-separated list of dataset ids.
+    Returns: (ids, error)
+    """
+    ids = []
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            ids.append(int(part))
+        except ValueError:
+            return None, "'ids' must be a comma-separated list of dataset ids"
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > MAX_COMPARED_DATASETS:
+        return None, f"At most {MAX_COMPARED_DATASETS} datasets can be compared"
+    return ids, None
+
+
+def deltas(values):
+    """Change from each value to the next; None where either is missing."""
+    return [None] + [
+        b - a if a is not None and b is not None else None
+        for a, b in zip(values, values[1:])
+    ]
+
+
+def trend(values):
+    """
+    Least-squares trend of a series over upload order, ignoring missing
+    values. `slope` is the fitted change per upload.
+    """
+    points = [(x, v) for x, v in enumerate(values) if v is not None]
+    if len(points) < 2:
+        return {'slope': None, 'change': None, 'percent_change': None, 'direction': None}
+    
+    x, y = np.array(points, dtype=np.float64).T
+    x -= x.mean()
+    # Exactly zero for a constant series
+    slope = float(np.dot(x, y - y.mean()) / np.dot(x, x))
+    first, last = points[0][1], points[-1][1]
+    return {
+        'slope': slope,
+        'change': last - first,
+        'percent_change': (last - first) / abs(first) * 100 if first else None,
+        'direction': 'increasing' if slope > 0 else 'decreasing' if slope < 0 else 'flat',
+    }
+
+
+def _series(values):
+    return {'values': values, 'deltas': deltas(values), 'trend': trend(values)}
+
+
+def compare_summaries(datasets):
+    """
+    Build the comparison body for datasets ordered oldest first.
+    Only each dataset's id, filename, upload_timestamp, summary_json and
+    sketch_json are read.
+    """
+    summaries = [dataset.summary_json for dataset in datasets]
+    
+    parameters = {}
+    for col in NUMERIC_COLUMNS:
+        stats = [(summary.get('statistics') or {}).get(col) or {} for summary in summaries]
+        parameters[col] = {
+            name: _series([s.get(name) for s in stats])
+            for name in SERIES_STATISTICS
+        }
+    
+    # Types seen in any dataset, most common overall first
+    totals = {}
+    for summary in summaries:
+        for label, count in summary.get('type_distribution', {}).items():
+            totals[label] = totals.get(label, 0) + count
+    
+    types = {}
+    for label in sorted(totals, key=totals.get, reverse=True):
+        type_stats = [(summary.get('type_statistics') or {}).get(label) for summary in summaries]
+        types[label] = {
+            'count': _series([summary.get('type_distribution', {}).get(label, 0)
+                              for summary in summaries]),
+            'parameters': {
+                col: {
+                    'mean': _series([s[col]['mean'] if s else None for s in type_stats]),
+                }
+                for col in NUMERIC_COLUMNS
+            },
+        }
+    
+    combined = None
+    if datasets and all(dataset.sketch_json for dataset in datasets):
+        sketches = [dataset.sketch_json for dataset in datasets]
+        combined = summary_from_sketch(merge_sketches(*sketches))
+        del combined['sketch']
+    
+    return {
+        'datasets': [
+            {
+                'id': dataset.id,
+                'filename': dataset.filename,
+                'timestamp': dataset.upload_timestamp.isoformat(),
+                'total_count': summary['total_count'],
+            }
+            for dataset, summary in zip(datasets, summaries)
+        ],
+        'total_count': _series([summary['total_count'] for summary in summaries]),
+        'parameters': parameters,
+        'types': types,
+        'combined': combined,
+    }
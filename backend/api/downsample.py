@@ -0,0 +1,143 @@
+"""
+Downsampling of the numeric columns for plotting.
+
+Each column is treated as a series over row index and reduced to at most
+the requested number of points, either with Largest-Triangle-Three-Buckets
+(keeps the visual shape of the line) or min/max bucketing (keeps every
+extreme). Missing values are skipped, so points keep their original row
+index as x. Results are cached per dataset, method, resolution and
+columns; datasets never change after ingest, so entries need no
+invalidation.
+"""
+import numpy as np
+
+from .utils import NUMERIC_COLUMNS
+
+
+DEFAULT_POINTS = 1000
+MIN_POINTS = 3
+MAX_POINTS = 10000
+METHODS = ('lttb', 'minmax')
+
+
+def lttb(y, points):
+    """
+    Select `points` indices of `y` (plotted against its index) with
+    Largest-Triangle-Three-Buckets. The first and last points are kept and
+    each bucket in between contributes the point forming the largest
+    triangle with the previous selection and the next bucket's centroid.
+    """
+    n = len(y)
+    if points >= n:
+        return np.arange(n)
+    
+    # Interior buckets split indices 1..n-2 as evenly as possible
+    edges = np.linspace(1, n - 1, points - 1).astype(np.intp)
+    sizes = np.diff(edges)
+    x_means = (edges[:-1] + edges[1:] - 1) / 2
+    y_means = np.add.reduceat(y[:n - 1], edges[:-1]) / sizes
+    # The last bucket looks ahead to the final point
+    next_x = np.r_[x_means[1:], n - 1]
+    next_y = np.r_[y_means[1:], y[-1]]
+    
+    selected = np.empty(points, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(points - 2):
+        start, end = edges[i], edges[i + 1]
+        candidates = np.arange(start, end)
+        # Twice the triangle area; the constant factor does not change the argmax
+        area = np.abs(
+            (previous - next_x[i]) * (y[start:end] - y[previous])
+            - (previous - candidates) * (next_y[i] - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+def minmax_buckets(y, points):
+    """
+    Select up to `points` indices of `y`: the minimum and maximum of each of
+    points // 2 equal-width buckets, in index order.
+    """
+    n = len(y)
+    if points >= n:
+        return np.arange(n)
+    
+    buckets = max(points // 2, 1)
+    size = -(-n // buckets)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(buckets, size)
+    # Padding never wins: it is +inf for the minimum and -inf for the maximum
+    low = np.argmin(np.where(np.isnan(padded), np.inf, padded), axis=1)
+    high = np.argmax(np.where(np.isnan(padded), -np.inf, padded), axis=1)
+    
+    offsets = np.arange(buckets) * size
+    selected = np.unique(np.r_[offsets + low, offsets + high])
+    return selected[selected < n]
+
+
+def downsample_columns(table, method=METHODS[0], points=DEFAULT_POINTS, columns=None):
+    """
+    Downsample numeric columns of a pyarrow Table.
+    Returns {'total_points': rows, 'columns': {col: {'x': [...], 'y': [...]}}}.
+    """
+    select = lttb if method == 'lttb' else minmax_buckets
+    series = {}
+    for col in columns or NUMERIC_COLUMNS:
+        values = table.column(col).to_numpy(zero_copy_only=False).astype(np.float64)
+        index = np.flatnonzero(~np.isnan(values))
+        values = values[index]
+        selected = select(values, points)
+        series[col] = {
+            'x': index[selected].tolist(),
+            'y': values[selected].tolist(),
+        }
+    return {'total_points': table.num_rows, 'columns': series}
+
+
+def _parse_int(params, name, default, minimum, maximum):
+    raw = params.get(name)
+    if raw in (None, ''):
+        return default, None
+    try:
+        value = int(raw)
+    except ValueError:
+        return None, f"'{name}' must be an integer"
+    if not minimum <= value <= maximum:
+        return None, f"'{name}' must be between {minimum} and {maximum}"
+    return value, None
+
+
+def parse_series_query(params):
+    """
+    Parse request query parameters for downsample_columns.
+    
+    Supported parameters:
+        points      maximum points per column (MIN_POINTS..MAX_POINTS)
+        method      lttb (default) or minmax
+        columns     comma-separated numeric columns (default: all)
+    
+    Returns: (options, error)
+    """
+    points, error = _parse_int(params, 'points', DEFAULT_POINTS, MIN_POINTS, MAX_POINTS)
+    if error:
+        return None, error
+    
+    method = params.get('method') or METHODS[0]
+    if method not in METHODS:
+        return None, f"'method' must be one of: {', '.join(METHODS)}"
+    
+    columns = [part.strip() for part in params.get('columns', '').split(',') if part.strip()]
+    unknown = [col for col in columns if col not in NUMERIC_COLUMNS]
+    if unknown:
+        return None, f"Unknown columns: {', '.join(unknown)}"
+    
+    options = {
+        'method': method,
+        'points': points,
+        'columns': [col for col in NUMERIC_COLUMNS if col in columns] or list(NUMERIC_COLUMNS),
+    }
+    return options, None
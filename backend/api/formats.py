@@ -0,0 +1,78 @@
+"""
+Response formats for endpoints that return rows.
+
+The rows endpoint and the upload response negotiate the shape of their rows
+from the Accept header, or the `format` query parameter:
+
+    application/json                          list of records (default)
+    application/vnd.equipment.columnar+json   one array per column (format=columnar)
+    application/vnd.apache.arrow.stream       Arrow IPC stream (format=arrow)
+
+Records repeat every column name in every row; the columnar shape names
+each column once, and the Arrow stream sends the page's buffers as they
+are, so the client can use them without parsing text. In the Arrow format
+the other response fields travel as JSON in the schema metadata under
+ARROW_METADATA_KEY. Error responses are always JSON.
+"""
+import json
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+
+
+COLUMNAR_MEDIA_TYPE = 'application/vnd.equipment.columnar+json'
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+ARROW_METADATA_KEY = b'response'
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    """JSON renderer selected for the columnar shape; views reshape the rows."""
+    media_type = COLUMNAR_MEDIA_TYPE
+    format = 'columnar'
+
+
+class ArrowStreamRenderer(BaseRenderer):
+    """
+    Render a pyarrow Table as an Arrow IPC stream. Anything else, such as
+    an error body, is rendered as plain JSON.
+    """
+    media_type = ARROW_MEDIA_TYPE
+    format = 'arrow'
+    charset = None
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, pa.Table):
+            sink = pa.BufferOutputStream()
+            with ipc.new_stream(sink, data.schema) as writer:
+                writer.write_table(data)
+            return sink.getvalue().to_pybytes()
+        
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = 'application/json'
+        return JSONRenderer().render(data, renderer_context=renderer_context)
+
+
+# Renderers for views that return rows; the defaults keep the browsable API
+ROW_RENDERERS = list(api_settings.DEFAULT_RENDERER_CLASSES) + [
+    ColumnarJSONRenderer, ArrowStreamRenderer
+]
+
+
+def format_rows(request, body, key, table):
+    """
+    Return response data for `body` with the rows of the pyarrow Table
+    `table` under `key`, in the format negotiated for `request`.
+    """
+    renderer_format = getattr(request.accepted_renderer, 'format', None)
+    if renderer_format == ArrowStreamRenderer.format:
+        metadata = json.dumps(body, separators=(',', ':'), default=str)
+        return table.replace_schema_metadata({ARROW_METADATA_KEY: metadata.encode()})
+    
+    if renderer_format == ColumnarJSONRenderer.format:
+        rows = table.to_pydict()
+    else:
+        rows = table.to_pylist()
+    return {**body, key: rows}
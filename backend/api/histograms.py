@@ -0,0 +1,157 @@
+"""
+Binned distributions of the numeric columns.
+
+Histograms are computed once at ingest from the dataset's columnar copy and
+stored in Dataset.histograms_json, so serving a distribution costs a few KB
+whatever the number of rows. Each column gets a fixed-width histogram over
+its range and a quantile histogram whose bins hold roughly equal counts.
+The same pair is stored per equipment type; per-type fixed bins share the
+column's overall edges so types can be compared bin by bin.
+"""
+import numpy as np
+import pyarrow.compute as pc
+
+from .utils import NUMERIC_COLUMNS
+
+
+FIXED_BINS = 20
+QUANTILE_BINS = 10
+HISTOGRAM_KINDS = ('fixed', 'quantile')
+HISTOGRAM_COLUMNS = ['Type'] + NUMERIC_COLUMNS
+
+
+def _histogram(values, edges):
+    if edges is None:
+        return {'edges': [], 'counts': []}
+    counts, _ = np.histogram(values, bins=edges)
+    return {'edges': [float(e) for e in edges], 'counts': [int(c) for c in counts]}
+
+
+def fixed_edges(sorted_values, bins=FIXED_BINS):
+    """Equal-width bin edges over the range of sorted, NaN-free values."""
+    if not len(sorted_values):
+        return None
+    low, high = sorted_values[0], sorted_values[-1]
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    return np.linspace(low, high, bins + 1)
+
+
+def quantile_edges(sorted_values, bins=QUANTILE_BINS):
+    """
+    Bin edges at evenly spaced quantiles of sorted, NaN-free values.
+    Repeated values can merge edges, leaving fewer bins.
+    """
+    if not len(sorted_values):
+        return None
+    positions = np.linspace(0, len(sorted_values) - 1, bins + 1)
+    lower = np.floor(positions).astype(np.intp)
+    upper = np.minimum(lower + 1, len(sorted_values) - 1)
+    edges = sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (positions - lower)
+    edges = np.unique(edges)
+    if len(edges) == 1:
+        edges = np.array([edges[0] - 0.5, edges[0] + 0.5])
+    return edges
+
+
+def _column_histograms(sorted_values, edges=None):
+    if edges is None:
+        edges = fixed_edges(sorted_values)
+    return {
+        'count': int(len(sorted_values)),
+        'fixed': _histogram(sorted_values, edges),
+        'quantile': _histogram(sorted_values, quantile_edges(sorted_values)),
+    }
+
+
+def compute_histograms(table):
+    """
+    Compute histograms from a pyarrow Table with the Type column and the
+    numeric columns. Rows without a type only count towards the overall
+    histograms.
+    """
+    types = pc.dictionary_encode(table.column('Type')).combine_chunks()
+    type_labels = types.dictionary.to_pylist()
+    type_codes = types.indices.fill_null(-1).to_numpy(zero_copy_only=False)
+    
+    # One stable sort by type makes each type a contiguous segment
+    order = np.argsort(type_codes, kind='stable')
+    type_counts = np.bincount(type_codes[type_codes >= 0], minlength=len(type_labels))
+    type_starts = np.searchsorted(type_codes[order], np.arange(len(type_labels)))
+    
+    histograms = {
+        'fixed_bins': FIXED_BINS,
+        'quantile_bins': QUANTILE_BINS,
+        'columns': {},
+        'types': {str(label): {} for label in type_labels},
+    }
+    for col in NUMERIC_COLUMNS:
+        values = table.column(col).to_numpy(zero_copy_only=False).astype(np.float64)
+        overall = np.sort(values[~np.isnan(values)])
+        histograms['columns'][col] = _column_histograms(overall)
+        edges = fixed_edges(overall)
+        
+        by_type = values[order]
+        for k, label in enumerate(type_labels):
+            segment = by_type[type_starts[k]:type_starts[k] + type_counts[k]]
+            segment = np.sort(segment[~np.isnan(segment)])
+            histograms['types'][str(label)][col] = _column_histograms(segment, edges)
+    
+    return histograms
+
+
+def _split(value):
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+
+def parse_histogram_query(params):
+    """
+    Parse request query parameters into select_histograms arguments.
+    
+    Supported parameters (all comma-separated, default all):
+        columns     numeric columns
+        type        equipment types
+        kind        fixed and/or quantile
+    
+    Returns: (selection, error)
+    """
+    columns = _split(params.get('columns', ''))
+    unknown = [col for col in columns if col not in NUMERIC_COLUMNS]
+    if unknown:
+        return None, f"Unknown columns: {', '.join(unknown)}"
+    
+    kinds = _split(params.get('kind', ''))
+    unknown = [kind for kind in kinds if kind not in HISTOGRAM_KINDS]
+    if unknown:
+        return None, f"Unknown histogram kinds: {', '.join(unknown)}"
+    
+    selection = {
+        'columns': columns or None,
+        'types': _split(params.get('type', '')) or None,
+        'kinds': kinds or None,
+    }
+    return selection, None
+
+
+def select_histograms(histograms, columns=None, types=None, kinds=None):
+    """Return a copy of stored histograms restricted to the given columns, types and kinds."""
+    columns = columns or NUMERIC_COLUMNS
+    kinds = kinds or HISTOGRAM_KINDS
+    
+    def pick(column_histograms):
+        return {
+            col: {key: value for key, value in column_histograms[col].items()
+                  if key == 'count' or key in kinds}
+            for col in columns if col in column_histograms
+        }
+    
+    return {
+        'fixed_bins': histograms['fixed_bins'],
+        'quantile_bins': histograms['quantile_bins'],
+        'columns': pick(histograms['columns']),
+        'types': {
+            label: pick(type_histograms)
+            for label, type_histograms in histograms['types'].items()
+            if types is None or label in types
+        },
+    }
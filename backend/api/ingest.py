@@ -0,0 +1,236 @@
+"""
+CSV ingestion pipeline shared by the upload view and background jobs.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from .models import Dataset
+from .histograms import HISTOGRAM_COLUMNS, compute_histograms
+from .parallel import process_csv_file_parallel
+from .records import schedule_equipment_records
+from .reports import schedule_report_render
+from .response_cache import invalidate_user_responses
+from .retention import apply_retention
+from .storage import ColumnarWriter, load_dataset_table, read_table
+from .uploads import hash_file
+from .utils import process_csv_file
+
+
+def ingest_csv(file, filename, user, chunksize=None, include_data=True,
+               stored_name=None, progress=None, path=None, content_hash=None):
+    """
+    Parse, validate and summarize a CSV file, write its columnar copy and
+    create the Dataset record.
+    
+    `file` is any readable binary file object. If the raw CSV is already in
+    storage, pass its name as `stored_name` so it is not saved again;
+    otherwise `file` must be a Django File and is saved as the CSV.
+    If the file is also on local disk, pass `path` so large files can be
+    parsed by a process pool (rows are then not returned).
+    `progress` is forwarded to process_csv_file, or to
+    process_csv_file_parallel, which also passes a `fraction` keyword.
+    
+    Content the same user already ingested (same SHA-256, `content_hash` if
+    the caller has it) is not parsed again: the new Dataset shares the
+    existing one's summary and files. Other users' files are never reused.
+    
+    Returns: (dataset, data, error)
+    """
+    content_hash = content_hash or hash_file(file)
+    dataset, data, error = build_dataset(
+        file, filename, user, content_hash,
+        original=find_duplicate(content_hash, user),
+        chunksize=chunksize,
+        include_data=include_data,
+        stored_name=stored_name,
+        progress=progress,
+        path=path
+    )
+    if error:
+        return None, None, error
+    
+    dataset.save()
+    finish_ingest(user, [dataset])
+    
+    return dataset, data, None
+
+
+def ingest_batch(files, user):
+    """
+    Ingest several uploaded CSV files concurrently.
+    
+    `files` is a list of (file, filename) pairs. Files are parsed on a pool
+    of BATCH_UPLOAD_WORKERS threads and the resulting datasets are inserted
+    with a single bulk_create. Rows are never returned.
+    
+    Returns: a list of (dataset, error) pairs in the order of `files`
+    """
+    hashes = [hash_file(file) for file, _ in files]
+    originals = find_duplicates(hashes, user)
+    
+    def build(index):
+        file, filename = files[index]
+        try:
+            dataset, _, error = build_dataset(
+                file, filename, user, hashes[index],
+                original=originals.get(hashes[index]),
+                chunksize=choose_chunksize(file.size),
+                include_data=False,
+                path=uploaded_file_path(file)
+            )
+        except Exception as e:
+            return None, f"Error processing CSV: {str(e)}"
+        return dataset, error
+    
+    workers = max(1, min(settings.BATCH_UPLOAD_WORKERS, len(files)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='batch') as pool:
+        results = list(pool.map(build, range(len(files))))
+    
+    datasets = [dataset for dataset, error in results if dataset is not None]
+    if datasets:
+        Dataset.objects.bulk_create(datasets)
+        finish_ingest(user, datasets)
+    
+    return results
+
+
+def build_dataset(file, filename, user, content_hash, original=None, chunksize=None,
+                  include_data=True, stored_name=None, progress=None, path=None):
+    """
+    Prepare an unsaved Dataset for a CSV file: parse and summarize it, write
+    its columnar copy, bin its histograms and store the raw CSV. Makes no
+    database queries, so it is safe to run in worker threads.
+    
+    If `original` is an existing dataset with the same content, its summary
+    and files are reused instead. Other arguments are as for ingest_csv.
+    
+    Returns: (dataset, data, error)
+    """
+    workers = parallel_workers(path)
+    
+    if original is not None:
+        if stored_name is not None and stored_name != original.csv_path.name:
+            default_storage.delete(stored_name)
+        dataset = Dataset(
+            filename=filename,
+            summary_json=original.summary_json,
+            sketch_json=original.sketch_json,
+            histograms_json=original.histograms_json,
+            csv_path=original.csv_path.name,
+            columnar_path=original.columnar_path.name,
+            content_hash=content_hash,
+            file_size=original.file_size,
+            user=user
+        )
+        
+        # Return rows in the same cases a fresh parse would
+        data = None
+        if include_data and chunksize is None and not workers:
+            data = load_dataset_table(dataset).to_pylist()
+        return dataset, data, None
+    
+    # The columnar copy is written from the same parse
+    columnar = ColumnarWriter(filename)
+    if workers:
+        data, summary, error = process_csv_file_parallel(
+            path, workers, sink=columnar, progress=progress
+        )
+    else:
+        data, summary, error = process_csv_file(
+            file, chunksize=chunksize, sink=columnar, include_data=include_data,
+            progress=progress
+        )
+    
+    if error:
+        columnar.discard()
+        return None, None, error
+    
+    # Histograms need each column's full range, so they are binned from the
+    # finished columnar copy rather than chunk by chunk
+    columnar_name = columnar.close()
+    histograms = compute_histograms(
+        read_table(default_storage.path(columnar_name), columns=HISTOGRAM_COLUMNS)
+    )
+    
+    dataset = Dataset(
+        filename=filename,
+        sketch_json=summary.pop('sketch'),
+        summary_json=summary,
+        histograms_json=histograms,
+        columnar_path=columnar_name,
+        content_hash=content_hash,
+        user=user
+    )
+    if stored_name is None:
+        # Reset file pointer so the whole upload is saved
+        file.seek(0)
+        dataset.csv_path.save(file.name, file, save=False)
+    else:
+        dataset.csv_path.name = stored_name
+    dataset.file_size = dataset.csv_path.size
+    
+    return dataset, data, None
+
+
+def finish_ingest(user, datasets):
+    """Housekeeping after new datasets for a user have been saved."""
+    invalidate_user_responses(user.id)
+    
+    # Expire old datasets, never the ones just uploaded
+    apply_retention(user, keep_ids=[dataset.id for dataset in datasets])
+    
+    for dataset in datasets:
+        schedule_equipment_records(dataset)
+        schedule_report_render(dataset)
+
+
+def find_duplicate(content_hash, user):
+    """
+    Return the user's latest Dataset with this content hash whose raw CSV is
+    still in storage, or None. Files are only shared within a user, as their
+    names come from the original upload.
+    """
+    original = Dataset.objects.filter(user=user, content_hash=content_hash).first()
+    if original is None or not default_storage.exists(original.csv_path.name):
+        return None
+    return original
+
+
+def find_duplicates(content_hashes, user):
+    """find_duplicate for several hashes in one query; returns {hash: dataset}."""
+    originals = {}
+    for dataset in Dataset.objects.filter(user=user, content_hash__in=set(content_hashes)):
+        # Datasets are newest first, so the first match per hash wins
+        if dataset.content_hash not in originals and default_storage.exists(dataset.csv_path.name):
+            originals[dataset.content_hash] = dataset
+    return originals
+
+
+def choose_chunksize(size):
+    """Return the chunk size for a file of `size` bytes, or None to read it whole."""
+    if size > settings.CSV_STREAMING_THRESHOLD:
+        return settings.CSV_CHUNK_SIZE
+    return None
+
+
+def parallel_workers(path):
+    """
+    Return the number of processes to parse the file at `path` with, or
+    None if it should be parsed serially.
+    """
+    workers = settings.CSV_PARSE_WORKERS
+    if path is None or workers < 2:
+        return None
+    if os.path.getsize(path) <= settings.CSV_PARALLEL_THRESHOLD:
+        return None
+    return workers
+
+
+def uploaded_file_path(file):
+    """Return the local path of an uploaded file if it was spooled to disk."""
+    if hasattr(file, 'temporary_file_path'):
+        return file.temporary_file_path()
+    return None
@@ -0,0 +1,152 @@
+"""
+Background ingestion jobs.
+
+Job state lives in the IngestionJob table, which doubles as the queue: the
+upload view saves the raw CSV to storage, records a queued job and hands its
+id to an in-process thread pool. Workers claim a job by atomically moving it
+from queued to running, so a job left queued by a restart can be picked up
+later by `manage.py run_ingestion_jobs` without running twice. A job left
+running by a worker that died stops updating its row; once it is older than
+INGEST_JOB_STALE_SECONDS the command moves it back to queued.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .ingest import choose_chunksize, ingest_csv
+from .models import IngestionJob
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the process-wide ingestion thread pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.INGEST_WORKERS,
+                thread_name_prefix='ingest'
+            )
+        return _executor
+
+
+def submit_ingestion_job(job):
+    """
+    Queue a job for processing.
+    With INGEST_JOBS_EAGER the job runs immediately in the calling thread.
+    """
+    if settings.INGEST_JOBS_EAGER:
+        run_ingestion_job(job.id)
+        return
+    
+    # Only hand the job to a worker once the row is visible to other connections
+    transaction.on_commit(lambda: get_executor().submit(_run_in_worker, job.id))
+
+
+def _run_in_worker(job_id):
+    """Worker thread entry point; owns its own database connection."""
+    close_old_connections()
+    try:
+        run_ingestion_job(job_id)
+    except Exception:
+        logger.exception('Ingestion job %s crashed', job_id)
+    finally:
+        close_old_connections()
+
+
+def run_ingestion_job(job_id):
+    """
+    Claim and process a queued job. Returns False if the job was not queued
+    (e.g. another worker already claimed it).
+    """
+    claimed = IngestionJob.objects.filter(
+        id=job_id, status=IngestionJob.STATUS_QUEUED
+    ).update(status=IngestionJob.STATUS_RUNNING, updated_at=timezone.now())
+    if not claimed:
+        return False
+    
+    job = IngestionJob.objects.select_related('user').get(id=job_id)
+    
+    try:
+        size = job.upload.size
+        with job.upload.open('rb') as f:
+            def report_progress(rows_processed, fraction=None):
+                # Parallel parsing reads by path and passes its own fraction
+                if fraction is None:
+                    fraction = min(f.tell() / size, 1.0) if size else 1.0
+                IngestionJob.objects.filter(id=job_id).update(
+                    progress=fraction,
+                    rows_processed=rows_processed,
+                    updated_at=timezone.now()
+                )
+            
+            # Jobs always stream: their rows are served by the rows endpoint
+            dataset, _, error = ingest_csv(
+                f, job.filename, job.user,
+                chunksize=choose_chunksize(size) or settings.CSV_CHUNK_SIZE,
+                include_data=False,
+                stored_name=job.upload.name,
+                progress=report_progress,
+                path=job.upload.path,
+                content_hash=job.content_hash
+            )
+    except Exception as e:
+        logger.exception('Ingestion job %s failed', job_id)
+        dataset, error = None, f'Error processing CSV: {str(e)}'
+    
+    if error:
+        job.upload.delete(save=False)
+        IngestionJob.objects.filter(id=job_id).update(
+            status=IngestionJob.STATUS_FAILED,
+            error=error,
+            updated_at=timezone.now()
+        )
+    else:
+        IngestionJob.objects.filter(id=job_id).update(
+            status=IngestionJob.STATUS_SUCCEEDED,
+            progress=1.0,
+            rows_processed=dataset.summary_json['total_count'],
+            dataset=dataset,
+            updated_at=timezone.now()
+        )
+    return True
+
+
+def requeue_stale_jobs(stale_seconds=None):
+    """
+    Move running jobs whose row has not been updated for `stale_seconds`
+    (default: INGEST_JOB_STALE_SECONDS) back to queued, so they can be
+    claimed again. Running jobs update their row as they report progress.
+    Returns the number of jobs requeued.
+    """
+    if stale_seconds is None:
+        stale_seconds = settings.INGEST_JOB_STALE_SECONDS
+    cutoff = timezone.now() - timedelta(seconds=stale_seconds)
+    return IngestionJob.objects.filter(
+        status=IngestionJob.STATUS_RUNNING, updated_at__lt=cutoff
+    ).update(status=IngestionJob.STATUS_QUEUED, updated_at=timezone.now())
+
+
+def job_status(job):
+    """Build the JSON body describing a job."""
+    return {
+        'job_id': job.id,
+        'status': job.status,
+        'filename': job.filename,
+        'progress': job.progress,
+        'rows_processed': job.rows_processed,
+        'dataset_id': job.dataset_id,
+        'error': job.error or None,
+        'created_at': job.created_at.isoformat(),
+        'updated_at': job.updated_at.isoformat(),
+    }
@@ -0,0 +1,53 @@
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from api.retention import apply_retention, expire_chunked_uploads, unreferenced_files
+
+
+class Command(BaseCommand):
+    """
+    Apply the retention policy to every user, drop abandoned chunked
+    uploads and delete files that no dataset, job or upload refers to any
+    more. Meant to run periodically, e.g.
+    from cron, so file removal stays off the upload path. Expired datasets'
+    cached responses are invalidated in RESPONSE_CACHE_ALIAS, which must be
+    a cache shared with the server processes.
+    """
+    help = 'Expire old datasets and delete unreferenced upload, columnar and report files'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-seconds', type=int, default=None,
+            help='Keep unreferenced files modified more recently than this '
+                 '(default: RETENTION_FILE_GRACE_SECONDS)'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='List the files that would be deleted without deleting anything'
+        )
+    
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        
+        expired = 0
+        abandoned = 0
+        if not dry_run:
+            # Age-based expiry also applies to users who stopped uploading
+            for user in User.objects.filter(dataset__isnull=False).distinct():
+                expired += len(apply_retention(user))
+            abandoned = expire_chunked_uploads()
+        
+        deleted = 0
+        for name in unreferenced_files(options['grace_seconds']):
+            if dry_run:
+                self.stdout.write(name)
+            else:
+                default_storage.delete(name)
+            deleted += 1
+        
+        action = 'would delete' if dry_run else 'deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'Expired {expired} dataset(s) and {abandoned} chunked upload(s); '
+            f'{action} {deleted} file(s)'
+        ))
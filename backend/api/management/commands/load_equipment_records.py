@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import Dataset
+from api.records import store_equipment_records
+
+
+class Command(BaseCommand):
+    """
+    Fill the EquipmentRecord table for datasets ingested while
+    EQUIPMENT_RECORDS was off, e.g. after enabling it. Datasets that
+    already have records are skipped.
+    """
+    help = 'Store equipment records for datasets that have none'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Rows per bulk insert (default: EQUIPMENT_RECORD_BATCH_SIZE)'
+        )
+    
+    def handle(self, *args, **options):
+        datasets = Dataset.objects.filter(records__isnull=True).defer('summary_json')
+        
+        loaded = rows = 0
+        for dataset in datasets.iterator():
+            with transaction.atomic():
+                stored = store_equipment_records(dataset, batch_size=options['batch_size'])
+            if stored:
+                rows += stored
+                loaded += 1
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {rows} record(s) for {loaded} dataset(s)'
+        ))
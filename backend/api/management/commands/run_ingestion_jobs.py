@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from api.jobs import requeue_stale_jobs, run_ingestion_job
+from api.models import IngestionJob
+
+
+class Command(BaseCommand):
+    """
+    Process ingestion jobs still queued, e.g. after a server restart.
+    Jobs left running by a worker that died are requeued first.
+    """
+    help = 'Requeue stale running CSV ingestion jobs and process queued ones'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-seconds', type=int, default=None,
+            help='Requeue running jobs not updated for this long '
+                 '(default: INGEST_JOB_STALE_SECONDS)'
+        )
+    
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs(options['stale_seconds'])
+        
+        job_ids = IngestionJob.objects.filter(
+            status=IngestionJob.STATUS_QUEUED
+        ).order_by('created_at').values_list('id', flat=True)
+        
+        processed = 0
+        for job_id in job_ids:
+            if run_ingestion_job(job_id):
+                processed += 1
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Requeued {requeued} stale job(s); processed {processed} queued job(s)'
+        ))
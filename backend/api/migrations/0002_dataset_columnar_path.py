@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='columnar_path',
+            field=models.FileField(blank=True, upload_to='columnar/'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_ingestionjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='ingestionjob',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:29
+
+from django.db import migrations, models
+
+
+def backfill_file_sizes(apps, schema_editor):
+    """Record the CSV size of datasets uploaded before sizes were stored."""
+    Dataset = apps.get_model('api', 'Dataset')
+    for dataset in Dataset.objects.only('id', 'csv_path').iterator():
+        try:
+            size = dataset.csv_path.size
+        except (OSError, ValueError):
+            continue
+        Dataset.objects.filter(pk=dataset.pk).update(file_size=size)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='file_size',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_file_sizes, migrations.RunPython.noop),
+    ]
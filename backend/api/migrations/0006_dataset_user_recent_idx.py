@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_dataset_file_size'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dataset',
+            index=models.Index(fields=['user', '-upload_timestamp'], name='dataset_user_recent_idx'),
+        ),
+    ]
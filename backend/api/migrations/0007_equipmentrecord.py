@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_dataset_user_recent_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, null=True)),
+                ('type', models.CharField(max_length=255, null=True)),
+                ('flowrate', models.FloatField(null=True)),
+                ('pressure', models.FloatField(null=True)),
+                ('temperature', models.FloatField(null=True)),
+                ('dataset', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='records', to='api.dataset')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['dataset', 'type'], name='record_dataset_type_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_equipmentrecord'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='histograms_json',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
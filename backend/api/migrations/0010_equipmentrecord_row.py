@@ -0,0 +1,52 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:10
+
+from django.db import migrations, models
+
+
+def delete_records(apps, schema_editor):
+    # Records are a copy of the columnar files without row numbers; refill
+    # them with `manage.py load_equipment_records`
+    apps.get_model('api', 'EquipmentRecord').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_chunkedupload'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_records, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='equipmentrecord',
+            name='row',
+            field=models.PositiveIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='equipmentrecord',
+            name='name',
+            field=models.TextField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='equipmentrecord',
+            name='type',
+            field=models.TextField(null=True),
+        ),
+        migrations.AlterModelOptions(
+            name='equipmentrecord',
+            options={'ordering': ['dataset_id', 'row']},
+        ),
+        migrations.RemoveIndex(
+            model_name='equipmentrecord',
+            name='record_dataset_type_idx',
+        ),
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['dataset', 'type', 'row'], name='record_dataset_type_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='equipmentrecord',
+            constraint=models.UniqueConstraint(fields=('dataset', 'row'), name='record_dataset_row_uniq'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:05
+
+from django.db import migrations, models
+
+
+def move_sketches(apps, schema_editor):
+    # Summaries used to carry their sketch; the API returns summaries whole
+    Dataset = apps.get_model('api', 'Dataset')
+    for dataset in Dataset.objects.filter(summary_json__has_key='sketch').iterator():
+        dataset.sketch_json = dataset.summary_json.pop('sketch')
+        dataset.save(update_fields=['summary_json', 'sketch_json'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_equipmentrecord_row'),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='sketch_json',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(move_sketches, migrations.RunPython.noop),
+    ]
@@ -9,11 +9,109 @@ class Dataset(models.Model):
     filename = models.CharField(max_length=255)
     upload_timestamp = models.DateTimeField(auto_now_add=True)
     summary_json = models.JSONField()
+    # Mergeable sketch the summary was built from (see sketches.py), kept
+    # apart so the summaries the API returns stay small
+    sketch_json = models.JSONField(default=dict, blank=True)
+    # Fixed and quantile-bin histograms, kept apart so summaries stay small
+    histograms_json = models.JSONField(default=dict, blank=True)
     csv_path = models.FileField(upload_to='uploads/')
+    # Arrow IPC copy of the rows, written at ingest for memory-mapped reads
+    columnar_path = models.FileField(upload_to='columnar/', blank=True)
+    # SHA-256 of the raw CSV; datasets with the same hash share their files
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    # Size of the raw CSV in bytes, for per-user storage quotas
+    file_size = models.BigIntegerField(default=0)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     
     class Meta:
         ordering = ['-upload_timestamp']
+        indexes = [
+            # Serves the per-user newest-first listing without a sort
+            models.Index(fields=['user', '-upload_timestamp'], name='dataset_user_recent_idx'),
+        ]
     
     def __str__(self):
         return f"{self.filename} - {self.upload_timestamp}"
+
+
+class EquipmentRecord(models.Model):
+    """
+    One parsed row of a dataset, so rows can be filtered and aggregated in SQL.
+    """
+    # Indexed through the (dataset, row) constraint below
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE,
+                                related_name='records', db_index=False)
+    # Position of the row in the file
+    row = models.PositiveIntegerField()
+    name = models.TextField(null=True)
+    type = models.TextField(null=True)
+    flowrate = models.FloatField(null=True)
+    pressure = models.FloatField(null=True)
+    temperature = models.FloatField(null=True)
+    
+    class Meta:
+        ordering = ['dataset_id', 'row']
+        constraints = [
+            models.UniqueConstraint(fields=['dataset', 'row'], name='record_dataset_row_uniq'),
+        ]
+        indexes = [
+            # Serves type filters in file order
+            models.Index(fields=['dataset', 'type', 'row'], name='record_dataset_type_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.type})"
+
+
+class IngestionJob(models.Model):
+    """
+    Background processing of an uploaded CSV file.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    upload = models.FileField(upload_to='uploads/')
+    content_hash = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    progress = models.FloatField(default=0.0)
+    rows_processed = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    dataset = models.ForeignKey(Dataset, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.filename} - {self.status}"
+
+
+class ChunkedUpload(models.Model):
+    """
+    A CSV file being uploaded in chunks; see api/resumable.py.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    # Declared size in bytes; `offset` bytes have been received so far
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    file = models.FileField(upload_to='uploads/')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.filename} - {self.offset}/{self.size}"
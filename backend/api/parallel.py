@@ -0,0 +1,164 @@
+"""
+Parallel CSV parsing for large uploads.
+
+The file is split into byte ranges at newline boundaries and each range is
+parsed, validated and sketched in a worker process. Workers also write their
+rows to an Arrow part file so the parent can assemble the columnar copy
+without parsing anything itself. Partial sketches are merged in range order.
+
+Splitting on newlines assumes no quoted field spans several lines, which
+holds for the equipment CSV format.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import BytesIO
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from .sketches import merge_sketches
+from .utils import (CSV_DTYPES, CSVValidationError, coerce_numeric_columns,
+                    sketch_dataframe, summary_from_sketch, validate_csv_columns)
+
+
+# Ranges smaller than this are not worth a separate task
+MIN_RANGE_BYTES = 1024 * 1024
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_process_pool(workers):
+    """
+    Return a shared process pool with `workers` processes.
+    Pools use the spawn start method so forking a threaded server is avoided,
+    and are reused so interpreter start-up is paid once per process.
+    """
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            _pools[workers] = pool
+        return pool
+
+
+def split_csv_ranges(path, parts):
+    """
+    Split a CSV file into at most `parts` byte ranges of whole lines.
+    Returns (header, ranges) where header is the first line as bytes and
+    ranges is a list of (start, end) offsets covering the data lines.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header = f.readline()
+        data_start = f.tell()
+        
+        target = max((size - data_start) // max(parts, 1), MIN_RANGE_BYTES)
+        boundaries = [data_start]
+        while boundaries[-1] + target < size:
+            f.seek(boundaries[-1] + target)
+            f.readline()  # advance to the next line start
+            position = f.tell()
+            if position >= size:
+                break
+            boundaries.append(position)
+        boundaries.append(size)
+    
+    ranges = [(a, b) for a, b in zip(boundaries, boundaries[1:]) if b > a]
+    return header, ranges
+
+
+def _process_range(path, header, start, end, part_path):
+    """
+    Worker task: parse one byte range, write its rows to `part_path` and
+    return (sketch, error).
+    """
+    from .storage import ARROW_SCHEMA, dataframe_to_batch
+    
+    with open(path, 'rb') as f:
+        f.seek(start)
+        body = f.read(end - start)
+    
+    try:
+        df = pd.read_csv(BytesIO(header + body), dtype=CSV_DTYPES)
+        is_valid, error_message = validate_csv_columns(df)
+        if not is_valid:
+            return None, error_message
+        coerce_numeric_columns(df)
+    except CSVValidationError as e:
+        return None, str(e)
+    except pd.errors.EmptyDataError:
+        return None, "CSV file is empty"
+    except pd.errors.ParserError:
+        return None, "Invalid CSV format"
+    
+    with ipc.new_file(part_path, ARROW_SCHEMA) as writer:
+        writer.write_batch(dataframe_to_batch(df))
+    
+    return sketch_dataframe(df), None
+
+
+def process_csv_file_parallel(path, workers, sink=None, progress=None):
+    """
+    Process a CSV file on disk with a pool of `workers` processes.
+    
+    Mirrors process_csv_file in streaming mode: returns (None, summary,
+    error). If `sink` is given, the rows are passed to `sink.write_table()`
+    in file order. `progress`, if given, is called as ranges complete with
+    the number of rows processed so far and, as `fraction`, the share of the
+    file's data bytes in completed ranges; the caller cannot tell it from
+    the file position, since only the workers read the file.
+    """
+    header, ranges = split_csv_ranges(path, workers * 2)
+    if not ranges:
+        return None, None, "CSV file must contain at least one row of data"
+    
+    part_dir = tempfile.mkdtemp(prefix='csv-parts-')
+    try:
+        pool = get_process_pool(workers)
+        futures = {
+            pool.submit(_process_range, path, header, start, end,
+                        os.path.join(part_dir, f'{index}.arrow')): index
+            for index, (start, end) in enumerate(ranges)
+        }
+        
+        sketches = [None] * len(ranges)
+        rows_processed = 0
+        bytes_done = 0
+        bytes_total = ranges[-1][1] - ranges[0][0]
+        for future in as_completed(futures):
+            sketch, error = future.result()
+            if error:
+                for pending in futures:
+                    pending.cancel()
+                return None, None, error
+            sketches[futures[future]] = sketch
+            rows_processed += sketch['count']
+            start, end = ranges[futures[future]]
+            bytes_done += end - start
+            if progress is not None:
+                progress(rows_processed, fraction=bytes_done / bytes_total)
+        
+        merged = merge_sketches(*sketches)
+        if merged['count'] < 1:
+            return None, None, "CSV file must contain at least one row of data"
+        
+        if sink is not None:
+            for index in range(len(ranges)):
+                source = pa.memory_map(os.path.join(part_dir, f'{index}.arrow'), 'r')
+                sink.write_table(ipc.open_file(source).read_all())
+        
+        return None, summary_from_sketch(merged), None
+    
+    except Exception as e:
+        return None, None, f"Error processing CSV: {str(e)}"
+    finally:
+        shutil.rmtree(part_dir, ignore_errors=True)
@@ -0,0 +1,217 @@
+"""
+Row-level equipment records.
+
+With EQUIPMENT_RECORDS enabled, each ingested dataset's rows are copied
+from its columnar file into the EquipmentRecord table, one bulk_create per
+batch of rows, numbered in file order. The copy is made on the ingestion
+thread pool after the upload has been committed, never on the request path.
+
+Once a dataset's records are stored, the rows endpoint filters, orders and
+pages them in SQL, and aggregate queries without percentiles are computed
+in SQL, instead of reading the columnar file. Until then, and for
+percentiles, the columnar file is used.
+"""
+import math
+
+import pyarrow as pa
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Avg, Count, F, Max, Min, Sum
+
+from .aggregates import MAX_GROUPS
+from .models import Dataset, EquipmentRecord
+from .storage import ARROW_SCHEMA, load_dataset_table
+
+
+# Record field for each CSV column
+RECORD_FIELDS = {
+    'Equipment Name': 'name',
+    'Type': 'type',
+    'Flowrate': 'flowrate',
+    'Pressure': 'pressure',
+    'Temperature': 'temperature',
+}
+
+# SQL aggregate for each moment metric except std, which is derived from
+# the count, sum and sum of squares
+SQL_AGGREGATES = {
+    'count': Count,
+    'sum': Sum,
+    'mean': Avg,
+    'min': Min,
+    'max': Max,
+}
+
+
+def records_from_batch(dataset, batch, first_row=0):
+    """Build unsaved EquipmentRecords from a pyarrow RecordBatch starting at row `first_row`."""
+    fields = list(RECORD_FIELDS.values())
+    columns = [batch.column(name).to_pylist() for name in RECORD_FIELDS]
+    # Setting dataset_id skips the related-object descriptor on every row
+    return [
+        EquipmentRecord(dataset_id=dataset.id, row=first_row + index, **dict(zip(fields, values)))
+        for index, values in enumerate(zip(*columns))
+    ]
+
+
+def records_for(dataset):
+    """Return the EquipmentRecords holding a dataset's rows."""
+    return EquipmentRecord.objects.filter(dataset_id=dataset.id)
+
+
+def records_ready(dataset):
+    """Return True if the dataset's rows can be read from its EquipmentRecords."""
+    return settings.EQUIPMENT_RECORDS and records_for(dataset).exists()
+
+
+def store_equipment_records(dataset, batch_size=None):
+    """
+    Insert a saved dataset's rows as EquipmentRecords, reading the columnar
+    copy one batch at a time so memory stays bounded by `batch_size`
+    (default EQUIPMENT_RECORD_BATCH_SIZE). Nothing is inserted if the
+    dataset already has records; rows a concurrent store inserted first are
+    skipped, as (dataset, row) is unique. Returns the number of rows.
+    """
+    if records_for(dataset).exists():
+        return 0
+    batch_size = batch_size or settings.EQUIPMENT_RECORD_BATCH_SIZE
+    table = load_dataset_table(dataset, columns=list(RECORD_FIELDS))
+    
+    stored = 0
+    for batch in table.to_batches(max_chunksize=batch_size):
+        records = records_from_batch(dataset, batch, stored)
+        EquipmentRecord.objects.bulk_create(records, batch_size=batch_size, ignore_conflicts=True)
+        stored += len(records)
+    return stored
+
+
+def schedule_equipment_records(dataset):
+    """
+    Store a new dataset's records when EQUIPMENT_RECORDS is enabled, on the
+    ingestion thread pool once the dataset is committed.
+    """
+    if not settings.EQUIPMENT_RECORDS:
+        return
+    if settings.INGEST_JOBS_EAGER:
+        _store_records(dataset.id)
+        return
+    
+    from .jobs import get_executor  # jobs imports ingest, which imports this module
+    transaction.on_commit(lambda: get_executor().submit(_store_in_worker, dataset.id))
+
+
+def _store_records(dataset_id):
+    dataset = Dataset.objects.defer('summary_json').filter(id=dataset_id).first()
+    if dataset is not None:
+        # Readers only see the records once all of them are in
+        with transaction.atomic():
+            store_equipment_records(dataset)
+
+
+def _store_in_worker(dataset_id):
+    """Worker thread entry point for storing records."""
+    close_old_connections()
+    try:
+        _store_records(dataset_id)
+    finally:
+        close_old_connections()
+
+
+def _filtered(dataset, query):
+    """The dataset's records matching a RowQuery's filters."""
+    records = records_for(dataset)
+    if query.types:
+        records = records.filter(type__in=query.types)
+    for col, bounds in query.ranges.items():
+        field = RECORD_FIELDS[col]
+        if 'min' in bounds:
+            records = records.filter(**{f'{field}__gte': bounds['min']})
+        if 'max' in bounds:
+            records = records.filter(**{f'{field}__lte': bounds['max']})
+    return records
+
+
+def _sort_key(col, descending=False):
+    # Missing values sort last either way, as in rows.query_rows
+    field = F(RECORD_FIELDS[col])
+    return field.desc(nulls_last=True) if descending else field.asc(nulls_last=True)
+
+
+def query_records(dataset, query):
+    """
+    Apply a RowQuery to a dataset's EquipmentRecords.
+    Returns (page, total) like rows.query_rows: the page is a pyarrow Table
+    with the projected columns; ties keep file order.
+    """
+    records = _filtered(dataset, query)
+    total = records.count()
+    
+    keys = [_sort_key(col, direction == 'descending') for col, direction in query.ordering]
+    fields = [RECORD_FIELDS[col] for col in query.columns]
+    rows = list(records.order_by(*keys, 'row')
+                .values_list(*fields)[query.offset:query.offset + query.limit])
+    
+    columns = list(zip(*rows)) if rows else [()] * len(fields)
+    schema = pa.schema([ARROW_SCHEMA.field(col) for col in query.columns])
+    arrays = [pa.array(values, type=field.type) for values, field in zip(columns, schema)]
+    return pa.Table.from_arrays(arrays, schema=schema), total
+
+
+def aggregate_records(dataset, query):
+    """
+    Run an AggregateQuery without percentiles over a dataset's
+    EquipmentRecords. Returns (body, error) like aggregates.aggregate_table.
+    """
+    annotations = {'count_all': Count('pk')}
+    for col in query.columns:
+        field = RECORD_FIELDS[col]
+        for metric in query.metrics:
+            if metric in SQL_AGGREGATES:
+                annotations[f'{col}_{metric}'] = SQL_AGGREGATES[metric](field)
+        if 'std' in query.metrics:
+            annotations[f'{col}_n'] = Count(field)
+            annotations[f'{col}_s'] = Sum(field)
+            annotations[f'{col}_ss'] = Sum(F(field) * F(field))
+    
+    records = _filtered(dataset, query.row_query())
+    if query.group_by:
+        group_fields = [RECORD_FIELDS[col] for col in query.group_by]
+        rows = list(records.values(*group_fields).annotate(**annotations)
+                    .order_by(*[_sort_key(col) for col in query.group_by])[:MAX_GROUPS + 1])
+        if len(rows) > MAX_GROUPS:
+            return None, f"Query produces more than {MAX_GROUPS} groups; at most {MAX_GROUPS} are allowed"
+    else:
+        rows = [records.aggregate(**annotations)]
+    
+    groups = []
+    for row in rows:
+        statistics = {}
+        for col in query.columns:
+            stats = {}
+            for metric in query.metrics:
+                if metric == 'std':
+                    stats[metric] = _sample_std(row[f'{col}_n'], row[f'{col}_s'], row[f'{col}_ss'])
+                else:
+                    stats[metric] = row[f'{col}_{metric}']
+            statistics[col] = stats
+        groups.append({
+            'key': {col: row[RECORD_FIELDS[col]] for col in query.group_by},
+            'count': row['count_all'],
+            'statistics': statistics,
+        })
+    
+    return {
+        'group_by': query.group_by,
+        'metrics': query.metrics,
+        'columns': query.columns,
+        'count': sum(group['count'] for group in groups),
+        'groups': groups,
+    }, None
+
+
+def _sample_std(count, total, squares):
+    """Sample standard deviation (ddof=1) from a count, sum and sum of squares."""
+    if count < 2:
+        return None
+    variance = (squares - total * total / count) / (count - 1)
+    return math.sqrt(max(variance, 0.0))
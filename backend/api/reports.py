@@ -0,0 +1,334 @@
+"""
+PDF reports for datasets.
+
+A dataset's summary never changes after upload, so its report is rendered
+once, stored under reports/ and streamed from disk on later downloads.
+ReportLab style objects are built once at import and shared by all renders.
+
+The full-data report adds a section per equipment type with every row.
+Its flowables are generated lazily from the memory-mapped columnar copy
+and drawn as they are produced, so only a few pages of rows are held as
+Python objects at any time.
+
+A report that has not been rendered yet is rendered on the ingestion thread
+pool; downloads return 202 until it is stored.
+"""
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from reportlab.lib import colors
+import pyarrow.compute as pc
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import (PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table,
+                                TableStyle)
+
+from .models import Dataset
+from .storage import load_dataset_table
+from .utils import NUMERIC_COLUMNS, REQUIRED_COLUMNS
+
+
+logger = logging.getLogger(__name__)
+
+REPORT_UPLOAD_DIR = 'reports'
+
+# Renders queued on the thread pool by this process, by report name; a
+# render that failed stays here until a download has reported it
+_renders = {}
+_renders_lock = threading.Lock()
+
+STYLES = getSampleStyleSheet()
+
+TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=STYLES['Heading1'],
+    fontSize=24,
+    textColor=colors.HexColor('#1a1a1a'),
+    spaceAfter=30,
+    alignment=1  # Center
+)
+
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+ROW_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('ALIGN', (2, 0), (-1, -1), 'RIGHT'),
+    ('TOPPADDING', (0, 0), (-1, -1), 1),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
+    ('GRID', (0, 0), (-1, -1), 0.25, colors.black)
+])
+
+ROW_TABLE_WIDTHS = [2.2*inch, 1.6*inch, 1*inch, 1*inch, 1*inch]
+
+# Rows per table in the full report: about one page each
+ROWS_PER_TABLE = 50
+
+# Flowables generated ahead of the one being drawn
+FLOWABLE_LOOKAHEAD = 4
+
+
+def summary_report_elements(dataset):
+    """Build the flowables of the summary report."""
+    elements = []
+    
+    # Title
+    elements.append(Paragraph("Chemical Equipment Parameter Visualizer", TITLE_STYLE))
+    elements.append(Spacer(1, 0.3*inch))
+    
+    # Dataset info
+    info_style = STYLES['Normal']
+    elements.append(Paragraph(f"<b>Filename:</b> {dataset.filename}", info_style))
+    elements.append(Paragraph(f"<b>Upload Date:</b> {dataset.upload_timestamp.strftime('%Y-%m-%d %H:%M:%S')}", info_style))
+    elements.append(Spacer(1, 0.3*inch))
+    
+    # Summary section
+    summary = dataset.summary_json
+    elements.append(Paragraph("<b>Summary Statistics</b>", STYLES['Heading2']))
+    elements.append(Spacer(1, 0.1*inch))
+    
+    summary_data = [
+        ['Metric', 'Value'],
+        ['Total Equipment Count', str(summary['total_count'])],
+        ['Average Flowrate', _format_average(summary['avg_flowrate'])],
+        ['Average Pressure', _format_average(summary['avg_pressure'])],
+        ['Average Temperature', _format_average(summary['avg_temperature'])],
+    ]
+    
+    summary_table = Table(summary_data, colWidths=[3*inch, 2*inch])
+    summary_table.setStyle(TABLE_STYLE)
+    elements.append(summary_table)
+    elements.append(Spacer(1, 0.3*inch))
+    
+    # Equipment type distribution
+    elements.append(Paragraph("<b>Equipment Type Distribution</b>", STYLES['Heading2']))
+    elements.append(Spacer(1, 0.1*inch))
+    
+    type_data = [['Equipment Type', 'Count']]
+    for equip_type, count in summary['type_distribution'].items():
+        type_data.append([equip_type, str(count)])
+    
+    type_table = Table(type_data, colWidths=[3*inch, 2*inch])
+    type_table.setStyle(TABLE_STYLE)
+    elements.append(type_table)
+    
+    return elements
+
+
+def _format_average(value):
+    # A column with no values at all has no average
+    return 'n/a' if value is None else f'{value:.2f}'
+
+
+def render_summary_report(dataset, out):
+    """Render the summary report for a dataset to a binary file object or path."""
+    doc = SimpleDocTemplate(out, pagesize=letter)
+    doc.build(summary_report_elements(dataset))
+
+
+class FlowableQueue(list):
+    """
+    The flowable list passed to DocTemplate.build, filled on demand from an
+    iterator. build() consumes flowables from the front and puts split
+    remainders back there, so only a short lookahead is ever materialized.
+    """
+    
+    def __init__(self, flowables, lookahead=FLOWABLE_LOOKAHEAD):
+        super().__init__()
+        self._source = iter(flowables)
+        self._lookahead = lookahead
+        self._fill()
+    
+    def _fill(self):
+        while self._source is not None and list.__len__(self) < self._lookahead:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+    
+    def __len__(self):
+        self._fill()
+        return list.__len__(self)
+    
+    def __getitem__(self, index):
+        self._fill()
+        return list.__getitem__(self, index)
+    
+    def __delitem__(self, index):
+        list.__delitem__(self, index)
+        self._fill()
+
+
+def _format_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        return f'{value:.2f}'
+    return str(value)
+
+
+def rows_table(rows):
+    """Build a table flowable for a pyarrow Table of rows."""
+    columns = [rows.column(col).to_pylist() for col in REQUIRED_COLUMNS]
+    data = [list(REQUIRED_COLUMNS)]
+    data.extend([_format_cell(v) for v in row] for row in zip(*columns))
+    table = Table(data, colWidths=ROW_TABLE_WIDTHS, repeatRows=1)
+    table.setStyle(ROW_TABLE_STYLE)
+    return table
+
+
+def type_statistics_table(stats):
+    """Build the per-parameter statistics table for one equipment type."""
+    data = [['Parameter', 'Mean', 'Min', 'Max', 'Std']]
+    for col in NUMERIC_COLUMNS:
+        values = stats.get(col, {})
+        data.append([col] + [_format_cell(values.get(k)) for k in ('mean', 'min', 'max', 'std')])
+    table = Table(data, colWidths=[1.6*inch] + [1*inch] * 4)
+    table.setStyle(TABLE_STYLE)
+    return table
+
+
+def full_report_elements(dataset):
+    """
+    Generate the flowables of the full-data report: the summary report
+    followed by one section per equipment type listing all of its rows.
+    """
+    yield from summary_report_elements(dataset)
+    
+    summary = dataset.summary_json
+    table = load_dataset_table(dataset)
+    type_column = table.column('Type')
+    
+    sections = [(label, pc.equal(type_column, label)) for label in summary['type_distribution']]
+    if type_column.null_count:
+        sections.append(('Unspecified type', pc.is_null(type_column)))
+    
+    for label, mask in sections:
+        indices = pc.indices_nonzero(mask)
+        yield PageBreak()
+        yield Paragraph(f"<b>{label}</b> ({len(indices)} rows)", STYLES['Heading2'])
+        stats = summary.get('type_statistics', {}).get(label)
+        if stats:
+            yield type_statistics_table(stats)
+        yield Spacer(1, 0.2*inch)
+        
+        for start in range(0, len(indices), ROWS_PER_TABLE):
+            yield rows_table(table.take(indices.slice(start, ROWS_PER_TABLE)))
+
+
+def render_full_report(dataset, out):
+    """Render the full-data report for a dataset to a binary file object or path."""
+    # Row tables make long, repetitive page streams that deflate well
+    doc = SimpleDocTemplate(out, pagesize=letter, pageCompression=1)
+    doc.build(FlowableQueue(full_report_elements(dataset)))
+
+
+def report_name(dataset, full=False):
+    """Storage name of a dataset's rendered report."""
+    # The upload time keeps names unique even if a dataset id is reused
+    stamp = dataset.upload_timestamp.strftime('%Y%m%d%H%M%S%f')
+    suffix = '-full' if full else ''
+    return f'{REPORT_UPLOAD_DIR}/dataset-{dataset.id}-{stamp}{suffix}.pdf'
+
+
+def get_report_path(dataset, full=False):
+    """
+    Return the local path of a dataset's summary report (or full-data
+    report), rendering and storing it first if needed.
+    """
+    name = report_name(dataset, full=full)
+    path = default_storage.path(name)
+    if os.path.exists(path):
+        return path
+    
+    # Render to a private file and rename it into place, so concurrent
+    # requests never see a partial report
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f'{path}.{os.getpid()}-{threading.get_ident()}.part'
+    render = render_full_report if full else render_summary_report
+    try:
+        render(dataset, partial)
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.unlink(partial)
+    return path
+
+
+def request_report(dataset, full=False):
+    """
+    Return (path, error) for a dataset's report. If it is not stored yet,
+    its render is queued on the ingestion thread pool (or run inline with
+    INGEST_JOBS_EAGER) and path is None until a later call finds it done.
+    """
+    name = report_name(dataset, full=full)
+    path = default_storage.path(name)
+    if os.path.exists(path):
+        return path, None
+    if settings.INGEST_JOBS_EAGER:
+        return get_report_path(dataset, full=full), None
+    
+    with _renders_lock:
+        future = _renders.get(name)
+        if future is not None and future.done() and future.exception() is not None:
+            # Reported once; the next download tries again
+            del _renders[name]
+            return None, 'Report could not be rendered'
+    _submit_render(dataset, full)
+    return None, None
+
+
+def schedule_report_render(dataset):
+    """
+    Pre-render a new dataset's report when PDF_PRERENDER is enabled, on the
+    ingestion thread pool once the dataset is committed.
+    """
+    if not settings.PDF_PRERENDER:
+        return
+    if settings.INGEST_JOBS_EAGER:
+        get_report_path(dataset)
+        return
+    
+    transaction.on_commit(lambda: _submit_render(dataset))
+
+
+def _submit_render(dataset, full=False):
+    """Queue a report render unless one is already pending."""
+    from .jobs import get_executor  # jobs imports ingest, which imports this module
+    name = report_name(dataset, full=full)
+    with _renders_lock:
+        if name not in _renders or _renders[name].done():
+            _renders[name] = get_executor().submit(_render_in_worker, dataset.id, full, name)
+
+
+def _render_in_worker(dataset_id, full, name):
+    """Worker thread entry point for rendering."""
+    close_old_connections()
+    try:
+        dataset = Dataset.objects.filter(id=dataset_id).first()
+        if dataset is not None:
+            get_report_path(dataset, full=full)
+    except Exception:
+        logger.exception('Rendering report %s failed', name)
+        raise
+    else:
+        with _renders_lock:
+            _renders.pop(name, None)
+    finally:
+        close_old_connections()
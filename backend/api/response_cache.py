@@ -0,0 +1,97 @@
+"""
+Cache of rendered history and summary responses.
+
+Response bodies are stored in the Django cache named by RESPONSE_CACHE_ALIAS
+together with an ETag (a hash of the body) and, for summaries, a
+Last-Modified time, keyed by user and dataset. Entries are invalidated explicitly when a user's
+datasets change, so the timeout only bounds memory use. Clients that send
+If-None-Match or If-Modified-Since get 304 Not Modified while the data is
+unchanged.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+def get_response_cache():
+    """Return the cache backend used for responses."""
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def history_key(user_id):
+    return f'responses:history:{user_id}'
+
+
+def summary_key(user_id, dataset_id):
+    return f'responses:summary:{user_id}:{dataset_id}'
+
+
+def _dataset_tag(dataset):
+    # Ids are reused after a database reset while the cache may outlive it;
+    # the upload time tells the datasets apart
+    return f'{dataset.id}.{int(dataset.upload_timestamp.timestamp() * 1e6)}'
+
+
+def aggregate_key(dataset, signature):
+    # Dataset contents never change, so the key is not per user; views check
+    # ownership before reading it
+    return f'responses:aggregate:{_dataset_tag(dataset)}:{signature}'
+
+
+def series_key(dataset, method, points, columns):
+    return f"responses:series:{_dataset_tag(dataset)}:{method}:{points}:{','.join(columns)}"
+
+
+def make_entry(body, last_modified=None):
+    """
+    Build a cache entry for a response body.
+    `last_modified` is a datetime or None.
+    """
+    encoded = json.dumps(body, sort_keys=True, separators=(',', ':'), default=str)
+    return {
+        'body': body,
+        'etag': '"%s"' % hashlib.sha256(encoded.encode()).hexdigest()[:32],
+        'last_modified': int(last_modified.timestamp()) if last_modified else None,
+    }
+
+
+def cached_entry(key, build):
+    """
+    Return the cached entry for `key`, calling `build()` to create it on a
+    miss. `build` may return None (e.g. not found), which is not cached.
+    """
+    cache = get_response_cache()
+    entry = cache.get(key)
+    if entry is None:
+        entry = build()
+        if entry is not None:
+            cache.set(key, entry, settings.RESPONSE_CACHE_TIMEOUT)
+    return entry
+
+
+def conditional_response(request, entry):
+    """Return 304 if the client's validators match the entry, else the body."""
+    response = get_conditional_response(
+        request, etag=entry['etag'], last_modified=entry['last_modified']
+    )
+    if response is None:
+        response = Response(entry['body'])
+    
+    response['ETag'] = entry['etag']
+    if entry['last_modified'] is not None:
+        response['Last-Modified'] = http_date(entry['last_modified'])
+    # Clients may keep the body but must revalidate before using it
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+def invalidate_user_responses(user_id, dataset_ids=()):
+    """Drop a user's cached history and the summaries of `dataset_ids`."""
+    keys = [history_key(user_id)] + [summary_key(user_id, pk) for pk in dataset_ids]
+    get_response_cache().delete_many(keys)
@@ -0,0 +1,105 @@
+"""
+Resumable chunked uploads.
+
+A client that may lose its connection mid-upload sends the file in pieces:
+
+    POST /upload/chunked/                  declare filename and size
+    PUT  /upload/chunked/<id>/             send bytes at the Upload-Offset header
+    GET  /upload/chunked/<id>/             ask how many bytes have arrived
+    POST /upload/chunked/<id>/complete/    ingest the file once all bytes are in
+
+Each chunk is streamed from the request into the upload's file at its
+declared offset, and the offset advances by the bytes that actually
+arrived, so an interrupted chunk keeps its received part. A chunk sent at a
+stale offset (e.g. a retry after a lost response) gets 409 with the
+current offset; after any failure the client asks for the offset and
+carries on from there. Once complete, the file becomes the dataset's raw
+CSV.
+"""
+import os
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .models import ChunkedUpload
+
+
+# Bytes read from the request stream at a time
+READ_BLOCK_SIZE = 64 * 1024
+
+
+def create_chunked_upload(user, filename, size):
+    """
+    Start a chunked upload of `size` bytes (an int or a numeric string).
+    Any directory part of `filename` is dropped.
+    Returns: (upload, error)
+    """
+    filename = os.path.basename(filename.replace('\\', '/')).strip()
+    if filename in ('', '.', '..'):
+        return None, "'filename' must name a file"
+    if not filename.endswith('.csv'):
+        return None, 'File must be a CSV'
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        size = 0
+    if size <= 0:
+        return None, "'size' must be a positive number of bytes"
+    max_size = settings.CSV_UPLOAD_MAX_SIZE
+    if size > max_size:
+        return None, f'File size exceeds {max_size // (1024 * 1024)}MB limit'
+    
+    # Claim the final name now; the file fills up as chunks arrive
+    try:
+        name = default_storage.save(f'uploads/{filename}', ContentFile(b''))
+    except SuspiciousFileOperation:
+        return None, "'filename' must name a file"
+    upload = ChunkedUpload.objects.create(user=user, filename=filename, size=size, file=name)
+    return upload, None
+
+
+def write_chunk(upload, offset, stream):
+    """
+    Write the bytes of `stream` into the upload at `offset`, which must be
+    the upload's current offset.
+    
+    Returns: (written, error). `written` is None if another request moved
+    the offset first; the caller should then report the current offset.
+    """
+    remaining = upload.size - offset
+    written = 0
+    with open(upload.file.path, 'r+b') as f:
+        f.seek(offset)
+        while True:
+            block = stream.read(READ_BLOCK_SIZE) if stream is not None else b''
+            if not block:
+                break
+            if written + len(block) > remaining:
+                return None, f'Chunk exceeds the declared size of {upload.size} bytes'
+            f.write(block)
+            written += len(block)
+    
+    # Only the request that still sees the expected offset may advance it
+    moved = ChunkedUpload.objects.filter(pk=upload.pk, offset=offset).update(
+        offset=offset + written, updated_at=timezone.now()
+    )
+    if not moved:
+        return None, None
+    upload.offset = offset + written
+    return written, None
+
+
+def chunked_upload_status(upload):
+    """Build the JSON body describing a chunked upload."""
+    return {
+        'upload_id': upload.id,
+        'filename': upload.filename,
+        'size': upload.size,
+        'offset': upload.offset,
+        'complete': upload.offset == upload.size,
+        'chunk_size': settings.CHUNKED_UPLOAD_CHUNK_SIZE,
+    }
+
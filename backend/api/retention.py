@@ -0,0 +1,124 @@
+"""
+Dataset retention.
+
+The retention policy is set in settings and any combination of rules may be
+enabled; a dataset is removed once any rule expires it:
+
+    RETENTION_KEEP_LATEST         keep only a user's N newest datasets
+    RETENTION_MAX_AGE_DAYS        remove datasets older than T days
+    RETENTION_MAX_BYTES_PER_USER  keep a user's newest datasets whose CSV
+                                  sizes add up to at most this many bytes
+
+Expired records are found and removed with a fixed number of set-based
+queries, however long the history is. Their files are not touched on the
+request path: `manage.py enforce_retention`
+periodically deletes files no record refers to any more. The same command
+drops chunked uploads abandoned for CHUNKED_UPLOAD_EXPIRY_HOURS, leaving
+their partial files to the same sweep.
+"""
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import F, Q, Sum, Window
+from django.utils import timezone
+
+from .models import ChunkedUpload, Dataset, IngestionJob
+from .reports import REPORT_UPLOAD_DIR, report_name
+from .response_cache import invalidate_user_responses
+from .storage import COLUMNAR_UPLOAD_DIR
+
+
+# Storage directories swept for unreferenced files
+MANAGED_DIRS = ('uploads', COLUMNAR_UPLOAD_DIR, REPORT_UPLOAD_DIR)
+
+
+def expired_datasets(user, now=None):
+    """Return a queryset of the user's datasets expired by the policy."""
+    datasets = Dataset.objects.filter(user=user)
+    newest_first = datasets.order_by('-upload_timestamp', '-id')
+    
+    rules = Q()
+    keep = settings.RETENTION_KEEP_LATEST
+    if keep is not None:
+        rules |= Q(pk__in=newest_first.values('pk')[keep:])
+    
+    max_age = settings.RETENTION_MAX_AGE_DAYS
+    if max_age is not None:
+        cutoff = (now or timezone.now()) - timedelta(days=max_age)
+        rules |= Q(upload_timestamp__lt=cutoff)
+    
+    quota = settings.RETENTION_MAX_BYTES_PER_USER
+    if quota is not None:
+        # Running total of sizes from the newest dataset backwards
+        over_quota = datasets.alias(
+            cumulative_size=Window(
+                Sum('file_size'),
+                order_by=[F('upload_timestamp').desc(), F('id').desc()]
+            )
+        ).filter(cumulative_size__gt=quota).values('pk')
+        rules |= Q(pk__in=over_quota)
+    
+    if not rules:
+        return datasets.none()
+    return datasets.filter(rules)
+
+
+def apply_retention(user, keep_ids=()):
+    """
+    Delete the user's expired dataset records, except `keep_ids` (e.g. the
+    datasets just uploaded). Returns the deleted ids.
+    """
+    expired = expired_datasets(user).exclude(pk__in=keep_ids)
+    deleted_ids = list(expired.values_list('pk', flat=True))
+    if deleted_ids:
+        Dataset.objects.filter(pk__in=deleted_ids).only('pk').delete()
+        invalidate_user_responses(user.id, deleted_ids)
+    return deleted_ids
+
+
+def expire_chunked_uploads(now=None):
+    """Delete chunked uploads untouched for too long. Returns how many were deleted."""
+    cutoff = (now or timezone.now()) - timedelta(hours=settings.CHUNKED_UPLOAD_EXPIRY_HOURS)
+    deleted, _ = ChunkedUpload.objects.filter(updated_at__lt=cutoff).delete()
+    return deleted
+
+
+def referenced_files():
+    """Return the storage names of all files still used by a record."""
+    names = set()
+    for csv_name, columnar_name in Dataset.objects.values_list('csv_path', 'columnar_path'):
+        names.add(csv_name)
+        names.add(columnar_name)
+    names.update(IngestionJob.objects.values_list('upload', flat=True))
+    names.update(ChunkedUpload.objects.values_list('file', flat=True))
+    for dataset in Dataset.objects.only('id', 'upload_timestamp'):
+        names.add(report_name(dataset))
+        names.add(report_name(dataset, full=True))
+    names.discard('')
+    return names
+
+
+def unreferenced_files(grace_seconds=None):
+    """
+    Yield storage names under MANAGED_DIRS that no record refers to and that
+    were last modified more than `grace_seconds` ago. The grace period
+    protects files written by an ingest whose record is not saved yet.
+    """
+    if grace_seconds is None:
+        grace_seconds = settings.RETENTION_FILE_GRACE_SECONDS
+    cutoff = timezone.now() - timedelta(seconds=grace_seconds)
+    referenced = referenced_files()
+    
+    for directory in MANAGED_DIRS:
+        if not os.path.isdir(default_storage.path(directory)):
+            continue
+        _, filenames = default_storage.listdir(directory)
+        for filename in filenames:
+            name = f'{directory}/{filename}'
+            if name in referenced:
+                continue
+            if default_storage.get_modified_time(name) > cutoff:
+                continue
+            yield name
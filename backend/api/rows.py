@@ -0,0 +1,167 @@
+"""
+Row queries over a dataset's columnar copy.
+
+Rows are filtered, sorted, paginated and projected with pyarrow compute on
+the memory-mapped table, so a page costs only the columns it touches.
+"""
+import pyarrow.compute as pc
+
+from .utils import REQUIRED_COLUMNS, NUMERIC_COLUMNS
+
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Query parameter prefix for each numeric column's range filters,
+# e.g. ?flowrate_min=100&flowrate_max=200
+RANGE_FILTER_PARAMS = {col.lower(): col for col in NUMERIC_COLUMNS}
+
+
+class RowQuery:
+    """
+    Parsed parameters of a row request.
+    """
+    
+    def __init__(self, columns=None, ordering=None, types=None, ranges=None,
+                 offset=0, limit=DEFAULT_PAGE_SIZE):
+        self.columns = columns or list(REQUIRED_COLUMNS)
+        self.ordering = ordering or []
+        self.types = types or []
+        self.ranges = ranges or {}
+        self.offset = offset
+        self.limit = limit
+    
+    def referenced_columns(self):
+        """Columns that must be read to answer the query."""
+        needed = set(self.columns) | set(self.ranges) | {col for col, _ in self.ordering}
+        if self.types:
+            needed.add('Type')
+        return [col for col in REQUIRED_COLUMNS if col in needed]
+
+
+def _split(value):
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+
+def _parse_int(params, name, default, minimum, maximum=None):
+    raw = params.get(name)
+    if raw in (None, ''):
+        return default, None
+    try:
+        value = int(raw)
+    except ValueError:
+        return None, f"'{name}' must be an integer"
+    if value < minimum:
+        return None, f"'{name}' must be at least {minimum}"
+    if maximum is not None:
+        value = min(value, maximum)
+    return value, None
+
+
+def parse_row_query(params):
+    """
+    Parse request query parameters into a RowQuery.
+    
+    Supported parameters:
+        offset, limit           pagination (limit is capped at MAX_PAGE_SIZE)
+        columns                 comma-separated projection
+        ordering                comma-separated columns, '-' prefix for descending
+        type                    comma-separated equipment types to keep
+        <column>_min/_max       inclusive range filter on a numeric column
+    
+    Returns: (query, error)
+    """
+    offset, error = _parse_int(params, 'offset', 0, 0)
+    if error:
+        return None, error
+    limit, error = _parse_int(params, 'limit', DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+    if error:
+        return None, error
+    
+    columns = _split(params.get('columns', ''))
+    unknown = [col for col in columns if col not in REQUIRED_COLUMNS]
+    if unknown:
+        return None, f"Unknown columns: {', '.join(unknown)}"
+    
+    ordering = []
+    for field in _split(params.get('ordering', '')):
+        descending = field.startswith('-')
+        col = field.lstrip('-')
+        if col not in REQUIRED_COLUMNS:
+            return None, f"Cannot order by unknown column '{col}'"
+        ordering.append((col, 'descending' if descending else 'ascending'))
+    
+    ranges = {}
+    for prefix, col in RANGE_FILTER_PARAMS.items():
+        for bound in ('min', 'max'):
+            raw = params.get(f'{prefix}_{bound}')
+            if raw in (None, ''):
+                continue
+            try:
+                ranges.setdefault(col, {})[bound] = float(raw)
+            except ValueError:
+                return None, f"'{prefix}_{bound}' must be a number"
+    
+    query = RowQuery(
+        columns=columns,
+        ordering=ordering,
+        types=_split(params.get('type', '')),
+        ranges=ranges,
+        offset=offset,
+        limit=limit,
+    )
+    return query, None
+
+
+def filter_expression(query):
+    """Build a pyarrow filter expression for the query, or None."""
+    conditions = []
+    if query.types:
+        conditions.append(pc.field('Type').isin(query.types))
+    for col, bounds in query.ranges.items():
+        if 'min' in bounds:
+            conditions.append(pc.field(col) >= bounds['min'])
+        if 'max' in bounds:
+            conditions.append(pc.field(col) <= bounds['max'])
+    
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def query_rows(table, query):
+    """
+    Apply a RowQuery to a pyarrow Table.
+    Returns (page, total) where page is a Table with the projected columns
+    and total is the number of rows matching the filters.
+    """
+    expression = filter_expression(query)
+    if expression is not None:
+        table = table.filter(expression)
+    total = table.num_rows
+    
+    if query.ordering:
+        indices = pc.sort_indices(table, sort_keys=query.ordering, null_placement='at_end')
+        page_indices = indices.slice(query.offset, query.limit)
+        page = table.select(query.columns).take(page_indices)
+    else:
+        page = table.select(query.columns).slice(query.offset, query.limit)
+    
+    return page, total
+
+
+def rows_response(dataset, page, total, query):
+    """
+    Build the response fields for a page of rows other than the rows
+    themselves, which formats.format_rows adds in the negotiated format.
+    """
+    next_offset = query.offset + page.num_rows
+    return {
+        'dataset_id': dataset.id,
+        'count': total,
+        'offset': query.offset,
+        'limit': query.limit,
+        'next_offset': next_offset if next_offset < total else None,
+        'columns': query.columns,
+    }
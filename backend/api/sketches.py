@@ -0,0 +1,266 @@
+"""
+Mergeable summary sketches.
+
+A sketch holds enough state to rebuild summary statistics without the
+original rows: per-column count, sum, sum of squared deviations (m2),
+min, max and a t-digest for quantiles, plus the same moments per equipment
+type. Sketches from chunks, worker processes or whole datasets can be merged
+in time proportional to the sketch size, not the number of rows.
+
+Sketches are plain dicts of JSON-serializable values so they can be stored
+in Dataset.sketch_json.
+"""
+import numpy as np
+
+
+SKETCH_VERSION = 1
+
+# Upper bound on t-digest centroids is roughly DIGEST_COMPRESSION / 2
+DIGEST_COMPRESSION = 100
+
+
+def _optional_float(value):
+    """Convert a NumPy scalar to float, mapping NaN/inf to None."""
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+
+def _compress_centroids(means, weights, compression=DIGEST_COMPRESSION):
+    """
+    Merge sorted centroids into t-digest buckets.
+    
+    Each centroid is assigned to a bucket by the arcsine scale function of
+    its quantile position, which keeps buckets small near the tails, and
+    each bucket is collapsed to its weighted mean.
+    """
+    if len(means) <= compression // 2:
+        return means, weights
+    
+    total = weights.sum()
+    q = (np.cumsum(weights) - weights / 2) / total
+    k = np.floor(compression / (2 * np.pi) * np.arcsin(2 * q - 1))
+    starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+    bucket_weights = np.add.reduceat(weights, starts)
+    bucket_means = np.add.reduceat(means * weights, starts) / bucket_weights
+    return bucket_means, bucket_weights
+
+
+def digest_from_sorted(values, compression=DIGEST_COMPRESSION):
+    """Build a t-digest from sorted, NaN-free values."""
+    means, weights = _compress_centroids(
+        values, np.ones(len(values)), compression=compression
+    )
+    return _digest_to_list(means, weights)
+
+
+def merge_digests(*digests, compression=DIGEST_COMPRESSION):
+    """Merge t-digests given as [[mean, weight], ...] lists."""
+    centroids = [np.asarray(d, dtype=np.float64).reshape(-1, 2) for d in digests if d]
+    if not centroids:
+        return []
+    centroids = np.concatenate(centroids)
+    centroids = centroids[np.argsort(centroids[:, 0], kind='stable')]
+    means, weights = _compress_centroids(
+        centroids[:, 0], centroids[:, 1], compression=compression
+    )
+    return _digest_to_list(means, weights)
+
+
+def _digest_to_list(means, weights):
+    return [[float(m), float(w)] for m, w in zip(means, weights)]
+
+
+def digest_quantiles(digest, quantiles, minimum, maximum):
+    """
+    Estimate quantiles (fractions in [0, 1]) from a t-digest.
+    Interpolates between centroid centres, anchored at the exact min/max.
+    """
+    if not digest:
+        return [None] * len(quantiles)
+    centroids = np.asarray(digest, dtype=np.float64)
+    means, weights = centroids[:, 0], centroids[:, 1]
+    total = weights.sum()
+    centres = np.cumsum(weights) - weights / 2
+    positions = np.r_[0.0, centres, total]
+    values = np.r_[minimum, means, maximum]
+    return [float(v) for v in np.interp(np.asarray(quantiles) * total, positions, values)]
+
+
+def _moments(counts, sums, m2s, mins, maxs):
+    """Build per-column moment dicts from parallel arrays."""
+    return [
+        {
+            'count': int(counts[i]),
+            'sum': float(sums[i]),
+            'm2': float(m2s[i]),
+            'min': _optional_float(mins[i]),
+            'max': _optional_float(maxs[i]),
+        }
+        for i in range(len(counts))
+    ]
+
+
+def build_sketch(columns, names, type_codes, type_labels, sorted_columns=None):
+    """
+    Build a sketch from column arrays.
+    
+    `columns` is a (len(names), n) float64 array with one contiguous row per
+    column; `type_codes` maps each row to an index into `type_labels` (-1 for
+    a missing type). `sorted_columns`, if the caller already has it, is
+    `np.sort(columns, axis=1)` and is used for the digests.
+    """
+    n_columns, total_count = columns.shape
+    valid = ~np.isnan(columns)
+    has_nan = not valid.all()
+    
+    # Shift by a pilot value (the first row) so m2 does not lose precision
+    # when the spread is small relative to the mean
+    pilot = np.nan_to_num(columns[:, 0]) if total_count else np.zeros(n_columns)
+    shifted = columns - pilot[:, None]
+    if has_nan:
+        shifted[~valid] = 0.0
+    
+    counts = valid.sum(axis=1)
+    shifted_sums = shifted.sum(axis=1)
+    shifted_sumsq = np.einsum('ij,ij->i', shifted, shifted)
+    if total_count:
+        mins = np.fmin.reduce(columns, axis=1)
+        maxs = np.fmax.reduce(columns, axis=1)
+    else:
+        mins = maxs = np.full(n_columns, np.nan)
+    
+    if sorted_columns is None:
+        sorted_columns = np.sort(columns, axis=1)
+    
+    sketch_columns = {}
+    moments = _moments(
+        counts,
+        shifted_sums + counts * pilot,
+        _m2(shifted_sums, shifted_sumsq, counts),
+        mins,
+        maxs,
+    )
+    for i, name in enumerate(names):
+        # NaNs sort to the end, so the first `count` values are the valid ones
+        moments[i]['digest'] = digest_from_sorted(sorted_columns[i, :counts[i]])
+        sketch_columns[name] = moments[i]
+    
+    # Per-type moments: counts and sums come from bincount, and min/max from
+    # one stable sort by type code (small integer codes let NumPy use a radix
+    # sort) followed by segmented reductions
+    types = {}
+    keep = type_codes >= 0
+    if not keep.all():
+        type_codes = type_codes[keep]
+        columns, valid, shifted = columns[:, keep], valid[:, keep], shifted[:, keep]
+    
+    if len(type_codes):
+        n_types = len(type_labels)
+        row_counts = np.bincount(type_codes, minlength=n_types)
+        seg_counts = np.empty((n_columns, n_types))
+        seg_sums = np.empty_like(seg_counts)
+        seg_sumsq = np.empty_like(seg_counts)
+        for i in range(n_columns):
+            seg_counts[i] = np.bincount(type_codes, weights=valid[i], minlength=n_types) if has_nan else row_counts
+            seg_sums[i] = np.bincount(type_codes, weights=shifted[i], minlength=n_types)
+            seg_sumsq[i] = np.bincount(type_codes, weights=shifted[i] * shifted[i], minlength=n_types)
+        
+        code_dtype = np.int16 if n_types < 2 ** 15 else np.int32
+        order = np.argsort(type_codes.astype(code_dtype), kind='stable')
+        type_sorted = columns[:, order]
+        # Unused labels (e.g. empty categories) have no segment to reduce
+        present = np.flatnonzero(row_counts)
+        starts = np.r_[0, np.cumsum(row_counts[present])[:-1]]
+        seg_mins = np.fmin.reduceat(type_sorted, starts, axis=1)
+        seg_maxs = np.fmax.reduceat(type_sorted, starts, axis=1)
+        seg_m2 = _m2(seg_sums, seg_sumsq, seg_counts)
+        seg_sums = seg_sums + seg_counts * pilot[:, None]
+        
+        for j, k in enumerate(present):
+            type_moments = _moments(
+                seg_counts[:, k], seg_sums[:, k], seg_m2[:, k], seg_mins[:, j], seg_maxs[:, j]
+            )
+            types[str(type_labels[k])] = {
+                'count': int(row_counts[k]),
+                'columns': dict(zip(names, type_moments)),
+            }
+    
+    return {
+        'version': SKETCH_VERSION,
+        'count': int(total_count),
+        'columns': sketch_columns,
+        'types': types,
+    }
+
+
+def _m2(shifted_sums, shifted_sumsq, counts):
+    """Sum of squared deviations from the mean, from shifted sums."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        m2 = shifted_sumsq - np.where(counts > 0, shifted_sums ** 2 / counts, 0.0)
+    return np.maximum(m2, 0.0)
+
+
+def _merge_moments(a, b):
+    """Merge two moment dicts (Chan et al. parallel variance update)."""
+    if not a['count']:
+        return dict(b)
+    if not b['count']:
+        return dict(a)
+    count = a['count'] + b['count']
+    delta = b['sum'] / b['count'] - a['sum'] / a['count']
+    return {
+        'count': count,
+        'sum': a['sum'] + b['sum'],
+        'm2': a['m2'] + b['m2'] + delta * delta * a['count'] * b['count'] / count,
+        'min': min(v for v in (a['min'], b['min']) if v is not None),
+        'max': max(v for v in (a['max'], b['max']) if v is not None),
+    }
+
+
+def empty_sketch():
+    """Return the identity element for merge_sketches."""
+    return {'version': SKETCH_VERSION, 'count': 0, 'columns': {}, 'types': {}}
+
+
+def merge_sketches(*sketches):
+    """
+    Merge any number of sketches into a new one.
+    Cost depends on the number of columns, types and centroids, not rows.
+    """
+    merged = empty_sketch()
+    for sketch in sketches:
+        merged['count'] += sketch['count']
+        
+        for name, column in sketch['columns'].items():
+            current = merged['columns'].get(name)
+            if current is None:
+                merged['columns'][name] = dict(column)
+                continue
+            combined = _merge_moments(current, column)
+            combined['digest'] = merge_digests(current['digest'], column['digest'])
+            merged['columns'][name] = combined
+        
+        for label, type_sketch in sketch['types'].items():
+            current = merged['types'].get(label)
+            if current is None:
+                merged['types'][label] = {
+                    'count': type_sketch['count'],
+                    'columns': {k: dict(v) for k, v in type_sketch['columns'].items()},
+                }
+                continue
+            current['count'] += type_sketch['count']
+            for name, column in type_sketch['columns'].items():
+                if name in current['columns']:
+                    current['columns'][name] = _merge_moments(current['columns'][name], column)
+                else:
+                    current['columns'][name] = dict(column)
+    
+    return merged
+
+
+def moment_statistics(moments):
+    """Return mean and sample std (ddof=1) from a moment dict."""
+    count = moments['count']
+    mean = moments['sum'] / count if count else None
+    std = (moments['m2'] / (count - 1)) ** 0.5 if count > 1 else None
+    return mean, std
@@ -0,0 +1,121 @@
+"""
+Columnar storage for uploaded datasets.
+
+Each upload is converted once, at ingest, into an uncompressed Arrow IPC
+file stored next to the raw CSV. Readers memory-map the file and select only
+the columns they need, so later summaries, reports and row pages never
+re-parse CSV text.
+"""
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from .utils import REQUIRED_COLUMNS, CSV_DTYPES, coerce_numeric_columns
+
+
+COLUMNAR_UPLOAD_DIR = 'columnar'
+
+ARROW_SCHEMA = pa.schema([
+    ('Equipment Name', pa.string()),
+    ('Type', pa.string()),
+    ('Flowrate', pa.float64()),
+    ('Pressure', pa.float64()),
+    ('Temperature', pa.float64()),
+])
+
+
+def dataframe_to_batch(df):
+    """Convert a validated dataframe chunk to a record batch in ARROW_SCHEMA."""
+    arrays = []
+    for field in ARROW_SCHEMA:
+        column = df[field.name]
+        if pa.types.is_string(field.type):
+            column = column.astype('string')
+        arrays.append(pa.array(column, type=field.type, from_pandas=True))
+    return pa.RecordBatch.from_arrays(arrays, schema=ARROW_SCHEMA)
+
+
+class ColumnarWriter:
+    """
+    Incrementally write dataframe chunks to an Arrow IPC file in storage.
+    
+    Pass an instance as the `sink` of process_csv_file so the columnar copy
+    is produced from the same parse as the summary.
+    """
+    
+    def __init__(self, filename):
+        stem = os.path.splitext(os.path.basename(filename))[0] or 'dataset'
+        os.makedirs(default_storage.path(COLUMNAR_UPLOAD_DIR), exist_ok=True)
+        while True:
+            self.name = default_storage.get_available_name(f'{COLUMNAR_UPLOAD_DIR}/{stem}.arrow')
+            self.path = default_storage.path(self.name)
+            try:
+                # Claim the name so concurrent writers choose different ones
+                os.close(os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_EXCL))
+                break
+            except FileExistsError:
+                continue
+        self._writer = ipc.new_file(self.path, ARROW_SCHEMA)
+    
+    def write(self, df):
+        """Append a validated dataframe chunk."""
+        self._writer.write_batch(dataframe_to_batch(df))
+    
+    def write_table(self, table):
+        """Append a pyarrow Table already in ARROW_SCHEMA."""
+        self._writer.write_table(table)
+    
+    def close(self):
+        """Finish the file and return its storage name."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        return self.name
+    
+    def discard(self):
+        """Abandon the file, e.g. after a validation error."""
+        self.close()
+        default_storage.delete(self.name)
+
+
+def read_table(path, columns=None):
+    """
+    Memory-map an Arrow IPC file and return it as a pyarrow Table.
+    Selecting `columns` touches only those columns' pages.
+    """
+    source = pa.memory_map(path, 'r')
+    table = ipc.open_file(source).read_all()
+    if columns is not None:
+        table = table.select(columns)
+    return table
+
+
+def convert_csv_to_columnar(dataset):
+    """
+    Write the columnar copy for a dataset that only has its CSV, e.g. one
+    uploaded before columnar storage existed. Returns the storage name.
+    """
+    writer = ColumnarWriter(dataset.filename)
+    try:
+        with dataset.csv_path.open('rb') as f:
+            for chunk in pd.read_csv(f, chunksize=settings.CSV_CHUNK_SIZE, dtype=CSV_DTYPES):
+                writer.write(coerce_numeric_columns(chunk[REQUIRED_COLUMNS]))
+    except Exception:
+        writer.discard()
+        raise
+    return writer.close()
+
+
+def load_dataset_table(dataset, columns=None):
+    """
+    Return a dataset's rows as a memory-mapped pyarrow Table.
+    Datasets without a columnar copy are converted on first access.
+    """
+    if not dataset.columnar_path:
+        dataset.columnar_path.name = convert_csv_to_columnar(dataset)
+        dataset.save(update_fields=['columnar_path'])
+    return read_table(dataset.columnar_path.path, columns=columns)
@@ -1,15 +1,55 @@
-from django.test import TestCase
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
 from django.contrib.auth.models import User
 from rest_framework.test import APIClient
 from rest_framework.authtoken.models import Token
-from .models import Dataset
-from .utils import validate_csv_columns, calculate_summary, process_csv_file
+from .models import ChunkedUpload, Dataset, EquipmentRecord, IngestionJob
+from .utils import validate_csv_columns, calculate_summary, process_csv_file, merge_summaries
+from .sketches import merge_sketches, digest_quantiles
+from .aggregates import aggregate_table, parse_aggregate_query
+from .downsample import lttb
+from .reports import (STYLES, FlowableQueue, get_report_path, report_name, rows_table,
+                      summary_report_elements)
+from reportlab.platypus import Paragraph, SimpleDocTemplate
+from .response_cache import (aggregate_key, get_response_cache, invalidate_user_responses,
+                             series_key)
+from .records import records_for, store_equipment_records
+from .retention import apply_retention, expire_chunked_uploads, unreferenced_files
+from .storage import load_dataset_table
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+from datetime import timedelta
 from io import StringIO, BytesIO
+from concurrent.futures import Future
+from unittest.mock import Mock, patch
+import gzip
+import hashlib
+import json
 import tempfile
+import time
 import os
+import zipfile
 
 
+# Tests keep responses in memory rather than in the on-disk cache, which
+# would outlive the test database
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-responses',
+    },
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
 class CSVProcessingTests(TestCase):
     """Tests for CSV processing and validation."""
     
@@ -19,15 +59,15 @@ class CSVProcessingTests(TestCase):
 Pump-A1,Pump,150.5,45.2,85.3
 Reactor-R1,Reactor,200.0,120.5,350.0
 Heat Exchanger-HX1,Heat Exchanger,180.3,35.8,120.5"""
-        
+
         self.invalid_csv_missing_column = """Equipment Name,Type,Flowrate,Pressure
 Pump-A1,Pump,150.5,45.2
 Reactor-R1,Reactor,200.0,120.5"""
-        
+
         self.invalid_csv_non_numeric = """Equipment Name,Type,Flowrate,Pressure,Temperature
 Pump-A1,Pump,abc,45.2,85.3
 Reactor-R1,Reactor,200.0,120.5,350.0"""
-    
+
     def test_validate_csv_columns_valid(self):
         """Test CSV column validation with valid columns."""
         df = pd.read_csv(StringIO(self.valid_csv_data))
@@ -55,6 +95,100 @@ Reactor-R1,Reactor,200.0,120.5,350.0"""
         self.assertEqual(summary['type_distribution']['Reactor'], 1)
         self.assertEqual(summary['type_distribution']['Heat Exchanger'], 1)
     
+    def test_calculate_summary_statistics(self):
+        """Test extended statistics match pandas."""
+        df = pd.read_csv(StringIO(self.valid_csv_data))
+        stats = calculate_summary(df)['statistics']
+        
+        for col in ('Flowrate', 'Pressure', 'Temperature'):
+            self.assertEqual(stats[col]['count'], 3)
+            self.assertAlmostEqual(stats[col]['min'], df[col].min())
+            self.assertAlmostEqual(stats[col]['max'], df[col].max())
+            self.assertAlmostEqual(stats[col]['std'], df[col].std())
+            self.assertAlmostEqual(stats[col]['p25'], df[col].quantile(0.25))
+            self.assertAlmostEqual(stats[col]['p50'], df[col].median())
+            self.assertAlmostEqual(stats[col]['p75'], df[col].quantile(0.75))
+    
+    def test_calculate_summary_type_statistics(self):
+        """Test per-type aggregates match a pandas groupby."""
+        csv_data = self.valid_csv_data + "\nPump-A2,Pump,120.0,40.0,80.0"
+        df = pd.read_csv(StringIO(csv_data))
+        type_stats = calculate_summary(df)['type_statistics']
+        expected = df.groupby('Type')['Flowrate'].agg(['mean', 'min', 'max', 'std'])
+        
+        self.assertEqual(type_stats['Pump']['count'], 2)
+        for stat in ('mean', 'min', 'max', 'std'):
+            self.assertAlmostEqual(type_stats['Pump']['Flowrate'][stat], expected.loc['Pump', stat])
+        # A single row has no sample standard deviation
+        self.assertIsNone(type_stats['Reactor']['Flowrate']['std'])
+    
+    def test_calculate_summary_ignores_missing_values(self):
+        """Test missing values are skipped like pandas does."""
+        csv_data = self.valid_csv_data + "\nPump-A2,,,40.0,80.0"
+        df = pd.read_csv(StringIO(csv_data))
+        summary = calculate_summary(df)
+        
+        self.assertEqual(summary['total_count'], 4)
+        self.assertEqual(summary['statistics']['Flowrate']['count'], 3)
+        self.assertAlmostEqual(summary['avg_flowrate'], df['Flowrate'].mean())
+        self.assertAlmostEqual(summary['statistics']['Flowrate']['p50'], df['Flowrate'].median())
+        self.assertEqual(sum(summary['type_distribution'].values()), 3)
+    
+    def test_summary_includes_sketch(self):
+        """Test the summary carries a sketch consistent with its statistics."""
+        df = pd.read_csv(StringIO(self.valid_csv_data))
+        summary = calculate_summary(df)
+        sketch = summary['sketch']
+        
+        self.assertEqual(sketch['count'], 3)
+        self.assertAlmostEqual(sketch['columns']['Flowrate']['sum'], df['Flowrate'].sum())
+        self.assertEqual(sketch['columns']['Flowrate']['min'], df['Flowrate'].min())
+        self.assertEqual(sketch['types']['Pump']['count'], 1)
+    
+    def test_merged_sketches_match_full_summary(self):
+        """Test merging sketches of parts reproduces the whole."""
+        rng = np.random.default_rng(0)
+        rows = 5000
+        df = pd.DataFrame({
+            'Equipment Name': 'Unit',
+            'Type': rng.choice(['Pump', 'Valve', 'Reactor'], rows),
+            'Flowrate': rng.normal(150.0, 20.0, rows),
+            'Pressure': rng.normal(5.0, 1.0, rows),
+            'Temperature': rng.normal(350.0, 0.01, rows),
+        })
+        full = calculate_summary(df)
+        merged = merge_summaries([
+            calculate_summary(df.iloc[:1000]),
+            calculate_summary(df.iloc[1000:3500]),
+            calculate_summary(df.iloc[3500:]),
+        ])
+        
+        self.assertEqual(merged['total_count'], rows)
+        self.assertEqual(merged['type_distribution'], full['type_distribution'])
+        for col in ('Flowrate', 'Pressure', 'Temperature'):
+            for stat in ('mean', 'min', 'max'):
+                self.assertAlmostEqual(merged['statistics'][col][stat], full['statistics'][col][stat])
+            self.assertAlmostEqual(merged['statistics'][col]['std'], full['statistics'][col]['std'], places=9)
+            # Percentiles come from the merged t-digest
+            spread = full['statistics'][col]['std']
+            self.assertAlmostEqual(merged['statistics'][col]['p50'], full['statistics'][col]['p50'],
+                                   delta=0.05 * spread)
+        self.assertAlmostEqual(merged['type_statistics']['Pump']['Flowrate']['std'],
+                               full['type_statistics']['Pump']['Flowrate']['std'])
+    
+    def test_repeated_merges_keep_digest_bounded(self):
+        """Test repeated merges keep the digest bounded."""
+        df = pd.read_csv(StringIO(self.valid_csv_data))
+        sketch = calculate_summary(df)['sketch']
+        merged = merge_sketches(*([sketch] * 200))
+        
+        self.assertEqual(merged['count'], 600)
+        self.assertLessEqual(len(merged['columns']['Flowrate']['digest']), 60)
+        p50 = digest_quantiles(merged['columns']['Flowrate']['digest'], [0.5],
+                               merged['columns']['Flowrate']['min'],
+                               merged['columns']['Flowrate']['max'])[0]
+        self.assertAlmostEqual(p50, df['Flowrate'].median(), delta=1.0)
+    
     def test_process_csv_file_valid(self):
         """Test processing valid CSV file."""
         csv_file = BytesIO(self.valid_csv_data.encode())
@@ -92,8 +226,40 @@ Reactor-R1,Reactor,200.0,120.5,350.0"""
         self.assertIsNone(data)
         self.assertIsNone(summary)
         self.assertIsNotNone(error)
+    
+    def test_process_csv_file_chunked_matches_full(self):
+        """Test streaming mode produces the same summary without rows."""
+        _, full_summary, _ = process_csv_file(BytesIO(self.valid_csv_data.encode()))
+        data, summary, error = process_csv_file(
+            BytesIO(self.valid_csv_data.encode()), chunksize=2
+        )
+        
+        self.assertIsNone(error)
+        self.assertIsNone(data)
+        self.assertEqual(summary['total_count'], 3)
+        self.assertEqual(summary['type_distribution'], full_summary['type_distribution'])
+        for key in ('avg_flowrate', 'avg_pressure', 'avg_temperature'):
+            self.assertAlmostEqual(summary[key], full_summary[key])
+        self.assertEqual(summary['type_statistics'].keys(), full_summary['type_statistics'].keys())
+    
+    def test_process_csv_file_chunked_missing_columns(self):
+        """Test streaming mode validates columns."""
+        csv_file = BytesIO(self.invalid_csv_missing_column.encode())
+        data, summary, error = process_csv_file(csv_file, chunksize=1)
+        
+        self.assertIsNone(summary)
+        self.assertIn('Missing required columns', error)
+    
+    def test_process_csv_file_chunked_non_numeric_in_later_chunk(self):
+        """Test streaming mode rejects non-numeric values after the first chunk."""
+        csv_data = self.valid_csv_data + "\nPump-B2,Pump,abc,1.0,2.0"
+        data, summary, error = process_csv_file(BytesIO(csv_data.encode()), chunksize=2)
+        
+        self.assertIsNone(summary)
+        self.assertIn('Flowrate', error)
 
 
+@override_settings(CACHES=TEST_CACHES)
 class AuthenticationTests(TestCase):
     """Tests for authentication functionality."""
     
@@ -159,6 +325,7 @@ class AuthenticationTests(TestCase):
         self.assertEqual(response.status_code, 200)
 
 
+@override_settings(CACHES=TEST_CACHES)
 class UploadWorkflowTests(TestCase):
     """Integration tests for upload workflow."""
     
@@ -175,7 +342,7 @@ class UploadWorkflowTests(TestCase):
         self.csv_content = """Equipment Name,Type,Flowrate,Pressure,Temperature
 Pump-A1,Pump,150.5,45.2,85.3
 Reactor-R1,Reactor,200.0,120.5,350.0"""
-    
+
     def test_complete_upload_flow(self):
         """Test complete upload flow from file to database."""
         # Create temporary CSV file
@@ -245,3 +412,2143 @@ Reactor-R1,Reactor,200.0,120.5,350.0"""
             self.assertEqual(dataset['id'], upload_response.data['dataset_id'])
         finally:
             os.unlink(temp_path)
+    
+    def test_summaries_leave_out_sketch(self):
+        """Test API summaries hold only the statistics; the sketch is stored apart."""
+        csv_file = BytesIO(self.csv_content.encode())
+        csv_file.name = 'test.csv'
+        upload = self.client.post('/api/upload/', {'file': csv_file}, format='multipart')
+        dataset_id = upload.data['dataset_id']
+        summary = self.client.get(f'/api/summary/{dataset_id}/').data['summary']
+        history = self.client.get('/api/history/').data['datasets'][0]['summary']
+        
+        for body in (upload.data['summary'], summary, history):
+            self.assertNotIn('sketch', body)
+        dataset = Dataset.objects.get(id=dataset_id)
+        self.assertNotIn('sketch', dataset.summary_json)
+        self.assertEqual(dataset.sketch_json['count'], 2)
+    
+    @override_settings(CSV_STREAMING_THRESHOLD=0, CSV_CHUNK_SIZE=1)
+    def test_large_upload_uses_streaming_mode(self):
+        """Test uploads above the streaming threshold omit rows."""
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
+            f.write(self.csv_content)
+            temp_path = f.name
+        
+        try:
+            with open(temp_path, 'rb') as f:
+                response = self.client.post('/api/upload/', {
+                    'file': f
+                }, format='multipart')
+            
+            self.assertEqual(response.status_code, 201)
+            self.assertFalse(response.data['data_included'])
+            self.assertEqual(response.data['data'], [])
+            self.assertEqual(response.data['summary']['total_count'], 2)
+        finally:
+            os.unlink(temp_path)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), CACHES=TEST_CACHES)
+class ColumnarStorageTests(TestCase):
+    """Tests for the columnar copy written at ingest."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        
+        self.csv_content = b"""Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-A1,Pump,150.5,45.2,85.3
+Reactor-R1,Reactor,200.0,120.5,350.0
+Valve-V1,Valve,60.0,,90.0"""
+
+    def upload(self, content=None):
+        """Upload CSV content and return the response."""
+        csv_file = BytesIO(content or self.csv_content)
+        csv_file.name = 'equipment.csv'
+        return self.client.post('/api/upload/', {'file': csv_file}, format='multipart')
+    
+    def test_upload_writes_columnar_file(self):
+        """Test upload stores a typed columnar copy of the rows."""
+        response = self.upload()
+        dataset = Dataset.objects.get(id=response.data['dataset_id'])
+        
+        self.assertTrue(dataset.columnar_path.name.endswith('.arrow'))
+        table = load_dataset_table(dataset)
+        self.assertEqual(table.num_rows, 3)
+        self.assertEqual(str(table.schema.field('Flowrate').type), 'double')
+        self.assertEqual(table.column('Type').to_pylist(), ['Pump', 'Reactor', 'Valve'])
+        self.assertIsNone(table.column('Pressure').to_pylist()[2])
+    
+    @override_settings(CSV_STREAMING_THRESHOLD=0, CSV_CHUNK_SIZE=2)
+    def test_streaming_upload_writes_all_chunks(self):
+        """Test streaming mode writes every chunk to the columnar copy."""
+        response = self.upload()
+        dataset = Dataset.objects.get(id=response.data['dataset_id'])
+        
+        table = load_dataset_table(dataset, columns=['Flowrate'])
+        self.assertEqual(table.column_names, ['Flowrate'])
+        self.assertEqual(table.column('Flowrate').to_pylist(), [150.5, 200.0, 60.0])
+    
+    def test_invalid_upload_leaves_no_columnar_file(self):
+        """Test a rejected upload does not leave a columnar file behind."""
+        response = self.upload(b"Equipment Name,Type\nPump-A1,Pump")
+        self.assertEqual(response.status_code, 400)
+        
+        columnar_dir = os.path.join(settings.MEDIA_ROOT, 'columnar')
+        self.assertEqual(os.listdir(columnar_dir) if os.path.isdir(columnar_dir) else [], [])
+    
+    def test_legacy_dataset_converted_on_first_read(self):
+        """Test datasets without a columnar copy are converted lazily."""
+        response = self.upload()
+        dataset = Dataset.objects.get(id=response.data['dataset_id'])
+        dataset.columnar_path.delete()
+        dataset.refresh_from_db()
+        
+        table = load_dataset_table(dataset, columns=['Equipment Name'])
+        self.assertEqual(table.num_rows, 3)
+        dataset.refresh_from_db()
+        self.assertTrue(dataset.columnar_path)
+    
+    @override_settings(CSV_CHUNK_SIZE=2)
+    def test_legacy_conversion_reads_in_configured_chunks(self):
+        """Test converting a legacy dataset reads CSV_CHUNK_SIZE rows at a time."""
+        response = self.upload()
+        dataset = Dataset.objects.get(id=response.data['dataset_id'])
+        dataset.columnar_path.delete()
+        dataset.refresh_from_db()
+        
+        table = load_dataset_table(dataset, columns=['Flowrate'])
+        self.assertEqual([len(batch) for batch in table.to_batches()], [2, 1])
+        self.assertEqual(table.column('Flowrate').to_pylist(), [150.5, 200.0, 60.0])
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), CACHES=TEST_CACHES)
+class DatasetRowsTests(TestCase):
+    """Tests for the paginated rows endpoint."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        
+        csv_file = BytesIO(b"""Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-A1,Pump,150.5,45.2,85.3
+Reactor-R1,Reactor,200.0,120.5,350.0
+Pump-A2,Pump,120.0,40.0,80.0
+Valve-V1,Valve,60.0,10.0,90.0
+Pump-A3,Pump,170.0,50.0,95.0""")
+        csv_file.name = 'equipment.csv'
+        response = self.client.post('/api/upload/', {
+            'file': csv_file,
+            'include_data': 'false'
+        }, format='multipart')
+        self.upload_response = response
+        self.url = f"/api/datasets/{response.data['dataset_id']}/rows/"
+    
+    def test_upload_can_omit_rows(self):
+        """Test include_data=false returns only metadata and summary."""
+        self.assertEqual(self.upload_response.status_code, 201)
+        self.assertFalse(self.upload_response.data['data_included'])
+        self.assertEqual(self.upload_response.data['data'], [])
+        self.assertEqual(self.upload_response.data['summary']['total_count'], 5)
+    
+    def test_offset_pagination(self):
+        """Test pages follow next_offset until exhausted."""
+        response = self.client.get(self.url, {'limit': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(len(response.data['rows']), 2)
+        self.assertEqual(response.data['next_offset'], 2)
+        
+        response = self.client.get(self.url, {'limit': 2, 'offset': 4})
+        self.assertEqual([row['Equipment Name'] for row in response.data['rows']], ['Pump-A3'])
+        self.assertIsNone(response.data['next_offset'])
+    
+    def test_column_projection(self):
+        """Test only the requested columns are returned."""
+        response = self.client.get(self.url, {'columns': 'Equipment Name,Flowrate', 'limit': 1})
+        
+        self.assertEqual(response.data['columns'], ['Equipment Name', 'Flowrate'])
+        self.assertEqual(response.data['rows'], [{'Equipment Name': 'Pump-A1', 'Flowrate': 150.5}])
+    
+    def test_filter_and_ordering(self):
+        """Test type and range filters combine with server-side ordering."""
+        response = self.client.get(self.url, {
+            'type': 'Pump',
+            'flowrate_min': 130,
+            'ordering': '-Flowrate',
+            'columns': 'Equipment Name',
+        })
+        
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual([row['Equipment Name'] for row in response.data['rows']],
+                         ['Pump-A3', 'Pump-A1'])
+    
+    def test_invalid_parameters(self):
+        """Test bad parameters return 400."""
+        self.assertEqual(self.client.get(self.url, {'columns': 'Colour'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'ordering': '-Colour'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'limit': 'many'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'pressure_max': 'high'}).status_code, 400)
+    
+    def test_other_users_dataset_not_found(self):
+        """Test rows of another user's dataset are not exposed."""
+        other = User.objects.create_user(username='other', password='otherpass123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=other).key}')
+        
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), CACHES=TEST_CACHES)
+class RowFormatTests(TestCase):
+    """Tests for the columnar JSON and Arrow row formats."""
+    
+    CSV = b"""Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-A1,Pump,150.5,45.2,85.3
+Reactor-R1,Reactor,200.0,,350.0
+Valve-V1,Valve,60.0,10.0,90.0"""
+
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        
+        response = self.upload()
+        self.url = f"/api/datasets/{response.data['dataset_id']}/rows/"
+    
+    def upload(self, **extra):
+        csv_file = BytesIO(self.CSV)
+        csv_file.name = 'equipment.csv'
+        return self.client.post('/api/upload/', {'file': csv_file}, format='multipart', **extra)
+    
+    def read_arrow(self, response):
+        return pa.ipc.open_stream(response.content).read_all()
+    
+    def test_json_records_by_default(self):
+        """Test plain JSON clients still get a list of records."""
+        response = self.client.get(self.url, {'columns': 'Equipment Name,Pressure'})
+        
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.data['rows'][1], {'Equipment Name': 'Reactor-R1', 'Pressure': None})
+    
+    def test_columnar_json(self):
+        """Test the columnar media type returns one array per column."""
+        response = self.client.get(
+            self.url, {'columns': 'Equipment Name,Pressure'},
+            HTTP_ACCEPT='application/vnd.equipment.columnar+json'
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/vnd.equipment.columnar+json')
+        body = json.loads(response.content)
+        self.assertEqual(body['rows'], {
+            'Equipment Name': ['Pump-A1', 'Reactor-R1', 'Valve-V1'],
+            'Pressure': [45.2, None, 10.0],
+        })
+        self.assertEqual(body['count'], 3)
+    
+    def test_arrow_stream(self):
+        """Test the Arrow media type returns the page and its metadata."""
+        response = self.client.get(
+            self.url, {'limit': 2, 'ordering': '-Flowrate'},
+            HTTP_ACCEPT='application/vnd.apache.arrow.stream'
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/vnd.apache.arrow.stream')
+        table = self.read_arrow(response)
+        self.assertEqual(table.column('Equipment Name').to_pylist(), ['Reactor-R1', 'Pump-A1'])
+        self.assertEqual(table.column('Pressure').to_pylist(), [None, 45.2])
+        metadata = json.loads(table.schema.metadata[b'response'])
+        self.assertEqual(metadata['count'], 3)
+        self.assertEqual(metadata['next_offset'], 2)
+    
+    def test_format_query_parameter(self):
+        """Test ?format= selects a format without an Accept header."""
+        response = self.client.get(self.url, {'format': 'arrow'})
+        
+        self.assertEqual(self.read_arrow(response).num_rows, 3)
+    
+    def test_errors_stay_json(self):
+        """Test error bodies are JSON whatever format was asked for."""
+        response = self.client.get(
+            self.url, {'columns': 'Colour'},
+            HTTP_ACCEPT='application/vnd.apache.arrow.stream'
+        )
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertIn('error', json.loads(response.content))
+    
+    def test_upload_formats(self):
+        """Test the upload response returns its rows in the negotiated format."""
+        response = self.upload(HTTP_ACCEPT='application/vnd.equipment.columnar+json')
+        self.assertEqual(response.status_code, 201)
+        body = json.loads(response.content)
+        self.assertEqual(body['data']['Flowrate'], [150.5, 200.0, 60.0])
+        self.assertEqual(body['summary']['total_count'], 3)
+        
+        response = self.upload(HTTP_ACCEPT='application/vnd.apache.arrow.stream')
+        self.assertEqual(response.status_code, 201)
+        table = self.read_arrow(response)
+        self.assertEqual(table.num_rows, 3)
+        self.assertTrue(json.loads(table.schema.metadata[b'response'])['data_included'])
+    
+    def test_smaller_payloads(self):
+        """Test both formats are several times smaller than records for many rows."""
+        rows = ['Equipment Name,Type,Flowrate,Pressure,Temperature']
+        rows += [f'Pump-{i},Pump,{100 + i % 50}.5,{40 + i % 7}.25,{80 + i % 11}.75' for i in range(2000)]
+        csv_file = BytesIO('\n'.join(rows).encode())
+        csv_file.name = 'large.csv'
+        dataset_id = self.client.post(
+            '/api/upload/', {'file': csv_file, 'include_data': 'false'}, format='multipart'
+        ).data['dataset_id']
+        url = f'/api/datasets/{dataset_id}/rows/'
+        
+        sizes = {
+            accept: len(self.client.get(url, {'limit': 2000}, HTTP_ACCEPT=accept).content)
+            for accept in ('application/json', 'application/vnd.equipment.columnar+json',
+                           'application/vnd.apache.arrow.stream')
+        }
+        records = sizes['application/json']
+        self.assertLess(sizes['application/vnd.equipment.columnar+json'] * 2, records)
+        self.assertLess(sizes['application/vnd.apache.arrow.stream'] * 2, records)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), CACHES=TEST_CACHES)
+class AggregateTests(TestCase):
+    """Tests for the aggregate query endpoint."""
+    
+    def setUp(self):
+        """Set up test data."""
+        get_response_cache().clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        
+        csv_file = BytesIO(b"""Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-A1,Pump,150.5,45.2,85.3
+Reactor-R1,Reactor,200.0,120.5,350.0
+Pump-A2,Pump,120.0,40.0,80.0
+Valve-V1,Valve,60.0,,90.0
+Pump-A3,Pump,170.0,50.0,95.0
+Mixer-M1,,80.0,20.0,70.0""")
+        csv_file.name = 'equipment.csv'
+        response = self.client.post('/api/upload/', {'file': csv_file}, format='multipart')
+        self.url = f"/api/datasets/{response.data['dataset_id']}/aggregate/"
+    
+    def aggregate(self, body):
+        return self.client.post(self.url, body, format='json')
+    
+    def test_default_metrics_over_all_rows(self):
+        """Test an empty query returns one group with the default metrics."""
+        response = self.aggregate({})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 6)
+        self.assertEqual(len(response.data['groups']), 1)
+        
+        group = response.data['groups'][0]
+        self.assertEqual(group['key'], {})
+        flowrate = [150.5, 200.0, 120.0, 60.0, 170.0, 80.0]
+        stats = group['statistics']['Flowrate']
+        self.assertEqual(stats['count'], 6)
+        self.assertAlmostEqual(stats['mean'], np.mean(flowrate))
+        self.assertAlmostEqual(stats['std'], np.std(flowrate, ddof=1))
+        self.assertEqual(stats['min'], 60.0)
+        self.assertEqual(group['statistics']['Pressure']['count'], 5)
+    
+    def test_group_by_type_with_percentiles(self):
+        """Test grouping by type with percentile metrics; missing type sorts last."""
+        response = self.aggregate({
+            'group_by': ['Type'],
+            'metrics': ['count', 'median', 'p90'],
+            'columns': ['Flowrate'],
+        })
+        self.assertEqual(response.status_code, 200)
+        
+        groups = response.data['groups']
+        self.assertEqual([g['key']['Type'] for g in groups], ['Pump', 'Reactor', 'Valve', None])
+        pump = groups[0]
+        self.assertEqual(pump['count'], 3)
+        self.assertEqual(list(pump['statistics']), ['Flowrate'])
+        self.assertEqual(pump['statistics']['Flowrate']['p50'], 150.5)
+        self.assertAlmostEqual(pump['statistics']['Flowrate']['p90'],
+                               np.percentile([150.5, 120.0, 170.0], 90))
+    
+    def test_percentiles_skip_missing_values(self):
+        """Test a group whose values are all missing has null percentiles."""
+        response = self.aggregate({
+            'group_by': 'Type',
+            'metrics': 'count,mean,p50',
+            'columns': 'Pressure',
+            'filters': {'Type': ['Valve', 'Pump']},
+        })
+        groups = {g['key']['Type']: g['statistics']['Pressure'] for g in response.data['groups']}
+        
+        self.assertEqual(groups['Valve'], {'count': 0, 'mean': None, 'p50': None})
+        self.assertEqual(groups['Pump']['p50'], 45.2)
+    
+    def test_filters(self):
+        """Test type and range filters apply before aggregation."""
+        response = self.aggregate({
+            'metrics': ['count', 'max'],
+            'columns': ['Flowrate'],
+            'filters': {'Type': ['Pump', 'Reactor'], 'Flowrate': {'min': 130, 'max': 190}},
+        })
+        
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(response.data['groups'][0]['statistics']['Flowrate']['max'], 170.0)
+    
+    def test_matches_pandas_on_random_data(self):
+        """Test vectorized group statistics agree with pandas."""
+        rng = np.random.default_rng(3)
+        df = pd.DataFrame({
+            'Equipment Name': [f'E{i}' for i in range(2000)],
+            'Type': rng.choice(['Pump', 'Valve', 'Reactor', 'Mixer'], 2000),
+            'Flowrate': rng.normal(100, 20, 2000),
+            'Pressure': rng.normal(50, 5, 2000),
+            'Temperature': rng.normal(300, 30, 2000),
+        })
+        df.loc[rng.choice(2000, 100, replace=False), 'Pressure'] = np.nan
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        query, error = parse_aggregate_query({'group_by': ['Type'], 'metrics': ['mean', 'std', 'p5', 'p75']})
+        self.assertIsNone(error)
+        
+        body, error = aggregate_table(table, query)
+        self.assertIsNone(error)
+        expected = df.groupby('Type')
+        for group in body['groups']:
+            label = group['key']['Type']
+            for col in ('Flowrate', 'Pressure'):
+                values = expected.get_group(label)[col].dropna()
+                stats = group['statistics'][col]
+                self.assertAlmostEqual(stats['mean'], values.mean())
+                self.assertAlmostEqual(stats['std'], values.std())
+                self.assertAlmostEqual(stats['p5'], values.quantile(0.05))
+                self.assertAlmostEqual(stats['p75'], values.quantile(0.75))
+    
+    def test_results_memoized_per_signature(self):
+        """Test an equivalent query is answered without reading the table."""
+        with patch('api.views.load_dataset_table', wraps=load_dataset_table) as load:
+            first = self.aggregate({'group_by': ['Type'], 'metrics': ['mean', 'p50']})
+            second = self.aggregate({'metrics': ['p50', 'mean'], 'group_by': 'Type'})
+            self.assertEqual(load.call_count, 1)
+            
+            self.aggregate({'group_by': ['Type'], 'metrics': ['mean']})
+            self.assertEqual(load.call_count, 2)
+        self.assertEqual(second.data['groups'], first.data['groups'])
+    
+    def test_group_limit(self):
+        """Test queries producing too many groups are rejected."""
+        with patch('api.aggregates.MAX_GROUPS', 3):
+            response = self.aggregate({'group_by': ['Equipment Name']})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('groups', response.data['error'])
+    
+    def test_invalid_queries(self):
+        """Test bad query bodies return 400."""
+        for body in (
+            {'group_by': ['Flowrate']},
+            {'metrics': ['mode']},
+            {'metrics': ['p101']},
+            {'columns': ['Type']},
+            {'filters': {'Colour': ['red']}},
+            {'filters': {'Flowrate': {'min': 'low'}}},
+            {'filters': {'Flowrate': 10}},
+            {'metrics': 5},
+            [1, 2],
+            'Type',
+        ):
+            response = self.aggregate(body)
+            self.assertEqual(response.status_code, 400, body)
+    
+    def test_other_users_dataset_not_found(self):
+        """Test another user's dataset cannot be aggregated."""
+        self.aggregate({})
+        other = User.objects.create_user(username='other', password='otherpass123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=other).key}')
+        self.assertEqual(self.aggregate({}).status_code, 404)
+
+
+def reference_lttb(y, threshold):
+    """Straightforward LTTB over (index, value) points, for comparison."""
+    n = len(y)
+    every = (n - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_start, next_end = end, min(int((i + 2) * every) + 1, n)
+        if i == threshold - 3:
+            next_start, next_end = n - 1, n
+        avg_x = sum(range(next_start, next_end)) / (next_end - next_start)
+        avg_y = sum(y[next_start:next_end]) / (next_end - next_start)
+        areas = [abs((a - avg_x) * (y[b] - y[a]) - (a - b) * (avg_y - y[a]))
+                 for b in range(start, end)]
+        a = start + areas.index(max(areas))
+        selected.append(a)
+    selected.append(n - 1)
+    return selected
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), CACHES=TEST_CACHES)
+class SeriesTests(TestCase):
+    """Tests for the downsampled series endpoint."""
+    
+    def setUp(self):
+        """Set up test data."""
+        get_response_cache().clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        
+        rng = np.random.default_rng(11)
+        n = 5000
+        self.df = pd.DataFrame({
+            'Equipment Name': [f'E{i}' for i in range(n)],
+            'Type': 'Pump',
+            'Flowrate': np.sin(np.linspace(0, 12, n)) * 50 + 100 + rng.normal(0, 1, n),
+            'Pressure': rng.normal(50, 5, n),
+            'Temperature': rng.normal(300, 30, n),
+        })
+        self.df.loc[1234, 'Flowrate'] = 500.0
+        self.df.loc[10:19, 'Pressure'] = np.nan
+        csv_file = BytesIO(self.df.to_csv(index=False).encode())
+        csv_file.name = 'equipment.csv'
+        response = self.client.post('/api/upload/', {'file': csv_file}, format='multipart')
+        self.url = f"/api/datasets/{response.data['dataset_id']}/series/"
+    
+    def test_lttb_keeps_shape_and_spikes(self):
+        """Test LTTB returns the requested points, including endpoints and spikes."""
+        response = self.client.get(self.url, {'points': 200})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['method'], 'lttb')
+        self.assertEqual(response.data['total_points'], 5000)
+        
+        flowrate = response.data['columns']['Flowrate']
+        self.assertEqual(len(flowrate['x']), 200)
+        self.assertEqual((flowrate['x'][0], flowrate['x'][-1]), (0, 4999))
+        self.assertIn(1234, flowrate['x'])
+        self.assertEqual(flowrate['x'], sorted(flowrate['x']))
+        np.testing.assert_allclose(flowrate['y'], self.df['Flowrate'][flowrate['x']])
+    
+    def test_lttb_matches_reference(self):
+        """Test the vectorized LTTB picks the same points as a plain implementation."""
+        y = self.df['Flowrate'].to_numpy()
+        for threshold in (3, 10, 257):
+            self.assertEqual(lttb(y, threshold).tolist(), reference_lttb(y, threshold))
+    
+    def test_minmax_keeps_extremes(self):
+        """Test min/max bucketing keeps each bucket's extremes."""
+        response = self.client.get(self.url, {'method': 'minmax', 'points': 100, 'columns': 'Flowrate'})
+        flowrate = response.data['columns']['Flowrate']
+        
+        self.assertEqual(list(response.data['columns']), ['Flowrate'])
+        self.assertLessEqual(len(flowrate['x']), 100)
+        self.assertIn(self.df['Flowrate'].max(), flowrate['y'])
+        self.assertIn(self.df['Flowrate'].min(), flowrate['y'])
+    
+    def test_missing_values_skipped(self):
+        """Test missing values are dropped and points keep their row index."""
+        response = self.client.get(self.url, {'points': 10000, 'columns': 'Pressure'})
+        pressure = response.data['columns']['Pressure']
+        
+        self.assertEqual(len(pressure['x']), 4990)
+        self.assertNotIn(15, pressure['x'])
+        self.assertEqual(pressure['x'][10], 20)
+    
+    def test_cached_per_resolution(self):
+        """Test repeated requests reuse the cached series and revalidate."""
+        with patch('api.views.load_dataset_table', wraps=load_dataset_table) as load:
+            first = self.client.get(self.url, {'points': 300})
+            self.client.get(self.url, {'points': 300})
+            self.assertEqual(load.call_count, 1)
+            self.client.get(self.url, {'points': 400})
+            self.assertEqual(load.call_count, 2)
+        
+        response = self.client.get(self.url, {'points': 300}, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+    
+    def test_invalid_parameters(self):
+        """Test bad parameters return 400 and other users get 404."""
+        self.assertEqual(self.client.get(self.url, {'points': 2}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'points': 'many'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'method': 'mean'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'columns': 'Type'}).status_code, 400)
+        
+        other = User.objects.create_user(username='other', password='otherpass123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=other).key}')
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), CACHES=TEST_CACHES)
+class HistogramTests(TestCase):
+    """Tests for histograms binned at ingest."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        
+        rng = np.random.default_rng(7)
+        self.df = pd.DataFrame({
+            'Equipment Name': [f'E{i}' for i in range(3000)],
+            'Type': rng.choice(['Pump', 'Valve', 'Reactor'], 3000),
+            'Flowrate': rng.normal(100, 20, 3000).round(3),
+            'Pressure': rng.normal(50, 5, 3000).round(3),
+            'Temperature': rng.normal(300, 30, 3000).round(3),
+        })
+        self.df.loc[:99, 'Pressure'] = np.nan
+    
+    def upload(self):
+        """Upload the test dataframe and return the new Dataset."""
+        csv_file = BytesIO(self.df.to_csv(index=False).encode())
+        csv_file.name = 'equipment.csv'
+        response = self.client.post('/api/upload/', {'file': csv_file}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        return Dataset.objects.get(id=response.data['dataset_id'])
+    
+    def test_fixed_bins_match_numpy(self):
+        """Test overall and per-type fixed bins count every value once."""
+        histograms = self.upload().histograms_json
+        flowrate = histograms['columns']['Flowrate']
+        
+        expected, edges = np.histogram(self.df['Flowrate'], bins=20)
+        self.assertEqual(flowrate['fixed']['counts'], expected.tolist())
+        np.testing.assert_allclose(flowrate['fixed']['edges'], edges)
+        self.assertEqual(histograms['columns']['Pressure']['count'], 2900)
+        self.assertEqual(sum(histograms['columns']['Pressure']['fixed']['counts']), 2900)
+        
+        pump = histograms['types']['Pump']['Flowrate']
+        self.assertEqual(pump['fixed']['edges'], flowrate['fixed']['edges'])
+        self.assertEqual(sum(pump['fixed']['counts']), (self.df['Type'] == 'Pump').sum())
+    
+    def test_quantile_bins_hold_equal_counts(self):
+        """Test quantile bins split values into near-equal counts."""
+        histograms = self.upload().histograms_json
+        for col in ('Flowrate', 'Temperature'):
+            quantile = histograms['columns'][col]['quantile']
+            self.assertEqual(len(quantile['counts']), 10)
+            self.assertEqual(sum(quantile['counts']), 3000)
+            self.assertLessEqual(max(quantile['counts']) - min(quantile['counts']), 2)
+        
+        valve = histograms['types']['Valve']['Flowrate']['quantile']
+        self.assertEqual(sum(valve['counts']), (self.df['Type'] == 'Valve').sum())
+    
+    @override_settings(CSV_STREAMING_THRESHOLD=0, CSV_CHUNK_SIZE=500)
+    def test_streaming_ingest_matches_whole_file(self):
+        """Test chunked ingest stores the same histograms as a single pass."""
+        streamed = self.upload().histograms_json
+        with override_settings(CSV_STREAMING_THRESHOLD=10 ** 9):
+            self.df['Equipment Name'] += '-copy'  # avoid deduplication
+            whole = self.upload().histograms_json
+        self.assertEqual(streamed, whole)
+    
+    def test_endpoint_filters_and_revalidates(self):
+        """Test the endpoint narrows the response and supports ETags."""
+        url = f'/api/datasets/{self.upload().id}/histograms/'
+        response = self.client.get(url, {'columns': 'Flowrate', 'kind': 'fixed', 'type': 'Pump'})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.data['columns']), ['Flowrate'])
+        self.assertEqual(list(response.data['columns']['Flowrate']), ['count', 'fixed'])
+        self.assertEqual(list(response.data['types']), ['Pump'])
+        self.assertLess(len(response.content), 2048)
+        
+        cached = self.client.get(url, {'columns': 'Flowrate', 'kind': 'fixed', 'type': 'Pump'},
+                                 HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+    
+    def test_response_size_independent_of_rows(self):
+        """Test all histograms of a dataset fit in a few KB."""
+        url = f'/api/datasets/{self.upload().id}/histograms/'
+        self.assertLess(len(self.client.get(url).content), 16 * 1024)
+    
+    def test_missing_histograms_computed_on_request(self):
+        """Test datasets without stored histograms are binned on first request."""
+        dataset = self.upload()
+        stored = dataset.histograms_json
+        Dataset.objects.filter(id=dataset.id).update(histograms_json={})
+        
+        response = self.client.get(f'/api/datasets/{dataset.id}/histograms/')
+        self.assertEqual(response.status_code, 200)
+        dataset.refresh_from_db()
+        self.assertEqual(dataset.histograms_json, stored)
+    
+    def test_invalid_parameters(self):
+        """Test unknown columns or kinds return 400 and other users get 404."""
+        url = f'/api/datasets/{self.upload().id}/histograms/'
+        self.assertEqual(self.client.get(url, {'columns': 'Type'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'kind': 'log'}).status_code, 400)
+        
+        other = User.objects.create_user(username='other', password='otherpass123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=other).key}')
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), CACHES=TEST_CACHES)
+class ComparisonTests(TestCase):
+    """Tests for the dataset comparison endpoint."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        
+        # Pump flowrate rises by 10 per upload; the valve is only in the second
+        self.dataset_ids = []
+        for index in range(3):
+            rows = [f"Pump-A{index},Pump,{100 + 10 * index},40.0,80.0",
+                    f"Pump-B{index},Pump,{110 + 10 * index},50.0,90.0"]
+            if index == 1:
+                rows.append("Valve-V1,Valve,60.0,10.0,70.0")
+            csv_file = BytesIO(("Equipment Name,Type,Flowrate,Pressure,Temperature\n"
+                                + "\n".join(rows)).encode())
+            csv_file.name = f'equipment-{index}.csv'
+            response = self.client.post('/api/upload/', {'file': csv_file}, format='multipart')
+            self.dataset_ids.append(response.data['dataset_id'])
+    
+    def test_default_compares_latest_uploads_oldest_first(self):
+        """Test datasets are ordered by upload time for trends."""
+        response = self.client.get('/api/datasets/compare/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([d['id'] for d in response.data['datasets']], self.dataset_ids)
+        self.assertEqual(response.data['total_count']['values'], [2, 3, 2])
+        self.assertEqual(response.data['total_count']['deltas'], [None, 1, -1])
+    
+    def test_parameter_deltas_and_trend(self):
+        """Test per-parameter series, deltas and least-squares trend."""
+        response = self.client.get('/api/datasets/compare/', {'ids': ','.join(
+            str(pk) for pk in (self.dataset_ids[0], self.dataset_ids[2])
+        )})
+        mean = response.data['parameters']['Flowrate']['mean']
+        
+        self.assertEqual(mean['values'], [105.0, 125.0])
+        self.assertEqual(mean['deltas'], [None, 20.0])
+        self.assertAlmostEqual(mean['trend']['slope'], 20.0)
+        self.assertAlmostEqual(mean['trend']['percent_change'], 20 / 105 * 100)
+        self.assertEqual(mean['trend']['direction'], 'increasing')
+        self.assertEqual(response.data['parameters']['Pressure']['mean']['trend']['direction'], 'flat')
+    
+    def test_type_series_include_missing_types(self):
+        """Test a type absent from a dataset has count 0 and no mean there."""
+        types = self.client.get('/api/datasets/compare/').data['types']
+        
+        self.assertEqual(list(types), ['Pump', 'Valve'])
+        self.assertEqual(types['Pump']['parameters']['Flowrate']['mean']['values'], [105.0, 115.0, 125.0])
+        self.assertEqual(types['Valve']['count']['values'], [0, 1, 0])
+        valve_mean = types['Valve']['parameters']['Flowrate']['mean']
+        self.assertEqual(valve_mean['values'], [None, 60.0, None])
+        self.assertIsNone(valve_mean['trend']['slope'])
+    
+    def test_combined_statistics_from_sketches(self):
+        """Test combined statistics merge the stored sketches."""
+        combined = self.client.get('/api/datasets/compare/').data['combined']
+        flowrate = [100, 110, 110, 120, 60, 120, 130]
+        
+        self.assertEqual(combined['total_count'], 7)
+        self.assertEqual(combined['type_distribution'], {'Pump': 6, 'Valve': 1})
+        self.assertAlmostEqual(combined['statistics']['Flowrate']['mean'], np.mean(flowrate))
+        self.assertAlmostEqual(combined['statistics']['Flowrate']['std'], np.std(flowrate, ddof=1))
+        self.assertNotIn('sketch', combined)
+    
+    def test_cost_independent_of_rows(self):
+        """Test comparison runs one dataset query and reads no row data."""
+        with patch('api.storage.read_table') as read_table:
+            with self.assertNumQueries(2):  # token lookup + datasets
+                response = self.client.get('/api/datasets/compare/')
+        self.assertEqual(response.status_code, 200)
+        read_table.assert_not_called()
+    
+    def test_invalid_and_missing_ids(self):
+        """Test bad ids return 400 and unknown or foreign ids return 404."""
+        self.assertEqual(self.client.get('/api/datasets/compare/', {'ids': '1,a'}).status_code, 400)
+        response = self.client.get('/api/datasets/compare/', {'ids': f'{self.dataset_ids[0]},99999'})
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('99999', response.data['error'])
+        
+        other = User.objects.create_user(username='other', password='otherpass123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=other).key}')
+        response = self.client.get('/api/datasets/compare/', {'ids': str(self.dataset_ids[0])})
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), CACHES=TEST_CACHES)
+class IngestionJobTests(TestCase):
+    """Tests for background ingestion jobs."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+    
+    def upload_async(self, content):
+        """Upload CSV content with async=true and return the response."""
+        csv_file = BytesIO(content)
+        csv_file.name = 'equipment.csv'
+        return self.client.post('/api/upload/', {
+            'file': csv_file,
+            'async': 'true'
+        }, format='multipart')
+    
+    @override_settings(INGEST_JOBS_EAGER=True, CSV_CHUNK_SIZE=1)
+    def test_async_upload_returns_job(self):
+        """Test async upload returns 202 and the job reports the dataset."""
+        response = self.upload_async(b"""Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-A1,Pump,150.5,45.2,85.3
+Reactor-R1,Reactor,200.0,120.5,350.0""")
+
+        self.assertEqual(response.status_code, 202)
+        job_response = self.client.get(f"/api/jobs/{response.data['job_id']}/")
+        self.assertEqual(job_response.status_code, 200)
+        self.assertEqual(job_response.data['status'], 'succeeded')
+        self.assertEqual(job_response.data['progress'], 1.0)
+        self.assertEqual(job_response.data['rows_processed'], 2)
+        
+        dataset = Dataset.objects.get(id=job_response.data['dataset_id'])
+        self.assertEqual(dataset.summary_json['total_count'], 2)
+        self.assertEqual(load_dataset_table(dataset).num_rows, 2)
+    
+    @override_settings(INGEST_JOBS_EAGER=True)
+    def test_failed_job_reports_error(self):
+        """Test validation errors are reported through the job."""
+        response = self.upload_async(b"Equipment Name,Type\nPump-A1,Pump")
+        
+        job_response = self.client.get(f"/api/jobs/{response.data['job_id']}/")
+        self.assertEqual(job_response.data['status'], 'failed')
+        self.assertIn('Missing required columns', job_response.data['error'])
+        self.assertIsNone(job_response.data['dataset_id'])
+    
+    def test_queued_job_processed_by_management_command(self):
+        """Test jobs left in the queue are drained by run_ingestion_jobs."""
+        response = self.upload_async(b"""Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-A1,Pump,150.5,45.2,85.3""")
+        self.assertEqual(response.data['status'], 'queued')
+        
+        call_command('run_ingestion_jobs', stdout=StringIO())
+        
+        job_response = self.client.get(f"/api/jobs/{response.data['job_id']}/")
+        self.assertEqual(job_response.data['status'], 'succeeded')
+    
+    def test_stale_running_job_requeued_by_management_command(self):
+        """Test a job left running by a dead worker is run again, a live one is not."""
+        response = self.upload_async(b"""Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-A1,Pump,150.5,45.2,85.3""")
+        stale_id = response.data['job_id']
+        IngestionJob.objects.filter(id=stale_id).update(
+            status=IngestionJob.STATUS_RUNNING,
+            updated_at=timezone.now() - timedelta(hours=2)
+        )
+        live = IngestionJob.objects.create(
+            user=self.user, filename='x.csv', upload='uploads/x.csv',
+            status=IngestionJob.STATUS_RUNNING
+        )
+        
+        out = StringIO()
+        call_command('run_ingestion_jobs', stale_seconds=3600, stdout=out)
+        
+        self.assertIn('Requeued 1 stale job(s); processed 1 queued job(s)', out.getvalue())
+        self.assertEqual(IngestionJob.objects.get(id=stale_id).status, IngestionJob.STATUS_SUCCEEDED)
+        live.refresh_from_db()
+        self.assertEqual(live.status, IngestionJob.STATUS_RUNNING)
+    
+    def test_job_of_other_user_not_found(self):
+        """Test job status is only visible to its owner."""
+        other = User.objects.create_user(username='other', password='otherpass123')
+        job = IngestionJob.objects.create(user=other, filename='x.csv', upload='uploads/x.csv')
+        
+        self.assertEqual(self.client.get(f'/api/jobs/{job.id}/').status_code, 404)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), CACHES=TEST_CACHES)
+class ChunkedUploadTests(TestCase):
+    """Tests for resumable chunked uploads."""
+    
+    CSV = b"""Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-A1,Pump,150.5,45.2,85.3
+Reactor-R1,Reactor,200.0,120.5,350.0
+Valve-V1,Valve,60.0,10.0,90.0"""
+
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+    
+    def start(self, filename='equipment.csv', size=None):
+        response = self.client.post('/api/upload/chunked/', {
+            'filename': filename,
+            'size': len(self.CSV) if size is None else size,
+        }, format='json')
+        return response
+    
+    def put(self, upload_id, offset, chunk):
+        return self.client.put(
+            f'/api/upload/chunked/{upload_id}/', data=chunk,
+            content_type='application/offset+octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset)
+        )
+    
+    def test_upload_in_chunks(self):
+        """Test a file sent in chunks is ingested like a normal upload."""
+        response = self.start()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['offset'], 0)
+        upload_id = response.data['upload_id']
+        
+        for offset in range(0, len(self.CSV), 40):
+            response = self.put(upload_id, offset, self.CSV[offset:offset + 40])
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['offset'], min(offset + 40, len(self.CSV)))
+        self.assertTrue(response.data['complete'])
+        
+        response = self.client.post(f'/api/upload/chunked/{upload_id}/complete/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['summary']['total_count'], 3)
+        self.assertEqual(len(response.data['data']), 3)
+        
+        dataset = Dataset.objects.get(id=response.data['dataset_id'])
+        with dataset.csv_path.open('rb') as f:
+            self.assertEqual(f.read(), self.CSV)
+        self.assertEqual(dataset.content_hash, hashlib.sha256(self.CSV).hexdigest())
+        self.assertFalse(ChunkedUpload.objects.exists())
+    
+    def test_resume_from_reported_offset(self):
+        """Test a chunk at a stale offset is refused with the offset to resume from."""
+        upload_id = self.start().data['upload_id']
+        self.put(upload_id, 0, self.CSV[:50])
+        
+        # A retry of the first chunk after its response was lost
+        response = self.put(upload_id, 0, self.CSV[:50])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['offset'], 50)
+        
+        self.assertEqual(self.client.get(f'/api/upload/chunked/{upload_id}/').data['offset'], 50)
+        self.assertEqual(self.put(upload_id, 50, self.CSV[50:]).status_code, 200)
+        response = self.client.post(f'/api/upload/chunked/{upload_id}/complete/')
+        self.assertEqual(response.status_code, 201)
+    
+    def test_incomplete_upload_cannot_complete(self):
+        """Test completing before every byte arrived returns 409."""
+        upload_id = self.start().data['upload_id']
+        self.put(upload_id, 0, self.CSV[:10])
+        
+        response = self.client.post(f'/api/upload/chunked/{upload_id}/complete/')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['offset'], 10)
+        self.assertFalse(Dataset.objects.exists())
+    
+    def test_chunk_beyond_declared_size(self):
+        """Test bytes past the declared size are refused and not counted."""
+        upload_id = self.start(size=10).data['upload_id']
+        
+        response = self.put(upload_id, 0, self.CSV[:20])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ChunkedUpload.objects.get(id=upload_id).offset, 0)
+    
+    def test_invalid_uploads(self):
+        """Test bad declarations and offsets are rejected."""
+        self.assertEqual(self.start(filename='equipment.txt').status_code, 400)
+        self.assertEqual(self.start(size=0).status_code, 400)
+        self.assertEqual(self.start(size='many').status_code, 400)
+        with self.settings(CSV_UPLOAD_MAX_SIZE=10):
+            self.assertEqual(self.start().status_code, 400)
+        
+        upload_id = self.start().data['upload_id']
+        response = self.client.put(f'/api/upload/chunked/{upload_id}/', data=b'x',
+                                   content_type='application/offset+octet-stream')
+        self.assertEqual(response.status_code, 400)
+    
+    def test_directory_part_of_filename_dropped(self):
+        """Test a declared filename cannot place the upload outside uploads/."""
+        for filename in ('a/b.csv', '../b.csv', 'a\\..\\b.csv'):
+            response = self.start(filename=filename)
+            self.assertEqual(response.status_code, 201, filename)
+            upload = ChunkedUpload.objects.get(id=response.data['upload_id'])
+            self.assertEqual(upload.filename, 'b.csv')
+            self.assertEqual(os.path.dirname(upload.file.name), 'uploads')
+        
+        for filename in ('a/', '..', '../'):
+            response = self.start(filename=filename)
+            self.assertEqual(response.status_code, 400, filename)
+            self.assertIn('error', response.json())
+    
+    def test_other_users_upload_not_found(self):
+        """Test uploads are private to their user."""
+        upload_id = self.start().data['upload_id']
+        other = User.objects.create_user(username='other', password='otherpass123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=other).key}')
+        
+        self.assertEqual(self.client.get(f'/api/upload/chunked/{upload_id}/').status_code, 404)
+        self.assertEqual(self.put(upload_id, 0, self.CSV).status_code, 404)
+    
+    @override_settings(INGEST_JOBS_EAGER=True)
+    def test_complete_in_background(self):
+        """Test async=true hands the assembled file to an ingestion job."""
+        upload_id = self.start().data['upload_id']
+        self.put(upload_id, 0, self.CSV)
+        
+        response = self.client.post(f'/api/upload/chunked/{upload_id}/complete/', {'async': 'true'})
+        self.assertEqual(response.status_code, 202)
+        job = self.client.get(f"/api/jobs/{response.data['job_id']}/").data
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual(Dataset.objects.get(id=job['dataset_id']).summary_json['total_count'], 3)
+    
+    def test_abandoned_uploads_expire(self):
+        """Test stale uploads are dropped and their files left to the sweep."""
+        upload_id = self.start().data['upload_id']
+        self.put(upload_id, 0, self.CSV[:10])
+        name = ChunkedUpload.objects.get(id=upload_id).file.name
+        self.assertNotIn(name, list(unreferenced_files(grace_seconds=0)))
+        
+        self.assertEqual(expire_chunked_uploads(timezone.now() + timedelta(hours=1)), 0)
+        self.assertEqual(expire_chunked_uploads(timezone.now() + timedelta(days=2)), 1)
+        self.assertIn(name, list(unreferenced_files(grace_seconds=0)))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), CACHES=TEST_CACHES)
+class DeduplicationTests(TestCase):
+    """Tests for reusing datasets when the same content is uploaded again."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        
+        self.csv_content = b"""Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-A1,Pump,150.5,45.2,85.3
+Reactor-R1,Reactor,200.0,120.5,350.0"""
+
+    def upload(self, content, name='equipment.csv', **data):
+        """Upload CSV content and return the response."""
+        csv_file = BytesIO(content)
+        csv_file.name = name
+        return self.client.post('/api/upload/', {'file': csv_file, **data}, format='multipart')
+    
+    def test_upload_stores_content_hash(self):
+        """Test the SHA-256 of the upload is stored on the dataset."""
+        response = self.upload(self.csv_content)
+        
+        dataset = Dataset.objects.get(id=response.data['dataset_id'])
+        self.assertEqual(dataset.content_hash, hashlib.sha256(self.csv_content).hexdigest())
+    
+    def test_duplicate_upload_reuses_summary_and_files(self):
+        """Test a repeated upload is not parsed again."""
+        first = self.upload(self.csv_content)
+        with patch('api.ingest.process_csv_file') as process:
+            second = self.upload(self.csv_content, name='again.csv')
+        
+        process.assert_not_called()
+        self.assertEqual(second.status_code, 201)
+        self.assertNotEqual(second.data['dataset_id'], first.data['dataset_id'])
+        self.assertEqual(second.data['filename'], 'again.csv')
+        self.assertEqual(second.data['summary'], first.data['summary'])
+        self.assertEqual(second.data['data'], first.data['data'])
+        
+        original = Dataset.objects.get(id=first.data['dataset_id'])
+        duplicate = Dataset.objects.get(id=second.data['dataset_id'])
+        self.assertEqual(duplicate.csv_path.name, original.csv_path.name)
+        self.assertEqual(duplicate.columnar_path.name, original.columnar_path.name)
+    
+    def test_different_content_is_parsed(self):
+        """Test uploads with different content get their own files."""
+        first = self.upload(self.csv_content)
+        second = self.upload(self.csv_content + b"\nValve-V1,Valve,50.0,10.0,25.0")
+        
+        self.assertEqual(second.data['summary']['total_count'], 3)
+        original = Dataset.objects.get(id=first.data['dataset_id'])
+        other = Dataset.objects.get(id=second.data['dataset_id'])
+        self.assertNotEqual(other.csv_path.name, original.csv_path.name)
+    
+    def test_cleanup_keeps_shared_files(self):
+        """Test deleting an old dataset keeps files still used by newer ones."""
+        for _ in range(6):
+            self.upload(self.csv_content)
+        
+        datasets = Dataset.objects.filter(user=self.user)
+        self.assertEqual(datasets.count(), 5)
+        for dataset in datasets:
+            self.assertTrue(os.path.exists(dataset.csv_path.path))
+            self.assertEqual(load_dataset_table(dataset).num_rows, 2)
+    
+    def test_other_users_content_is_not_shared(self):
+        """Test another user's upload of the same file gets its own files."""
+        first = self.upload(self.csv_content, name='private-name.csv')
+        other = User.objects.create_user(username='other', password='otherpass123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=other).key}')
+        second = self.upload(self.csv_content, name='mine.csv')
+        
+        original = Dataset.objects.get(id=first.data['dataset_id'])
+        copy = Dataset.objects.get(id=second.data['dataset_id'])
+        self.assertNotEqual(copy.csv_path.name, original.csv_path.name)
+        self.assertNotEqual(copy.columnar_path.name, original.columnar_path.name)
+        self.assertNotIn('private-name', copy.columnar_path.name)
+    
+    def test_duplicate_rows_have_fresh_shape(self):
+        """Test rows of a duplicate upload match those of a fresh parse."""
+        content = (b"Type,Equipment Name,Flowrate,Pressure,Temperature,Notes\n"
+                   b"Pump,Pump-A1,150,,85.3,checked\n")
+        first = self.upload(content)
+        second = self.upload(content, name='again.csv')
+        
+        self.assertEqual(second.data['data'], first.data['data'])
+        self.assertEqual(list(first.data['data'][0]),
+                         ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature'])
+    
+    @override_settings(INGEST_JOBS_EAGER=True)
+    def test_duplicate_async_upload_discards_its_copy(self):
+        """Test a duplicate background upload reuses the stored file."""
+        first = self.upload(self.csv_content)
+        response = self.upload(self.csv_content, **{'async': 'true'})
+        
+        job = IngestionJob.objects.get(id=response.data['job_id'])
+        self.assertEqual(job.status, IngestionJob.STATUS_SUCCEEDED)
+        self.assertFalse(os.path.exists(job.upload.path))
+        original = Dataset.objects.get(id=first.data['dataset_id'])
+        self.assertEqual(job.dataset.csv_path.name, original.csv_path.name)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), CACHES=TEST_CACHES)
+class ResponseCacheTests(TestCase):
+    """Tests for cached history and summary responses."""
+    
+    def setUp(self):
+        """Set up test data."""
+        get_response_cache().clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+    
+    def upload(self, index=0):
+        """Upload a small CSV whose content depends on `index`."""
+        csv_file = BytesIO(f"""Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-{index},Pump,{150 + index},45.2,85.3""".encode())
+        csv_file.name = f'equipment-{index}.csv'
+        return self.client.post('/api/upload/', {'file': csv_file}, format='multipart')
+    
+    def test_dataset_keys_tell_reused_ids_apart(self):
+        """Test a dataset with a reused id does not get an older dataset's entries."""
+        old = Dataset(id=1, upload_timestamp=timezone.now() - timedelta(days=1))
+        new = Dataset(id=1, upload_timestamp=timezone.now())
+        
+        self.assertNotEqual(series_key(old, 'lttb', 100, ['Flowrate']),
+                            series_key(new, 'lttb', 100, ['Flowrate']))
+        self.assertNotEqual(aggregate_key(old, 'q'), aggregate_key(new, 'q'))
+    
+    def test_history_served_from_cache_with_validators(self):
+        """Test repeated history requests skip the dataset query."""
+        self.upload()
+        first = self.client.get('/api/history/')
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('ETag', first)
+        self.assertNotIn('Last-Modified', first)
+        self.assertEqual(first['Cache-Control'], 'private, no-cache')
+        
+        # Only the token lookup remains
+        with self.assertNumQueries(1):
+            second = self.client.get('/api/history/')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+    
+    def test_history_not_modified(self):
+        """Test If-None-Match with the current ETag returns 304."""
+        self.upload()
+        etag = self.client.get('/api/history/')['ETag']
+        
+        response = self.client.get('/api/history/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+    
+    def test_gzip_responses_revalidate(self):
+        """Test gzip-compressed responses keep working with conditional requests."""
+        for index in range(3):
+            self.upload(index)
+        response = self.client.get('/api/history/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        body = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(body['datasets']), 3)
+        
+        # The compressed body's ETag is weak, and still matches
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        response = self.client.get('/api/history/', HTTP_ACCEPT_ENCODING='gzip',
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+    
+    def test_upload_invalidates_history(self):
+        """Test a new upload changes the cached history."""
+        self.upload(0)
+        etag = self.client.get('/api/history/')['ETag']
+        self.upload(1)
+        
+        response = self.client.get('/api/history/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['datasets']), 2)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_history_revalidates_after_deletion(self):
+        """Test history changed by deleting a dataset is not answered with 304."""
+        for index in range(2):
+            self.upload(index)
+        since = http_date(time.time() + 60)
+        etag = self.client.get('/api/history/')['ETag']
+        Dataset.objects.filter(user=self.user).order_by('-upload_timestamp').first().delete()
+        invalidate_user_responses(self.user.id)
+        
+        response = self.client.get('/api/history/', HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['datasets']), 1)
+        response = self.client.get('/api/history/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+    
+    def test_summary_not_modified_since(self):
+        """Test If-Modified-Since at the upload time returns 304."""
+        dataset_id = self.upload().data['dataset_id']
+        first = self.client.get(f'/api/summary/{dataset_id}/')
+        self.assertEqual(first.status_code, 200)
+        
+        response = self.client.get(
+            f'/api/summary/{dataset_id}/',
+            HTTP_IF_MODIFIED_SINCE=first['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 304)
+    
+    def test_summary_cache_is_per_user(self):
+        """Test a cached summary is not served to another user."""
+        dataset_id = self.upload().data['dataset_id']
+        self.client.get(f'/api/summary/{dataset_id}/')
+        
+        other = User.objects.create_user(username='other', password='otherpass123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=other).key}')
+        self.assertEqual(self.client.get(f'/api/summary/{dataset_id}/').status_code, 404)
+    
+    def test_cleanup_invalidates_deleted_summary(self):
+        """Test summaries of datasets removed by cleanup are not served."""
+        dataset_id = self.upload(0).data['dataset_id']
+        self.assertEqual(self.client.get(f'/api/summary/{dataset_id}/').status_code, 200)
+        for index in range(1, 6):
+            self.upload(index)
+        
+        self.assertEqual(self.client.get(f'/api/summary/{dataset_id}/').status_code, 404)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), CACHES=TEST_CACHES)
+class DatasetQueryTests(TestCase):
+    """Tests for the queries behind dataset listing and lookup."""
+    
+    def setUp(self):
+        """Set up test data."""
+        get_response_cache().clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.dataset_ids = []
+        for index in range(3):
+            csv_file = BytesIO(f"""Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-{index},Pump,{150 + index},45.2,85.3""".encode())
+            csv_file.name = f'equipment-{index}.csv'
+            response = self.client.post('/api/upload/', {'file': csv_file}, format='multipart')
+            self.dataset_ids.append(response.data['dataset_id'])
+        get_response_cache().clear()
+    
+    def dataset_queries(self, url):
+        """GET `url` and return (response, queries against api_dataset)."""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        queries = [q['sql'] for q in context.captured_queries if '"api_dataset"' in q['sql']]
+        return response, queries
+    
+    def query_plan(self, sql):
+        """Return SQLite's EXPLAIN QUERY PLAN details for `sql` as one string."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return ' | '.join(row[-1] for row in cursor.fetchall())
+    
+    def test_history_uses_user_recent_index(self):
+        """Test history is one query served by the composite index without a sort."""
+        with self.assertNumQueries(2):  # token lookup + datasets
+            response, queries = self.dataset_queries('/api/history/')
+        self.assertEqual(len(response.data['datasets']), 3)
+        self.assertEqual(len(queries), 1)
+        
+        plan = self.query_plan(queries[0])
+        self.assertIn('dataset_user_recent_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+    
+    def test_summary_uses_primary_key(self):
+        """Test summary lookup is one primary key search."""
+        with self.assertNumQueries(2):
+            response, queries = self.dataset_queries(f'/api/summary/{self.dataset_ids[0]}/')
+        self.assertEqual(response.data['id'], self.dataset_ids[0])
+        self.assertEqual(len(queries), 1)
+        self.assertIn('PRIMARY KEY', self.query_plan(queries[0]))
+    
+    def test_summary_queries_load_only_needed_columns(self):
+        """Test history and summary do not load file paths or hashes."""
+        for url in ('/api/history/', f'/api/summary/{self.dataset_ids[0]}/'):
+            _, queries = self.dataset_queries(url)
+            self.assertIn('"summary_json"', queries[0])
+            self.assertNotIn('"csv_path"', queries[0])
+            self.assertNotIn('"content_hash"', queries[0])
+    
+    def test_rows_do_not_load_summary(self):
+        """Test the rows endpoint leaves summary_json unloaded."""
+        _, queries = self.dataset_queries(f'/api/datasets/{self.dataset_ids[0]}/rows/')
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"summary_json"', queries[0])
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), CACHES=TEST_CACHES, EQUIPMENT_RECORDS=True, INGEST_JOBS_EAGER=True)
+class EquipmentRecordTests(TestCase):
+    """Tests for row-level equipment records."""
+    
+    CSV = b"""Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-A1,Pump,150.5,45.2,85.3
+Reactor-R1,Reactor,200.0,,350.0
+Pump-A2,Pump,120.0,40.0,80.0
+Valve-V1,,60.0,10.0,90.0
+Pump-A3,Pump,170.0,50.0,95.0"""
+
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+    
+    def upload(self, content=None, name='equipment.csv'):
+        """Upload a CSV and return the new Dataset."""
+        csv_file = BytesIO(content or self.CSV)
+        csv_file.name = name
+        response = self.client.post('/api/upload/', {'file': csv_file}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        return Dataset.objects.get(id=response.data['dataset_id'])
+    
+    def test_upload_stores_records(self):
+        """Test every row is stored, with missing values as NULL."""
+        dataset = self.upload()
+        records = list(dataset.records.values_list(
+            'name', 'type', 'flowrate', 'pressure', 'temperature'
+        ))
+        
+        self.assertEqual(len(records), 5)
+        self.assertEqual(records[0], ('Pump-A1', 'Pump', 150.5, 45.2, 85.3))
+        self.assertIsNone(records[1][3])
+        self.assertIsNone(records[3][1])
+        self.assertEqual(dataset.records.filter(type='Pump').count(), 3)
+    
+    @override_settings(EQUIPMENT_RECORD_BATCH_SIZE=2)
+    def test_records_inserted_in_batches(self):
+        """Test records are written with one insert per batch."""
+        with CaptureQueriesContext(connection) as context:
+            self.upload()
+        inserts = [q for q in context.captured_queries
+                   if 'INTO "api_equipmentrecord"' in q['sql']]
+        self.assertEqual(len(inserts), 3)
+    
+    def test_type_filter_uses_index(self):
+        """Test filtering a dataset's records by type uses the composite index."""
+        dataset = self.upload()
+        sql, params = dataset.records.filter(type='Pump').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' | '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('record_dataset_type_idx', plan)
+    
+    @override_settings(EQUIPMENT_RECORDS=False)
+    def test_records_off_by_default(self):
+        """Test no records are written unless EQUIPMENT_RECORDS is enabled."""
+        with CaptureQueriesContext(connection) as context:
+            self.upload()
+        self.assertFalse(EquipmentRecord.objects.exists())
+        self.assertFalse([q for q in context.captured_queries if 'api_equipmentrecord' in q['sql']])
+    
+    def test_long_text_is_kept(self):
+        """Test text of any length is stored as it is in the file."""
+        dataset = self.upload(self.CSV + b"\n" + b"X" * 300 + b",Pump,1,2,3")
+        
+        name = dataset.records.order_by('-row').values_list('name', flat=True).first()
+        self.assertEqual(name, 'X' * 300)
+    
+    def test_duplicate_upload_has_own_records(self):
+        """Test records belong to one dataset, even when another has the same content."""
+        first = self.upload()
+        second = self.upload(name='copy.csv')
+        
+        self.assertEqual(records_for(first).count(), 5)
+        self.assertEqual(records_for(second).count(), 5)
+        self.assertEqual(EquipmentRecord.objects.count(), 10)
+    
+    def test_concurrent_store_does_not_duplicate(self):
+        """Test a second store that missed the first one's records inserts nothing new."""
+        dataset = self.upload()
+        
+        with patch('api.records.records_for', return_value=EquipmentRecord.objects.none()):
+            store_equipment_records(dataset)
+        
+        self.assertEqual(dataset.records.count(), 5)
+    
+    def test_rows_served_from_records(self):
+        """Test the rows endpoint answers from records exactly as from the columnar copy."""
+        dataset = self.upload()
+        url = f'/api/datasets/{dataset.id}/rows/'
+        queries = [
+            {},
+            {'ordering': '-Pressure'},
+            {'ordering': 'Type,-Flowrate', 'columns': 'Equipment Name,Type'},
+            {'type': 'Pump', 'flowrate_min': 130, 'offset': 1, 'limit': 1},
+            {'format': 'columnar', 'ordering': 'Temperature'},
+        ]
+        with override_settings(EQUIPMENT_RECORDS=False):
+            expected = [self.client.get(url, params).data for params in queries]
+        
+        with patch('api.views.load_dataset_table') as read_table:
+            for params, body in zip(queries, expected):
+                self.assertEqual(self.client.get(url, params).data, body, params)
+        read_table.assert_not_called()
+    
+    def test_aggregates_from_records(self):
+        """Test aggregates without percentiles are computed in SQL with the same results."""
+        dataset = self.upload()
+        url = f'/api/datasets/{dataset.id}/aggregate/'
+        queries = [
+            {},
+            {'group_by': ['Type'], 'metrics': ['count', 'sum', 'mean', 'min', 'max', 'std']},
+            {'group_by': ['Type'], 'filters': {'Flowrate': {'min': 1000}}},
+        ]
+        with override_settings(EQUIPMENT_RECORDS=False):
+            expected = [self.client.post(url, body, format='json').data for body in queries]
+        get_response_cache().clear()
+        
+        with patch('api.views.load_dataset_table') as read_table:
+            for body, want in zip(queries, expected):
+                got = self.client.post(url, body, format='json').data
+                self.assertEqual(got['count'], want['count'], body)
+                self.assertEqual([g['key'] for g in got['groups']], [g['key'] for g in want['groups']])
+                for got_group, want_group in zip(got['groups'], want['groups']):
+                    self.assertEqual(got_group['count'], want_group['count'])
+                    for col, stats in want_group['statistics'].items():
+                        for metric, value in stats.items():
+                            if value is None:
+                                self.assertIsNone(got_group['statistics'][col][metric])
+                            else:
+                                self.assertAlmostEqual(got_group['statistics'][col][metric], value)
+        read_table.assert_not_called()
+    
+    def test_percentiles_read_columnar_copy(self):
+        """Test percentile queries still read the columnar copy."""
+        dataset = self.upload()
+        response = self.client.post(f'/api/datasets/{dataset.id}/aggregate/',
+                                    {'metrics': ['p50']}, format='json')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['groups'][0]['statistics']['Flowrate']['p50'], 150.5)
+    
+    def test_batch_upload_stores_records(self):
+        """Test each dataset from a batch upload gets its records."""
+        files = []
+        for index in range(2):
+            csv_file = BytesIO(self.CSV + f"\nExtra-{index},Pump,1,2,3".encode())
+            csv_file.name = f'equipment-{index}.csv'
+            files.append(csv_file)
+        response = self.client.post('/api/upload/batch/', {'files': files}, format='multipart')
+        
+        self.assertEqual(response.status_code, 201)
+        for result in response.data['results']:
+            self.assertEqual(EquipmentRecord.objects.filter(dataset_id=result['dataset_id']).count(), 6)
+    
+    def test_retention_deletes_records(self):
+        """Test records of expired datasets are removed with them."""
+        first = self.upload()
+        for index in range(5):
+            self.upload(self.CSV + f"\nExtra-{index},Pump,1,2,3".encode(), name=f'e{index}.csv')
+        
+        self.assertFalse(Dataset.objects.filter(id=first.id).exists())
+        self.assertFalse(EquipmentRecord.objects.filter(dataset_id=first.id).exists())
+        self.assertEqual(EquipmentRecord.objects.count(), 5 * 6)
+    
+    def test_load_command_backfills_records(self):
+        """Test the load command fills records for datasets without any."""
+        dataset = self.upload()
+        dataset.records.all().delete()
+        out = StringIO()
+        
+        call_command('load_equipment_records', stdout=out)
+        
+        self.assertEqual(dataset.records.count(), 5)
+        self.assertIn('Stored 5 record(s) for 1 dataset(s)', out.getvalue())
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), CACHES=TEST_CACHES, INGEST_JOBS_EAGER=True)
+class PDFReportTests(TestCase):
+    """Tests for stored and pre-rendered PDF reports."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+    
+    def upload(self, index=0):
+        """Upload a small CSV and return the new dataset."""
+        csv_file = BytesIO(f"""Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-{index},Pump,{150 + index},45.2,85.3""".encode())
+        csv_file.name = f'equipment-{index}.csv'
+        response = self.client.post('/api/upload/', {'file': csv_file}, format='multipart')
+        return Dataset.objects.get(id=response.data['dataset_id'])
+    
+    def download(self, dataset):
+        return self.client.get(f'/api/report/pdf/{dataset.id}/')
+    
+    def test_report_download(self):
+        """Test the report is returned as a PDF attachment."""
+        dataset = self.upload()
+        response = self.download(dataset)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('report_equipment-0.csv.pdf', response['Content-Disposition'])
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+    
+    def test_report_with_empty_column(self):
+        """Test a column with no values is reported as n/a, not a server error."""
+        csv_file = BytesIO(b"""Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-A1,Pump,150.5,,85.3""")
+        csv_file.name = 'equipment.csv'
+        response = self.client.post('/api/upload/', {'file': csv_file}, format='multipart')
+        dataset = Dataset.objects.get(id=response.data['dataset_id'])
+        
+        self.assertEqual(self.download(dataset).status_code, 200)
+        summary_table = [e for e in summary_report_elements(dataset) if hasattr(e, '_cellvalues')][0]
+        self.assertIn(['Average Pressure', 'n/a'], summary_table._cellvalues)
+    
+    def test_uncompressed_report_has_length(self):
+        """Test a report requested without gzip keeps its Content-Length for progress."""
+        dataset = self.upload()
+        response = self.client.get(f'/api/report/pdf/{dataset.id}/', HTTP_ACCEPT_ENCODING='identity')
+        
+        body = b''.join(response.streaming_content)
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(int(response['Content-Length']), len(body))
+    
+    def test_report_rendered_once(self):
+        """Test repeat downloads stream the stored file without rendering."""
+        dataset = self.upload()
+        first = b''.join(self.download(dataset).streaming_content)
+        
+        with patch('api.reports.render_summary_report') as render:
+            second = b''.join(self.download(dataset).streaming_content)
+        
+        render.assert_not_called()
+        self.assertEqual(second, first)
+    
+    def test_full_report_has_section_per_type(self):
+        """Test the full-data report spans pages of rows for each type."""
+        rows = ["Equipment Name,Type,Flowrate,Pressure,Temperature"]
+        rows += [f"Unit-{i},{'Pump' if i % 3 else 'Valve'},{i}.5,1.0,2.0" for i in range(300)]
+        csv_file = BytesIO("\n".join(rows).encode())
+        csv_file.name = 'large.csv'
+        dataset_id = self.client.post('/api/upload/', {'file': csv_file}, format='multipart').data['dataset_id']
+        dataset = Dataset.objects.get(id=dataset_id)
+        
+        with patch('api.reports.rows_table', wraps=rows_table) as build_table:
+            response = self.client.get(f'/api/report/pdf/{dataset_id}/?full=true')
+            content = b''.join(response.streaming_content)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('report_large.csv_full.pdf', response['Content-Disposition'])
+        self.assertTrue(content.startswith(b'%PDF'))
+        # 200 pump rows and 100 valve rows in tables of ROWS_PER_TABLE
+        self.assertEqual(build_table.call_count, 4 + 2)
+        self.assertEqual(sum(len(call.args[0]) for call in build_table.call_args_list), 300)
+        self.assertTrue(default_storage.exists(report_name(dataset, full=True)))
+        self.assertIn(b'/FlateDecode', content)
+    
+    @override_settings(INGEST_JOBS_EAGER=False)
+    def test_unrendered_report_accepted_until_stored(self):
+        """Test the first download queues the render once and returns 202 until it is stored."""
+        dataset = self.upload()
+        executor = Mock()
+        executor.submit.return_value = Future()
+        with patch('api.jobs.get_executor', return_value=executor):
+            first = self.download(dataset)
+            second = self.download(dataset)
+        
+        for response in (first, second):
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual(response.data['status'], 'rendering')
+            self.assertEqual(response['Retry-After'], '1')
+        executor.submit.assert_called_once()
+        
+        get_report_path(dataset)
+        response = self.download(dataset)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+    
+    @override_settings(INGEST_JOBS_EAGER=False)
+    def test_failed_render_reported_then_retried(self):
+        """Test a failed render is reported once and queued again on the next download."""
+        dataset = self.upload()
+        failed = Future()
+        failed.set_exception(RuntimeError('render failed'))
+        executor = Mock()
+        executor.submit.return_value = failed
+        with patch('api.jobs.get_executor', return_value=executor):
+            statuses = [self.download(dataset).status_code for _ in range(3)]
+        
+        self.assertEqual(statuses, [202, 500, 202])
+        self.assertEqual(executor.submit.call_count, 2)
+    
+    def test_flowable_queue_is_lazy(self):
+        """Test flowables are drawn before later ones are generated."""
+        generated = []
+        
+        def flowables():
+            for i in range(200):
+                generated.append(i)
+                yield Paragraph(f'Line {i}', STYLES['Normal'])
+        
+        queue = FlowableQueue(flowables(), lookahead=4)
+        self.assertEqual(len(generated), 4)
+        
+        buffer = BytesIO()
+        SimpleDocTemplate(buffer).build(queue)
+        self.assertEqual(len(generated), 200)
+        self.assertTrue(buffer.getvalue().startswith(b'%PDF'))
+    
+    @override_settings(PDF_PRERENDER=True, INGEST_JOBS_EAGER=True)
+    def test_report_prerendered_after_ingest(self):
+        """Test PDF_PRERENDER renders the report during upload."""
+        dataset = self.upload()
+        
+        self.assertTrue(default_storage.exists(report_name(dataset)))
+    
+    def test_cleanup_deletes_report(self):
+        """Test reports of expired datasets are removed by enforce_retention."""
+        dataset = self.upload(0)
+        self.download(dataset)
+        for index in range(1, 6):
+            self.upload(index)
+        
+        self.assertFalse(Dataset.objects.filter(id=dataset.id).exists())
+        call_command('enforce_retention', grace_seconds=0, stdout=StringIO())
+        self.assertFalse(default_storage.exists(report_name(dataset)))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), CACHES=TEST_CACHES)
+class RetentionTests(TestCase):
+    """Tests for the dataset retention policy and file cleanup."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+    
+    def upload(self, index):
+        """Upload a small CSV whose content depends on `index`."""
+        csv_file = BytesIO(f"""Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-{index},Pump,{150 + index},45.2,85.3""".encode())
+        csv_file.name = f'equipment-{index}.csv'
+        response = self.client.post('/api/upload/', {'file': csv_file}, format='multipart')
+        return Dataset.objects.get(id=response.data['dataset_id'])
+    
+    def remaining(self):
+        return list(Dataset.objects.filter(user=self.user).values_list('filename', flat=True))
+    
+    def test_upload_records_file_size(self):
+        """Test the raw CSV size is stored for quotas."""
+        dataset = self.upload(0)
+        self.assertEqual(dataset.file_size, dataset.csv_path.size)
+        self.assertGreater(dataset.file_size, 0)
+    
+    @override_settings(RETENTION_KEEP_LATEST=2)
+    def test_keep_latest(self):
+        """Test only the newest RETENTION_KEEP_LATEST datasets are kept."""
+        for index in range(4):
+            self.upload(index)
+        
+        self.assertEqual(self.remaining(), ['equipment-3.csv', 'equipment-2.csv'])
+    
+    @override_settings(RETENTION_KEEP_LATEST=None, RETENTION_MAX_AGE_DAYS=30)
+    def test_max_age(self):
+        """Test datasets older than RETENTION_MAX_AGE_DAYS are removed."""
+        old = self.upload(0)
+        Dataset.objects.filter(id=old.id).update(
+            upload_timestamp=timezone.now() - timedelta(days=31)
+        )
+        self.upload(1)
+        
+        self.assertEqual(self.remaining(), ['equipment-1.csv'])
+    
+    @override_settings(RETENTION_KEEP_LATEST=None)
+    def test_size_quota(self):
+        """Test the oldest datasets go once a user's files exceed the quota."""
+        sizes = [self.upload(index).file_size for index in range(3)]
+        
+        with override_settings(RETENTION_MAX_BYTES_PER_USER=sizes[1] + sizes[2]):
+            self.upload(3)
+        
+        self.assertEqual(self.remaining(), ['equipment-3.csv', 'equipment-2.csv'])
+    
+    @override_settings(RETENTION_KEEP_LATEST=3, RETENTION_MAX_AGE_DAYS=30,
+                       RETENTION_MAX_BYTES_PER_USER=10 ** 9)
+    def test_query_count_independent_of_history(self):
+        """Test applying retention costs the same queries for any history length."""
+        def queries_for(history):
+            Dataset.objects.filter(user=self.user).delete()
+            Dataset.objects.bulk_create([
+                Dataset(filename=f'{i}.csv', summary_json={}, csv_path=f'uploads/{i}.csv', user=self.user)
+                for i in range(history)
+            ])
+            with CaptureQueriesContext(connection) as context:
+                deleted = apply_retention(self.user)
+            self.assertEqual(len(deleted), history - 3)
+            return len(context.captured_queries)
+        
+        self.assertEqual(queries_for(5), queries_for(50))
+    
+    def test_enforce_retention_deletes_unreferenced_files(self):
+        """Test the command removes files of deleted datasets only."""
+        kept = self.upload(0)
+        removed = self.upload(1)
+        removed_files = [removed.csv_path.name, removed.columnar_path.name]
+        removed.delete()
+        
+        call_command('enforce_retention', grace_seconds=0, stdout=StringIO())
+        
+        for name in removed_files:
+            self.assertFalse(default_storage.exists(name))
+        self.assertTrue(default_storage.exists(kept.csv_path.name))
+        self.assertTrue(default_storage.exists(kept.columnar_path.name))
+    
+    def test_enforce_retention_grace_period(self):
+        """Test recently written files survive, e.g. uploads in progress."""
+        name = default_storage.save('columnar/in-progress.arrow', BytesIO(b'data'))
+        
+        call_command('enforce_retention', stdout=StringIO())
+        self.assertTrue(default_storage.exists(name))
+        
+        call_command('enforce_retention', grace_seconds=0, dry_run=True, stdout=StringIO())
+        self.assertTrue(default_storage.exists(name))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), CACHES=TEST_CACHES)
+class BatchUploadTests(TestCase):
+    """Tests for uploading several files in one request."""
+    
+    def setUp(self):
+        """Set up test data."""
+        get_response_cache().clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+    
+    def csv_bytes(self, index):
+        return f"""Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-{index},Pump,{150 + index},45.2,85.3
+Valve-{index},Valve,{50 + index},10.0,25.0""".encode()
+
+    def named_file(self, content, name):
+        f = BytesIO(content)
+        f.name = name
+        return f
+    
+    def test_batch_of_csv_files(self):
+        """Test every file becomes a dataset and results keep file order."""
+        files = [self.named_file(self.csv_bytes(i), f'shift-{i}.csv') for i in range(3)]
+        with patch('api.ingest.Dataset.objects.bulk_create', wraps=Dataset.objects.bulk_create) as bulk:
+            response = self.client.post('/api/upload/batch/', {'files': files}, format='multipart')
+        
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(bulk.call_count, 1)
+        self.assertEqual([r['filename'] for r in response.data['results']],
+                         ['shift-0.csv', 'shift-1.csv', 'shift-2.csv'])
+        for i, result in enumerate(response.data['results']):
+            dataset = Dataset.objects.get(id=result['dataset_id'], user=self.user)
+            self.assertEqual(dataset.summary_json['total_count'], 2)
+            self.assertEqual(result['summary']['statistics']['Flowrate']['max'], 150 + i)
+            self.assertEqual(load_dataset_table(dataset).num_rows, 2)
+    
+    def test_batch_from_zip_archive(self):
+        """Test CSV files inside a zip archive are ingested."""
+        archive = BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            zf.writestr('exports/a.csv', self.csv_bytes(1))
+            zf.writestr('exports/b.csv', self.csv_bytes(2))
+            zf.writestr('exports/notes.txt', 'not data')
+            zf.writestr('__MACOSX/exports/._a.csv', 'junk')
+        archive = self.named_file(archive.getvalue(), 'exports.zip')
+        
+        response = self.client.post('/api/upload/batch/', {'files': [archive]}, format='multipart')
+        
+        self.assertEqual(response.status_code, 201)
+        results = {r['filename']: r for r in response.data['results']}
+        self.assertEqual(set(results), {'a.csv', 'b.csv', 'notes.txt'})
+        self.assertIsNotNone(results['a.csv']['dataset_id'])
+        self.assertEqual(results['notes.txt']['error'], 'File must be a CSV')
+        dataset = Dataset.objects.get(id=results['b.csv']['dataset_id'])
+        self.assertEqual(dataset.content_hash, hashlib.sha256(self.csv_bytes(2)).hexdigest())
+    
+    def test_batch_reports_errors_per_file(self):
+        """Test invalid files fail without failing the batch."""
+        files = [
+            self.named_file(self.csv_bytes(0), 'good.csv'),
+            self.named_file(b"Equipment Name,Type\nPump-A1,Pump", 'bad.csv'),
+            self.named_file(b"hello", 'readme.txt'),
+        ]
+        response = self.client.post('/api/upload/batch/', {'files': files}, format='multipart')
+        
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['failed'], 2)
+        good, bad, other = response.data['results']
+        self.assertIsNone(good['error'])
+        self.assertIn('Missing required columns', bad['error'])
+        self.assertIsNone(bad['dataset_id'])
+        self.assertIn('zip archive', other['error'])
+        self.assertEqual(Dataset.objects.filter(user=self.user).count(), 1)
+    
+    def test_batch_with_no_valid_files(self):
+        """Test a batch where every file fails returns 400."""
+        files = [self.named_file(b"hello", 'readme.txt')]
+        response = self.client.post('/api/upload/batch/', {'files': files}, format='multipart')
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.data['results']), 1)
+    
+    @override_settings(CSV_BATCH_MAX_FILES=2)
+    def test_batch_file_limit(self):
+        """Test batches over CSV_BATCH_MAX_FILES are rejected."""
+        files = [self.named_file(self.csv_bytes(i), f'{i}.csv') for i in range(3)]
+        response = self.client.post('/api/upload/batch/', {'files': files}, format='multipart')
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Dataset.objects.exists())
+    
+    def zip_file(self, members, name='exports.zip'):
+        """Build a deflated zip archive of {filename: bytes}."""
+        archive = BytesIO()
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for filename, content in members.items():
+                zf.writestr(filename, content)
+        return self.named_file(archive.getvalue(), name)
+    
+    @override_settings(CSV_BATCH_MAX_FILES=2)
+    def test_zip_file_limit_checked_before_extraction(self):
+        """Test an archive with too many members is refused without extracting any."""
+        archive = self.zip_file({f'{i}.csv': self.csv_bytes(i) for i in range(3)})
+        with patch('api.uploads.shutil.copyfileobj') as copy:
+            response = self.client.post('/api/upload/batch/', {'files': [archive]}, format='multipart')
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('at most 2 files', response.data['error'])
+        copy.assert_not_called()
+    
+    @override_settings(CSV_BATCH_MAX_TOTAL_SIZE=150)
+    def test_batch_total_size_limit(self):
+        """Test a batch whose uncompressed size is over the limit is refused before extraction."""
+        archive = self.zip_file({'a.csv': self.csv_bytes(1), 'b.csv': self.csv_bytes(2)})
+        with patch('api.uploads.shutil.copyfileobj') as copy:
+            response = self.client.post('/api/upload/batch/', {'files': [archive]}, format='multipart')
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('MB of CSV data', response.data['error'])
+        copy.assert_not_called()
+        self.assertFalse(Dataset.objects.exists())
+    
+    def test_corrupt_zip_member(self):
+        """Test a member with corrupt compressed data fails on its own."""
+        content = self.csv_bytes(2) * 50
+        archive = self.zip_file({'a.csv': self.csv_bytes(1), 'b.csv': content})
+        data = bytearray(archive.getvalue())
+        info = zipfile.ZipFile(BytesIO(bytes(data))).getinfo('b.csv')
+        # Local header: 30 fixed bytes, then the filename and extra field
+        header = info.header_offset
+        name_length = int.from_bytes(data[header + 26:header + 28], 'little')
+        extra_length = int.from_bytes(data[header + 28:header + 30], 'little')
+        start = header + 30 + name_length + extra_length
+        for offset in range(start + 2, start + info.compress_size - 2):
+            data[offset] ^= 0x5A
+        archive = self.named_file(bytes(data), 'exports.zip')
+        
+        response = self.client.post('/api/upload/batch/', {'files': [archive]}, format='multipart')
+        
+        self.assertEqual(response.status_code, 201)
+        results = {r['filename']: r for r in response.data['results']}
+        self.assertIsNone(results['a.csv']['error'])
+        self.assertEqual(results['b.csv']['error'], 'Corrupt file in zip archive')
+    
+    def test_large_batch_is_not_trimmed_by_cleanup(self):
+        """Test a batch larger than the history limit keeps all its datasets."""
+        self.client.post('/api/upload/', {'file': self.named_file(self.csv_bytes(99), 'old.csv')}, format='multipart')
+        files = [self.named_file(self.csv_bytes(i), f'{i}.csv') for i in range(7)]
+        response = self.client.post('/api/upload/batch/', {'files': files}, format='multipart')
+        
+        self.assertEqual(response.data['created'], 7)
+        ids = {r['dataset_id'] for r in response.data['results']}
+        self.assertEqual(set(Dataset.objects.filter(user=self.user).values_list('id', flat=True)), ids)
+    
+    def test_batch_reuses_existing_content(self):
+        """Test files already uploaded are not parsed again."""
+        first = self.client.post('/api/upload/', {'file': self.named_file(self.csv_bytes(0), 'a.csv')}, format='multipart')
+        with patch('api.ingest.process_csv_file', wraps=process_csv_file) as process:
+            response = self.client.post('/api/upload/batch/', {'files': [
+                self.named_file(self.csv_bytes(0), 'a-again.csv'),
+                self.named_file(self.csv_bytes(1), 'b.csv'),
+            ]}, format='multipart')
+        
+        self.assertEqual(process.call_count, 1)
+        reused = Dataset.objects.get(id=response.data['results'][0]['dataset_id'])
+        original = Dataset.objects.get(id=first.data['dataset_id'])
+        self.assertEqual(reused.csv_path.name, original.csv_path.name)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), CACHES=TEST_CACHES)
+class IngestionWorkerTests(TransactionTestCase):
+    """Tests for jobs run by the background thread pool."""
+    
+    def test_worker_thread_processes_job(self):
+        """Test a job submitted after commit is processed by a worker."""
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+        csv_file = BytesIO(b"""Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-A1,Pump,150.5,45.2,85.3""")
+        csv_file.name = 'equipment.csv'
+        
+        response = client.post('/api/upload/', {'file': csv_file, 'async': 'true'}, format='multipart')
+        self.assertEqual(response.status_code, 202)
+        
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            job = IngestionJob.objects.get(id=response.data['job_id'])
+            if job.status in (IngestionJob.STATUS_SUCCEEDED, IngestionJob.STATUS_FAILED):
+                break
+            time.sleep(0.05)
+        
+        self.assertEqual(job.status, IngestionJob.STATUS_SUCCEEDED)
+        self.assertIsNotNone(job.dataset_id)
+    
+    def test_worker_thread_renders_report(self):
+        """Test a report download is answered with 202 until a worker has rendered it."""
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+        csv_file = BytesIO(b"""Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-A1,Pump,150.5,45.2,85.3""")
+        csv_file.name = 'equipment.csv'
+        dataset_id = client.post('/api/upload/', {'file': csv_file}, format='multipart').data['dataset_id']
+        
+        response = client.get(f'/api/report/pdf/{dataset_id}/')
+        self.assertEqual(response.status_code, 202)
+        deadline = time.monotonic() + 10
+        while response.status_code == 202 and time.monotonic() < deadline:
+            time.sleep(0.05)
+            response = client.get(f'/api/report/pdf/{dataset_id}/')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), CACHES=TEST_CACHES)
+class ParallelParsingTests(TestCase):
+    """Tests for process-pool parsing of large CSV files."""
+    
+    def setUp(self):
+        """Write a CSV file large enough to split."""
+        rng = np.random.default_rng(1)
+        rows = 3000
+        self.df = pd.DataFrame({
+            'Equipment Name': [f'Unit-{i}' for i in range(rows)],
+            'Type': rng.choice(['Pump', 'Valve', 'Reactor'], rows),
+            'Flowrate': rng.normal(150.0, 20.0, rows).round(3),
+            'Pressure': rng.normal(5.0, 1.0, rows).round(3),
+            'Temperature': rng.normal(350.0, 5.0, rows).round(3),
+        })
+        handle, self.path = tempfile.mkstemp(suffix='.csv')
+        os.close(handle)
+        self.df.to_csv(self.path, index=False)
+        self.addCleanup(os.unlink, self.path)
+    
+    def test_split_csv_ranges_on_line_boundaries(self):
+        """Test ranges cover every data line exactly once."""
+        from . import parallel
+        
+        with patch.object(parallel, 'MIN_RANGE_BYTES', 1):
+            header, ranges = parallel.split_csv_ranges(self.path, 4)
+        
+        self.assertEqual(len(ranges), 4)
+        with open(self.path, 'rb') as f:
+            content = f.read()
+        self.assertEqual(header, content[:len(header)])
+        self.assertEqual(b''.join(content[a:b] for a, b in ranges), content[len(header):])
+        for start, _ in ranges:
+            self.assertEqual(content[start - 1:start], b'\n')
+    
+    def test_parallel_summary_matches_serial(self):
+        """Test merged worker results match the serial summary and rows."""
+        from . import parallel
+        
+        rows = []
+        sink = Mock()
+        sink.write_table.side_effect = lambda table: rows.extend(table.column('Equipment Name').to_pylist())
+        with patch.object(parallel, 'MIN_RANGE_BYTES', 1):
+            data, summary, error = parallel.process_csv_file_parallel(self.path, 2, sink=sink)
+        
+        self.assertIsNone(error)
+        self.assertIsNone(data)
+        expected = calculate_summary(self.df)
+        self.assertEqual(summary['total_count'], 3000)
+        self.assertEqual(summary['type_distribution'], expected['type_distribution'])
+        self.assertAlmostEqual(summary['statistics']['Flowrate']['std'],
+                               expected['statistics']['Flowrate']['std'])
+        self.assertEqual(rows, self.df['Equipment Name'].tolist())
+    
+    def test_parallel_progress_reports_fraction(self):
+        """Test progress from the pool covers the file's bytes, not the caller's file position."""
+        from . import parallel
+        
+        reports = []
+        with patch.object(parallel, 'MIN_RANGE_BYTES', 1):
+            parallel.process_csv_file_parallel(
+                self.path, 2, progress=lambda rows, fraction: reports.append((rows, fraction))
+            )
+        
+        self.assertEqual(len(reports), 4)
+        self.assertEqual(reports[-1], (3000, 1.0))
+        fractions = [fraction for _, fraction in reports]
+        self.assertEqual(fractions, sorted(fractions))
+        self.assertGreater(fractions[0], 0)
+    
+    @override_settings(INGEST_JOBS_EAGER=True, CSV_PARSE_WORKERS=2, CSV_PARALLEL_THRESHOLD=0)
+    def test_parallel_job_reports_progress(self):
+        """Test a job parsed by the pool records progress before it finishes."""
+        from . import jobs, parallel
+        from django.core.files import File
+        
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        with open(self.path, 'rb') as f:
+            job = IngestionJob.objects.create(
+                user=user, filename='big.csv', upload=File(f, name='big.csv')
+            )
+        recorded = []
+        real_parallel = parallel.process_csv_file_parallel
+        
+        def parse_and_watch(path, workers, sink=None, progress=None):
+            def report(rows, fraction=None):
+                progress(rows, fraction=fraction)
+                recorded.append(IngestionJob.objects.get(id=job.id).progress)
+            return real_parallel(path, workers, sink=sink, progress=report)
+        
+        with patch.object(parallel, 'MIN_RANGE_BYTES', 1), \
+                patch('api.ingest.process_csv_file_parallel', side_effect=parse_and_watch):
+            self.assertTrue(jobs.run_ingestion_job(job.id))
+        
+        job.refresh_from_db()
+        self.assertEqual(job.status, IngestionJob.STATUS_SUCCEEDED)
+        self.assertEqual(len(recorded), 4)
+        self.assertGreater(recorded[0], 0)
+        self.assertEqual(recorded[-1], 1.0)
+    
+    def test_parallel_reports_validation_errors(self):
+        """Test a bad value in any range fails the whole file."""
+        from . import parallel
+        
+        with open(self.path, 'a') as f:
+            f.write('Unit-x,Pump,abc,1.0,2.0\n')
+        with patch.object(parallel, 'MIN_RANGE_BYTES', 1):
+            _, summary, error = parallel.process_csv_file_parallel(self.path, 2)
+        
+        self.assertIsNone(summary)
+        self.assertIn('Flowrate', error)
+    
+    @override_settings(CSV_PARSE_WORKERS=2, CSV_PARALLEL_THRESHOLD=0)
+    def test_ingest_uses_parallel_path_for_files_on_disk(self):
+        """Test ingest_csv parses large on-disk files in parallel."""
+        from .ingest import ingest_csv
+        from django.core.files import File
+        
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        with open(self.path, 'rb') as f:
+            dataset, data, error = ingest_csv(File(f, name='big.csv'), 'big.csv', user, path=self.path)
+        
+        self.assertIsNone(error)
+        self.assertIsNone(data)
+        self.assertEqual(dataset.summary_json['total_count'], 3000)
+        self.assertEqual(load_dataset_table(dataset).num_rows, 3000)
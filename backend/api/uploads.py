@@ -0,0 +1,169 @@
+"""
+Upload handling: content hashing and batch unpacking.
+
+The upload handlers extend Django's default memory and temporary-file
+handlers and set a `content_hash` attribute (hex SHA-256) on each uploaded
+file, so duplicate uploads can be recognized without reading the file a
+second time.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import zipfile
+import zlib
+
+from django.core.files import File
+from django.core.files.uploadhandler import (MemoryFileUploadHandler,
+                                             TemporaryFileUploadHandler)
+
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+class HashingUploadMixin:
+    """Hash the chunks this handler stores and attach the digest to the file."""
+    
+    def new_file(self, *args, **kwargs):
+        # Set up first: the memory handler raises StopFutureHandlers here
+        self._content_hash = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+    
+    def receive_data_chunk(self, raw_data, start):
+        remaining = super().receive_data_chunk(raw_data, start)
+        # None means this handler kept the chunk; otherwise it is passed on
+        # to the next handler, which hashes it instead
+        if remaining is None:
+            self._content_hash.update(raw_data)
+        return remaining
+    
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.content_hash = self._content_hash.hexdigest()
+        return file
+
+
+class HashingMemoryFileUploadHandler(HashingUploadMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadMixin, TemporaryFileUploadHandler):
+    pass
+
+
+def hash_file(file):
+    """
+    Return the hex SHA-256 of a file's content.
+    Uses the digest computed during upload when available; otherwise reads
+    the file in blocks and rewinds it.
+    """
+    content_hash = getattr(file, 'content_hash', None)
+    if content_hash:
+        return content_hash
+    
+    digest = hashlib.sha256()
+    file.seek(0)
+    for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b''):
+        digest.update(block)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def expand_batch_uploads(uploads, max_size, max_files, max_total_size):
+    """
+    Turn the files of a batch upload into the list of CSV files to ingest.
+    
+    CSV files are used as they are and zip archives are replaced by the CSV
+    files they contain, extracted to temporary files. Files that cannot be
+    used keep their place in the list with an error message.
+    
+    Nothing is extracted unless the batch holds at most `max_files` files
+    whose sizes (uncompressed, for archive members) add up to at most
+    `max_total_size` bytes; otherwise the whole batch is refused.
+    
+    Returns: (entries, error). entries is a list of (file, filename, error)
+    triples, where file is None if error is set.
+    """
+    # One plan per upload: an entry to use as it is, or an open archive
+    # with the members to extract
+    plans = []
+    count = total = 0
+    try:
+        for upload in uploads:
+            if upload.size > max_size:
+                plans.append((None, upload.name, _size_error(max_size)))
+            elif upload.name.lower().endswith('.zip'):
+                try:
+                    archive = zipfile.ZipFile(upload)
+                except zipfile.BadZipFile:
+                    plans.append((None, upload.name, 'Invalid zip archive'))
+                    count += 1
+                    continue
+                members = _zip_members(archive)
+                plans.append((archive, members))
+                count += len(members)
+                total += sum(info.file_size for info in members
+                             if info.filename.endswith('.csv') and info.file_size <= max_size)
+                continue
+            elif upload.name.endswith('.csv'):
+                plans.append((upload, upload.name, None))
+                total += upload.size
+            else:
+                plans.append((None, upload.name, 'File must be a CSV or a zip archive of CSV files'))
+            count += 1
+        
+        if count > max_files:
+            return [], f'A batch can contain at most {max_files} files'
+        if total > max_total_size:
+            return [], f'A batch can contain at most {max_total_size // (1024 * 1024)}MB of CSV data'
+        
+        entries = []
+        for plan in plans:
+            if len(plan) == 2:
+                entries.extend(_extract_members(*plan, max_size))
+            else:
+                entries.append(plan)
+        return entries, None
+    finally:
+        for plan in plans:
+            if len(plan) == 2:
+                plan[0].close()
+
+
+def _zip_members(archive):
+    """Return the archive's file entries, skipping directories and macOS metadata."""
+    members = []
+    for info in archive.infolist():
+        filename = os.path.basename(info.filename)
+        if info.is_dir() or info.filename.startswith('__MACOSX/') or filename.startswith('.'):
+            continue
+        members.append(info)
+    return members
+
+
+def _extract_members(archive, members, max_size):
+    entries = []
+    for info in members:
+        filename = os.path.basename(info.filename)
+        if not filename.endswith('.csv'):
+            entries.append((None, filename, 'File must be a CSV'))
+        elif info.file_size > max_size:
+            entries.append((None, filename, _size_error(max_size)))
+        else:
+            extracted = tempfile.TemporaryFile()
+            try:
+                # Reads stop at the member's declared size
+                with archive.open(info) as member:
+                    shutil.copyfileobj(member, extracted, HASH_BLOCK_SIZE)
+            except (zipfile.BadZipFile, zlib.error, EOFError):
+                extracted.close()
+                entries.append((None, filename, 'Corrupt file in zip archive'))
+                continue
+            extracted.seek(0)
+            entries.append((File(extracted, name=filename), filename, None))
+    return entries
+
+
+def _size_error(max_size):
+    return f'File size exceeds {max_size // (1024 * 1024)}MB limit'
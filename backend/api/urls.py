@@ -4,7 +4,18 @@ from . import views
 urlpatterns = [
     path('auth/login/', views.login_view, name='login'),
     path('upload/', views.upload_csv, name='upload'),
+    path('upload/batch/', views.upload_batch, name='upload_batch'),
+    path('upload/chunked/', views.start_chunked_upload, name='chunked_upload_start'),
+    path('upload/chunked/<int:upload_id>/', views.chunked_upload, name='chunked_upload'),
+    path('upload/chunked/<int:upload_id>/complete/', views.complete_chunked_upload,
+         name='chunked_upload_complete'),
     path('history/', views.get_history, name='history'),
     path('summary/<int:dataset_id>/', views.get_summary, name='summary'),
+    path('datasets/compare/', views.compare_datasets, name='dataset_compare'),
+    path('datasets/<int:dataset_id>/rows/', views.get_rows, name='dataset_rows'),
+    path('datasets/<int:dataset_id>/series/', views.get_series, name='dataset_series'),
+    path('datasets/<int:dataset_id>/histograms/', views.get_histograms, name='dataset_histograms'),
+    path('datasets/<int:dataset_id>/aggregate/', views.aggregate_dataset, name='dataset_aggregate'),
+    path('jobs/<int:job_id>/', views.get_job, name='job'),
     path('report/pdf/<int:dataset_id>/', views.generate_pdf_report, name='pdf_report'),
 ]
@@ -1,14 +1,30 @@
+import numpy as np
 import pandas as pd
 from rest_framework import status
 from rest_framework.response import Response
+from .sketches import (build_sketch, digest_quantiles, empty_sketch, merge_sketches,
+                       moment_statistics)
+
+
+REQUIRED_COLUMNS = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+NUMERIC_COLUMNS = ['Flowrate', 'Pressure', 'Temperature']
+PERCENTILES = (25, 50, 75)
+
+# Parse Type as categorical so it is factorized once during parsing
+CSV_DTYPES = {'Type': 'category'}
+
+
+class CSVValidationError(ValueError):
+    """
+    Raised when uploaded CSV content fails validation.
+    """
 
 
 def validate_csv_columns(df):
     """
     Validate that CSV has required columns.
     """
-    required_columns = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
-    missing_columns = [col for col in required_columns if col not in df.columns]
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
     
     if missing_columns:
         return False, f"Missing required columns: {', '.join(missing_columns)}"
@@ -16,28 +32,212 @@ def validate_csv_columns(df):
     return True, None
 
 
+def coerce_numeric_columns(df):
+    """
+    Convert the numeric columns of a dataframe in place.
+    Raises CSVValidationError if a column contains non-numeric values.
+    """
+    for col in NUMERIC_COLUMNS:
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            try:
+                df[col] = pd.to_numeric(df[col])
+            except (ValueError, TypeError):
+                raise CSVValidationError(f"Column '{col}' must contain numeric values")
+    
+    return df
+
+
+def _sorted_percentiles(values, percentiles):
+    """Linear-interpolated percentiles of already sorted values."""
+    if not len(values):
+        return [None] * len(percentiles)
+    positions = np.asarray(percentiles, dtype=np.float64) / 100 * (len(values) - 1)
+    lower = np.floor(positions).astype(np.intp)
+    upper = np.minimum(lower + 1, len(values) - 1)
+    fraction = positions - lower
+    return [float(v) for v in values[lower] + (values[upper] - values[lower]) * fraction]
+
+
+def summary_from_sketch(sketch, exact_percentiles=None):
+    """
+    Build a summary dict from a sketch.
+    
+    Percentiles are estimated from the sketch's t-digests unless
+    `exact_percentiles` maps column names to precomputed values.
+    """
+    statistics = {}
+    for col in NUMERIC_COLUMNS:
+        column = sketch['columns'].get(col) or {'count': 0, 'sum': 0.0, 'm2': 0.0,
+                                                'min': None, 'max': None, 'digest': []}
+        mean, std = moment_statistics(column)
+        if exact_percentiles is not None:
+            percentile_values = exact_percentiles[col]
+        else:
+            percentile_values = digest_quantiles(
+                column['digest'], [q / 100 for q in PERCENTILES], column['min'], column['max']
+            )
+        stats = {
+            'count': column['count'],
+            'mean': mean,
+            'min': column['min'],
+            'max': column['max'],
+            'std': std,
+        }
+        for q, value in zip(PERCENTILES, percentile_values):
+            stats[f'p{q}'] = value
+        statistics[col] = stats
+    
+    # Most common types first, matching value_counts()
+    types = sorted(sketch['types'].items(), key=lambda item: item[1]['count'], reverse=True)
+    type_distribution = {}
+    type_statistics = {}
+    for label, type_sketch in types:
+        type_distribution[label] = type_sketch['count']
+        type_stats = {'count': type_sketch['count']}
+        for col in NUMERIC_COLUMNS:
+            moments = type_sketch['columns'][col]
+            mean, std = moment_statistics(moments)
+            type_stats[col] = {'mean': mean, 'min': moments['min'], 'max': moments['max'], 'std': std}
+        type_statistics[label] = type_stats
+    
+    return {
+        'total_count': sketch['count'],
+        'avg_flowrate': statistics['Flowrate']['mean'],
+        'avg_pressure': statistics['Pressure']['mean'],
+        'avg_temperature': statistics['Temperature']['mean'],
+        'type_distribution': type_distribution,
+        'statistics': statistics,
+        'type_statistics': type_statistics,
+        'sketch': sketch,
+    }
+
+
+def summarize_arrays(columns, type_codes, type_labels):
+    """
+    Compute summary statistics from pre-extracted arrays.
+    
+    `columns` is a (3, n) float64 array with one contiguous row per entry in
+    NUMERIC_COLUMNS, and `type_codes` maps each row to an index into
+    `type_labels` (-1 for a missing type). Every statistic is a vectorized
+    reduction over these arrays, so the cost per row is a small constant.
+    The summary includes a mergeable sketch; percentiles are exact.
+    """
+    sorted_columns = np.sort(columns, axis=1)
+    sketch = build_sketch(columns, NUMERIC_COLUMNS, type_codes, type_labels,
+                          sorted_columns=sorted_columns)
+    exact_percentiles = {
+        col: _sorted_percentiles(sorted_columns[i, :sketch['columns'][col]['count']], PERCENTILES)
+        for i, col in enumerate(NUMERIC_COLUMNS)
+    }
+    return summary_from_sketch(sketch, exact_percentiles=exact_percentiles)
+
+
+def sketch_dataframe(df):
+    """Build a mergeable sketch from a dataframe chunk."""
+    columns, type_codes, type_labels = dataframe_to_arrays(df)
+    return build_sketch(columns, NUMERIC_COLUMNS, type_codes, type_labels)
+
+
+def merge_summaries(summaries):
+    """
+    Combine summaries of separate chunks or datasets into one.
+    Only the stored sketches are used, so no rows are re-read.
+    """
+    return summary_from_sketch(merge_sketches(*(s['sketch'] for s in summaries)))
+
+
+def dataframe_to_arrays(df):
+    """
+    Extract the numeric columns and factorized Type column from a dataframe.
+    Returns (columns, type_codes, type_labels) for summarize_arrays.
+    """
+    columns = np.empty((len(NUMERIC_COLUMNS), len(df)), dtype=np.float64)
+    for i, col in enumerate(NUMERIC_COLUMNS):
+        columns[i] = df[col].to_numpy(dtype=np.float64)
+    type_codes, type_labels = pd.factorize(df['Type'])
+    type_labels = [
+        label.item() if isinstance(label, np.generic) else label
+        for label in type_labels
+    ]
+    return columns, type_codes, type_labels
+
+
 def calculate_summary(df):
     """
     Calculate summary statistics from the dataframe.
+    
+    Each numeric column is copied once into a contiguous float64 row and the
+    Type column is factorized once; summarize_arrays does the rest.
     """
-    summary = {
-        'total_count': len(df),
-        'avg_flowrate': float(df['Flowrate'].mean()),
-        'avg_pressure': float(df['Pressure'].mean()),
-        'avg_temperature': float(df['Temperature'].mean()),
-        'type_distribution': df['Type'].value_counts().to_dict()
-    }
+    return summarize_arrays(*dataframe_to_arrays(df))
+
+
+class SummaryAccumulator:
+    """
+    Running summary statistics built up one dataframe chunk at a time.
     
-    return summary
+    Each chunk is reduced to a sketch and merged into the running sketch, so
+    memory use does not grow with the number of rows seen.
+    """
+    
+    def __init__(self):
+        self.sketch = empty_sketch()
+    
+    @property
+    def total_count(self):
+        return self.sketch['count']
+    
+    def update(self, df):
+        """Add a chunk of rows to the running totals."""
+        self.sketch = merge_sketches(self.sketch, sketch_dataframe(df))
+    
+    def summary(self):
+        """Return the summary in the same shape as calculate_summary."""
+        return summary_from_sketch(self.sketch)
+
+
+def iter_csv_chunks(file, chunksize):
+    """
+    Yield validated dataframe chunks of at most `chunksize` rows.
+    Raises CSVValidationError on the first invalid chunk.
+    """
+    with pd.read_csv(file, chunksize=chunksize, dtype=CSV_DTYPES) as reader:
+        for index, chunk in enumerate(reader):
+            if index == 0:
+                is_valid, error_message = validate_csv_columns(chunk)
+                if not is_valid:
+                    raise CSVValidationError(error_message)
+            yield coerce_numeric_columns(chunk)
 
 
-def process_csv_file(file):
+def process_csv_file(file, chunksize=None, sink=None, include_data=True, progress=None):
     """
     Process uploaded CSV file and return data and summary.
+    
+    When `chunksize` is given the file is read in streaming mode: rows are
+    summarized chunk by chunk and discarded, and `data` is returned as None.
+    `data` is also None when `include_data` is False.
+    If `sink` is given, each validated chunk (or the whole dataframe) is also
+    passed to `sink.write()`, e.g. to build the columnar copy in the same pass.
+    `progress`, if given, is called with the number of rows processed so far.
     """
     try:
+        if chunksize:
+            accumulator = SummaryAccumulator()
+            for chunk in iter_csv_chunks(file, chunksize=chunksize):
+                accumulator.update(chunk)
+                if sink is not None:
+                    sink.write(chunk)
+                if progress is not None:
+                    progress(accumulator.total_count)
+            
+            if accumulator.total_count < 1:
+                return None, None, "CSV file must contain at least one row of data"
+            
+            return None, accumulator.summary(), None
+        
         # Read CSV file
-        df = pd.read_csv(file)
+        df = pd.read_csv(file, dtype=CSV_DTYPES)
         
         # Validate columns
         is_valid, error_message = validate_csv_columns(df)
@@ -45,26 +245,32 @@ def process_csv_file(file):
             return None, None, error_message
         
         # Validate numeric columns
-        numeric_columns = ['Flowrate', 'Pressure', 'Temperature']
-        for col in numeric_columns:
-            if not pd.api.types.is_numeric_dtype(df[col]):
-                try:
-                    df[col] = pd.to_numeric(df[col])
-                except:
-                    return None, None, f"Column '{col}' must contain numeric values"
+        coerce_numeric_columns(df)
         
         # Check minimum rows
         if len(df) < 1:
             return None, None, "CSV file must contain at least one row of data"
         
+        if sink is not None:
+            sink.write(df)
+        if progress is not None:
+            progress(len(df))
+        
         # Calculate summary
         summary = calculate_summary(df)
         
-        # Convert dataframe to list of dictionaries
-        data = df.to_dict('records')
+        if not include_data:
+            return None, summary, None
         
-        return data, summary, None
+        # Records of the required columns in their usual order, missing values
+        # as None: the shape rows read back from the columnar copy have
+        rows = df[REQUIRED_COLUMNS]
+        data = rows.astype(object).where(rows.notna(), None).to_dict('records')
         
+        return data, summary, None
+    
+    except CSVValidationError as e:
+        return None, None, str(e)
     except pd.errors.EmptyDataError:
         return None, None, "CSV file is empty"
     except pd.errors.ParserError:
@@ -1,21 +1,37 @@
+from django.conf import settings
 from django.contrib.auth import authenticate
 from django.core.files.base import ContentFile
-from django.http import HttpResponse
+from django.core.files.storage import default_storage
+from django.http import FileResponse
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
-from .models import Dataset
-from .utils import process_csv_file
+from .aggregates import aggregate_table, parse_aggregate_query
+from .comparison import compare_summaries, parse_dataset_ids
+from .downsample import downsample_columns, parse_series_query
+from .formats import ROW_RENDERERS, format_rows
+from .histograms import (HISTOGRAM_COLUMNS, compute_histograms, parse_histogram_query,
+                         select_histograms)
+from .ingest import choose_chunksize, ingest_batch, ingest_csv, uploaded_file_path
+from .jobs import job_status, submit_ingestion_job
+from .models import ChunkedUpload, Dataset, IngestionJob
+from .reports import request_report
+from .records import aggregate_records, query_records, records_ready
+from .resumable import chunked_upload_status, create_chunked_upload, write_chunk
+from .response_cache import (aggregate_key, cached_entry, conditional_response,
+                             get_response_cache, history_key, make_entry, series_key,
+                             summary_key)
+from .rows import parse_row_query, query_rows, rows_response
+from .storage import load_dataset_table
+from .uploads import expand_batch_uploads, hash_file
 import json
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.units import inch
-from io import BytesIO
-from datetime import datetime
+
+
+# Columns needed to render history and summary entries; the file paths and
+# hashes are not loaded for these
+SUMMARY_FIELDS = ('id', 'filename', 'upload_timestamp', 'summary_json')
 
 
 @api_view(['POST'])
@@ -52,6 +68,7 @@ def login_view(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@renderer_classes(ROW_RENDERERS)
 def upload_csv(request):
     """
     Upload and process CSV file.
@@ -64,10 +81,11 @@ def upload_csv(request):
     
     file = request.FILES['file']
     
-    # Check file size (10MB limit)
-    if file.size > 10 * 1024 * 1024:
+    # Check file size
+    max_size = settings.CSV_UPLOAD_MAX_SIZE
+    if file.size > max_size:
         return Response(
-            {'error': 'File size exceeds 10MB limit'},
+            {'error': f'File size exceeds {max_size // (1024 * 1024)}MB limit'},
             status=status.HTTP_400_BAD_REQUEST
         )
     
@@ -78,8 +96,30 @@ def upload_csv(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Process CSV
-    data, summary, error = process_csv_file(file)
+    # Large files can be processed in the background; the client polls the
+    # job status endpoint instead of holding the request open
+    if _is_truthy(request.data.get('async', 'false')):
+        job = IngestionJob.objects.create(
+            user=request.user,
+            filename=file.name,
+            upload=file,
+            content_hash=hash_file(file)
+        )
+        submit_ingestion_job(job)
+        job.refresh_from_db()
+        return Response(job_status(job), status=status.HTTP_202_ACCEPTED)
+    
+    # Rows can be left out of the response and fetched page by page from
+    # the rows endpoint instead
+    include_data = _is_truthy(request.data.get('include_data', 'true'))
+    
+    # Process CSV (large files are streamed in chunks and rows are not returned)
+    dataset, data, error = ingest_csv(
+        file, file.name, request.user,
+        chunksize=choose_chunksize(file.size),
+        include_data=include_data,
+        path=uploaded_file_path(file)
+    )
     
     if error:
         return Response(
@@ -87,43 +127,218 @@ def upload_csv(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Reset file pointer
-    file.seek(0)
+    return _upload_response(request, dataset, data)
+
+
+def _upload_response(request, dataset, data):
+    """Build the 201 response for an ingested upload in the negotiated row format."""
+    body = {
+        'dataset_id': dataset.id,
+        'filename': dataset.filename,
+        'timestamp': dataset.upload_timestamp.isoformat(),
+        'data_included': data is not None,
+        'summary': dataset.summary_json
+    }
+    if request.accepted_renderer.format in ('json', 'api'):
+        body['data'] = data if data is not None else []
+        return Response(body, status=status.HTTP_201_CREATED)
+    
+    # Other formats are built from the columnar copy
+    table = load_dataset_table(dataset)
+    if data is None:
+        table = table.slice(0, 0)
+    return Response(format_rows(request, body, 'data', table), status=status.HTTP_201_CREATED)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def upload_batch(request):
+    """
+    Upload and process several CSV files at once, sent as repeated 'files'
+    fields and/or as zip archives of CSV files.
+    """
+    uploads = request.FILES.getlist('files')
+    if not uploads:
+        return Response(
+            {'error': 'No files provided'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
-    # Create dataset record
-    dataset = Dataset.objects.create(
-        filename=file.name,
-        summary_json=summary,
-        csv_path=file,
-        user=request.user
+    entries, error = expand_batch_uploads(
+        uploads, settings.CSV_UPLOAD_MAX_SIZE,
+        settings.CSV_BATCH_MAX_FILES, settings.CSV_BATCH_MAX_TOTAL_SIZE
+    )
+    if error:
+        return Response(
+            {'error': error},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        valid = [(file, filename) for file, filename, error in entries if error is None]
+        outcomes = iter(ingest_batch(valid, request.user) if valid else [])
+        
+        results = []
+        for file, filename, error in entries:
+            dataset = None
+            if error is None:
+                dataset, error = next(outcomes)
+            results.append({
+                'filename': filename,
+                'dataset_id': dataset.id if dataset else None,
+                'summary': dataset.summary_json if dataset else None,
+                'error': error,
+            })
+    finally:
+        for file, _, _ in entries:
+            if file is not None:
+                file.close()
+    
+    created = sum(1 for result in results if result['error'] is None)
+    body = {
+        'created': created,
+        'failed': len(results) - created,
+        'results': results,
+    }
+    if not created:
+        body['error'] = 'No files could be processed'
+        return Response(body, status=status.HTTP_400_BAD_REQUEST)
+    return Response(body, status=status.HTTP_201_CREATED)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def start_chunked_upload(request):
+    """
+    Start a resumable upload. Expects 'filename' and 'size' (bytes); see
+    resumable.py for the protocol.
+    """
+    upload, error = create_chunked_upload(
+        request.user, str(request.data.get('filename', '')), request.data.get('size')
     )
+    if error:
+        return Response(
+            {'error': error},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    return Response(chunked_upload_status(upload), status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET', 'PUT'])
+@permission_classes([IsAuthenticated])
+def chunked_upload(request, upload_id):
+    """
+    GET reports how many bytes of a resumable upload have arrived. PUT
+    writes the request body at the offset in the Upload-Offset header,
+    which must match the bytes received so far.
+    """
+    try:
+        upload = ChunkedUpload.objects.get(id=upload_id, user=request.user)
+    except ChunkedUpload.DoesNotExist:
+        return Response(
+            {'error': 'Upload not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
     
-    # Cleanup old datasets (keep only last 5)
-    cleanup_old_datasets(request.user)
+    if request.method == 'GET':
+        return Response(chunked_upload_status(upload))
     
-    return Response({
-        'dataset_id': dataset.id,
-        'filename': dataset.filename,
-        'timestamp': dataset.upload_timestamp.isoformat(),
-        'data': data,
-        'summary': summary
-    }, status=status.HTTP_201_CREATED)
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return Response(
+            {'error': 'Upload-Offset header must be a byte offset'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if offset != upload.offset:
+        return Response(
+            {'error': 'Offset does not match the bytes received', **chunked_upload_status(upload)},
+            status=status.HTTP_409_CONFLICT
+        )
+    
+    written, error = write_chunk(upload, offset, request.stream)
+    if error:
+        return Response(
+            {'error': error},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if written is None:
+        # Another request for this upload got there first
+        upload.refresh_from_db()
+        return Response(
+            {'error': 'Offset does not match the bytes received', **chunked_upload_status(upload)},
+            status=status.HTTP_409_CONFLICT
+        )
+    
+    return Response(chunked_upload_status(upload))
 
 
-def cleanup_old_datasets(user):
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@renderer_classes(ROW_RENDERERS)
+def complete_chunked_upload(request, upload_id):
     """
-    Keep only the last 5 datasets for a user.
+    Process a resumable upload once all its bytes have arrived. Takes the
+    same 'async' and 'include_data' options and returns the same response
+    as upload_csv.
     """
-    datasets = Dataset.objects.filter(user=user).order_by('-upload_timestamp')
+    try:
+        upload = ChunkedUpload.objects.get(id=upload_id, user=request.user)
+    except ChunkedUpload.DoesNotExist:
+        return Response(
+            {'error': 'Upload not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    if upload.offset != upload.size:
+        return Response(
+            {'error': 'Upload is incomplete', **chunked_upload_status(upload)},
+            status=status.HTTP_409_CONFLICT
+        )
+    
+    name = upload.file.name
+    with upload.file.open('rb') as f:
+        content_hash = hash_file(f)
+    
+    # From here the file belongs to the job or dataset, not the upload
+    if _is_truthy(request.data.get('async', 'false')):
+        job = IngestionJob.objects.create(
+            user=request.user,
+            filename=upload.filename,
+            upload=name,
+            content_hash=content_hash
+        )
+        upload.delete()
+        submit_ingestion_job(job)
+        job.refresh_from_db()
+        return Response(job_status(job), status=status.HTTP_202_ACCEPTED)
+    
+    include_data = _is_truthy(request.data.get('include_data', 'true'))
+    with upload.file.open('rb') as f:
+        dataset, data, error = ingest_csv(
+            f, upload.filename, request.user,
+            chunksize=choose_chunksize(upload.size),
+            include_data=include_data,
+            stored_name=name,
+            path=upload.file.path,
+            content_hash=content_hash
+        )
+    upload.delete()
     
-    if datasets.count() > 5:
-        old_datasets = datasets[5:]
-        for dataset in old_datasets:
-            # Delete the file
-            if dataset.csv_path:
-                dataset.csv_path.delete()
-            # Delete the record
-            dataset.delete()
+    if error:
+        default_storage.delete(name)
+        return Response(
+            {'error': error},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    return _upload_response(request, dataset, data)
+
+
+def _is_truthy(value):
+    """Interpret a form or query value as a boolean flag."""
+    return str(value).lower() not in ('0', 'false', 'no', 'off')
 
 
 @api_view(['GET'])
@@ -132,20 +347,28 @@ def get_history(request):
     """
     Get the last 5 dataset uploads for the authenticated user.
     """
-    datasets = Dataset.objects.filter(user=request.user).order_by('-upload_timestamp')[:5]
-    
-    history_data = []
-    for dataset in datasets:
-        history_data.append({
-            'id': dataset.id,
-            'filename': dataset.filename,
-            'timestamp': dataset.upload_timestamp.isoformat(),
-            'summary': dataset.summary_json
-        })
-    
-    return Response({
-        'datasets': history_data
-    })
+    def build():
+        datasets = list(
+            Dataset.objects.filter(user=request.user)
+            .order_by('-upload_timestamp')
+            .only(*SUMMARY_FIELDS)[:5]
+        )
+        
+        history_data = []
+        for dataset in datasets:
+            history_data.append({
+                'id': dataset.id,
+                'filename': dataset.filename,
+                'timestamp': dataset.upload_timestamp.isoformat(),
+                'summary': dataset.summary_json
+            })
+        
+        # ETag only: deleting datasets changes the list without a newer
+        # upload time, so no Last-Modified would be right
+        return make_entry({'datasets': history_data})
+    
+    entry = cached_entry(history_key(request.user.id), build)
+    return conditional_response(request, entry)
 
 
 @api_view(['GET'])
@@ -154,19 +377,221 @@ def get_summary(request, dataset_id):
     """
     Get summary for a specific dataset.
     """
-    try:
-        dataset = Dataset.objects.get(id=dataset_id, user=request.user)
-        return Response({
+    def build():
+        try:
+            dataset = Dataset.objects.only(*SUMMARY_FIELDS).get(id=dataset_id, user=request.user)
+        except Dataset.DoesNotExist:
+            return None
+        return make_entry({
             'id': dataset.id,
             'filename': dataset.filename,
             'timestamp': dataset.upload_timestamp.isoformat(),
             'summary': dataset.summary_json
-        })
+        }, dataset.upload_timestamp)
+    
+    entry = cached_entry(summary_key(request.user.id, dataset_id), build)
+    if entry is None:
+        return Response(
+            {'error': 'Dataset not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    return conditional_response(request, entry)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_histograms(request, dataset_id):
+    """
+    Get the fixed and quantile-bin histograms stored for a dataset. See
+    histograms.parse_histogram_query for parameters.
+    """
+    try:
+        dataset = Dataset.objects.only(
+            'id', 'upload_timestamp', 'columnar_path', 'histograms_json'
+        ).get(id=dataset_id, user=request.user)
+    except Dataset.DoesNotExist:
+        return Response(
+            {'error': 'Dataset not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    selection, error = parse_histogram_query(request.query_params)
+    if error:
+        return Response(
+            {'error': error},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # Datasets ingested before histograms existed are binned on first request
+    if not dataset.histograms_json:
+        dataset.histograms_json = compute_histograms(
+            load_dataset_table(dataset, columns=HISTOGRAM_COLUMNS)
+        )
+        dataset.save(update_fields=['histograms_json'])
+    
+    body = select_histograms(dataset.histograms_json, **selection)
+    body['dataset_id'] = dataset.id
+    return conditional_response(request, make_entry(body, dataset.upload_timestamp))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def compare_datasets(request):
+    """
+    Compare several datasets from their stored summaries.
+    Pass ids=1,2,3 to choose them; the default is the last 5 uploads.
+    """
+    ids, error = parse_dataset_ids(request.query_params.get('ids', ''))
+    if error:
+        return Response(
+            {'error': error},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    datasets = Dataset.objects.filter(user=request.user).only(*SUMMARY_FIELDS, 'sketch_json')
+    if ids:
+        datasets = list(datasets.filter(id__in=ids))
+        missing = sorted(set(ids) - {dataset.id for dataset in datasets})
+        if missing:
+            return Response(
+                {'error': f"Datasets not found: {', '.join(map(str, missing))}"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+    else:
+        datasets = list(datasets.order_by('-upload_timestamp')[:5])
+    
+    # Trends run from the oldest upload to the newest
+    datasets.sort(key=lambda dataset: (dataset.upload_timestamp, dataset.id))
+    return Response(compare_summaries(datasets))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes(ROW_RENDERERS)
+def get_rows(request, dataset_id):
+    """
+    Get a page of rows for a dataset, with optional column projection,
+    filtering and ordering. See rows.parse_row_query for parameters and
+    formats for the negotiated row formats.
+    """
+    try:
+        dataset = Dataset.objects.defer('summary_json').get(id=dataset_id, user=request.user)
     except Dataset.DoesNotExist:
         return Response(
             {'error': 'Dataset not found'},
             status=status.HTTP_404_NOT_FOUND
         )
+    
+    query, error = parse_row_query(request.query_params)
+    if error:
+        return Response(
+            {'error': error},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # Stored records answer in SQL; otherwise read the columnar copy
+    if records_ready(dataset):
+        page, total = query_records(dataset, query)
+    else:
+        table = load_dataset_table(dataset, columns=query.referenced_columns())
+        page, total = query_rows(table, query)
+    
+    body = rows_response(dataset, page, total, query)
+    return Response(format_rows(request, body, 'rows', page))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_series(request, dataset_id):
+    """
+    Get the numeric columns downsampled for plotting. See
+    downsample.parse_series_query for parameters.
+    """
+    try:
+        dataset = Dataset.objects.defer('summary_json').get(id=dataset_id, user=request.user)
+    except Dataset.DoesNotExist:
+        return Response(
+            {'error': 'Dataset not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    options, error = parse_series_query(request.query_params)
+    if error:
+        return Response(
+            {'error': error},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    def build():
+        table = load_dataset_table(dataset, columns=options['columns'])
+        body = downsample_columns(table, **options)
+        body.update(dataset_id=dataset.id, method=options['method'], points=options['points'])
+        return make_entry(body, dataset.upload_timestamp)
+    
+    # Cached per dataset and resolution; ownership was checked above
+    key = series_key(dataset, options['method'], options['points'], options['columns'])
+    return conditional_response(request, cached_entry(key, build))
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def aggregate_dataset(request, dataset_id):
+    """
+    Compute grouped statistics over a dataset's rows. See
+    aggregates.parse_aggregate_query for the request body.
+    """
+    try:
+        dataset = Dataset.objects.defer('summary_json').get(id=dataset_id, user=request.user)
+    except Dataset.DoesNotExist:
+        return Response(
+            {'error': 'Dataset not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    query, error = parse_aggregate_query(request.data)
+    if error:
+        return Response(
+            {'error': error},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # Results are memoized per dataset and query signature
+    cache = get_response_cache()
+    key = aggregate_key(dataset, query.signature())
+    body = cache.get(key)
+    if body is None:
+        # SQL has no percentiles; those are computed from the columnar copy
+        if not query.percentiles() and records_ready(dataset):
+            body, error = aggregate_records(dataset, query)
+        else:
+            table = load_dataset_table(dataset, columns=query.referenced_columns())
+            body, error = aggregate_table(table, query)
+        if error:
+            return Response(
+                {'error': error},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        body['dataset_id'] = dataset.id
+        cache.set(key, body, settings.RESPONSE_CACHE_TIMEOUT)
+    
+    return Response(body)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_job(request, job_id):
+    """
+    Get the status and progress of a background ingestion job.
+    """
+    try:
+        job = IngestionJob.objects.get(id=job_id, user=request.user)
+    except IngestionJob.DoesNotExist:
+        return Response(
+            {'error': 'Job not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    return Response(job_status(job))
 
 
 @api_view(['GET'])
@@ -174,101 +599,43 @@ def get_summary(request, dataset_id):
 def generate_pdf_report(request, dataset_id):
     """
     Generate and return PDF report for a dataset.
+    Pass full=true for the multi-page report with all rows.
+    Until the report is rendered the response is 202 with its status; the
+    client requests the same URL again after Retry-After seconds.
     """
+    # The summary is only read if the report still has to be rendered
     try:
-        dataset = Dataset.objects.get(id=dataset_id, user=request.user)
+        dataset = Dataset.objects.defer('summary_json').get(id=dataset_id, user=request.user)
     except Dataset.DoesNotExist:
         return Response(
             {'error': 'Dataset not found'},
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Create PDF in memory
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    elements = []
-    
-    # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#1a1a1a'),
-        spaceAfter=30,
-        alignment=1  # Center
-    )
+    # ?full=true adds every row, grouped by equipment type
+    full = _is_truthy(request.query_params.get('full', 'false'))
     
-    # Title
-    title = Paragraph("Chemical Equipment Parameter Visualizer", title_style)
-    elements.append(title)
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Dataset info
-    info_style = styles['Normal']
-    elements.append(Paragraph(f"<b>Filename:</b> {dataset.filename}", info_style))
-    elements.append(Paragraph(f"<b>Upload Date:</b> {dataset.upload_timestamp.strftime('%Y-%m-%d %H:%M:%S')}", info_style))
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Summary section
-    summary = dataset.summary_json
-    elements.append(Paragraph("<b>Summary Statistics</b>", styles['Heading2']))
-    elements.append(Spacer(1, 0.1*inch))
-    
-    summary_data = [
-        ['Metric', 'Value'],
-        ['Total Equipment Count', str(summary['total_count'])],
-        ['Average Flowrate', f"{summary['avg_flowrate']:.2f}"],
-        ['Average Pressure', f"{summary['avg_pressure']:.2f}"],
-        ['Average Temperature', f"{summary['avg_temperature']:.2f}"],
-    ]
-    
-    summary_table = Table(summary_data, colWidths=[3*inch, 2*inch])
-    summary_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    
-    elements.append(summary_table)
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Equipment type distribution
-    elements.append(Paragraph("<b>Equipment Type Distribution</b>", styles['Heading2']))
-    elements.append(Spacer(1, 0.1*inch))
-    
-    type_data = [['Equipment Type', 'Count']]
-    for equip_type, count in summary['type_distribution'].items():
-        type_data.append([equip_type, str(count)])
-    
-    type_table = Table(type_data, colWidths=[3*inch, 2*inch])
-    type_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    
-    elements.append(type_table)
-    
-    # Build PDF
-    doc.build(elements)
-    
-    # Get PDF from buffer
-    pdf = buffer.getvalue()
-    buffer.close()
-    
-    # Return as downloadable file
-    response = HttpResponse(pdf, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="report_{dataset.filename}.pdf"'
-    
-    return response
+    # Rendered once per dataset to a file, in the background, then streamed
+    # from storage
+    path, error = request_report(dataset, full=full)
+    if error:
+        return Response(
+            {'error': error},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    if path is None:
+        response = Response(
+            {'dataset_id': dataset.id, 'full': full, 'status': 'rendering'},
+            status=status.HTTP_202_ACCEPTED
+        )
+        response['Retry-After'] = str(settings.REPORT_POLL_SECONDS)
+        return response
+    
+    report = open(path, 'rb')
+    suffix = '_full' if full else ''
+    return FileResponse(
+        report,
+        as_attachment=True,
+        filename=f'report_{dataset.filename}{suffix}.pdf',
+        content_type='application/pdf'
+    )
@@ -0,0 +1,103 @@
+"""
+Benchmark process-pool CSV parsing against the serial chunked parser.
+
+Usage (from the backend directory):
+    python benchmarks/bench_parallel.py
+    python benchmarks/bench_parallel.py --rows 2000000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pyarrow.ipc as ipc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+
+from api.parallel import get_process_pool, process_csv_file_parallel  # noqa: E402
+from api.storage import ARROW_SCHEMA, dataframe_to_batch  # noqa: E402
+from api.utils import process_csv_file  # noqa: E402
+from bench_summary import make_dataframe  # noqa: E402
+
+
+class ArrowSink:
+    """Minimal ColumnarWriter stand-in that needs no Django storage."""
+    
+    def __init__(self, path):
+        self._writer = ipc.new_file(path, ARROW_SCHEMA)
+    
+    def write(self, df):
+        self._writer.write_batch(dataframe_to_batch(df))
+    
+    def write_table(self, table):
+        self._writer.write_table(table)
+    
+    def close(self):
+        self._writer.close()
+
+
+def time_call(func, sink_path, repeat):
+    """
+    Return the fastest of `repeat` runs, in seconds. Each run also writes
+    the columnar copy, as uploads do.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        sink = ArrowSink(sink_path)
+        _, _, error = func(sink)
+        sink.close()
+        timings.append(time.perf_counter() - start)
+        if error:
+            raise RuntimeError(error)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    handle, path = tempfile.mkstemp(suffix='.csv')
+    os.close(handle)
+    sink_path = path + '.arrow'
+    try:
+        make_dataframe(args.rows).round(4).to_csv(path, index=False)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"{args.rows:,} rows, {size_mb:.1f} MB, {os.cpu_count()} CPUs")
+        print(f"{'parser':<20} {'total ms':>10} {'MB/s':>8}")
+        
+        def serial(sink):
+            with open(path, 'rb') as f:
+                return process_csv_file(f, chunksize=settings.CSV_CHUNK_SIZE, sink=sink, include_data=False)
+        
+        elapsed = time_call(serial, sink_path, args.repeat)
+        print(f"{'serial chunked':<20} {elapsed * 1e3:>10.1f} {size_mb / elapsed:>8.1f}")
+        
+        for workers in args.workers:
+            # Warm the pool so interpreter start-up is not timed
+            get_process_pool(workers).submit(os.getpid).result()
+            elapsed = time_call(
+                lambda sink: process_csv_file_parallel(path, workers, sink=sink),
+                sink_path, args.repeat
+            )
+            label = f'parallel x{workers}'
+            print(f"{label:<20} {elapsed * 1e3:>10.1f} {size_mb / elapsed:>8.1f}")
+    finally:
+        os.unlink(path)
+        if os.path.exists(sink_path):
+            os.unlink(sink_path)
+
+
+if __name__ == '__main__':
+    main()
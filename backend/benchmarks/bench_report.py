@@ -0,0 +1,100 @@
+"""
+Benchmark rendering of the full-data PDF report.
+
+Reports render time, output size and how much the process's peak memory
+grows while rendering. The input data is generated in a child process so
+it does not inflate the peak.
+
+Usage (from the backend directory):
+    python benchmarks/bench_report.py
+    python benchmarks/bench_report.py --rows 500000
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+import pyarrow.ipc as ipc  # noqa: E402
+
+from api.reports import render_full_report  # noqa: E402
+from api.storage import ARROW_SCHEMA, dataframe_to_batch  # noqa: E402
+from api.utils import calculate_summary  # noqa: E402
+from bench_summary import make_dataframe  # noqa: E402
+
+
+class LocalFile(SimpleNamespace):
+    """Stands in for a populated FileField."""
+    
+    def __bool__(self):
+        return True
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def write_dataset(rows, columnar, summary_path):
+    """Write the columnar copy and summary of a synthetic dataset."""
+    df = make_dataframe(rows)
+    df['Equipment Name'] = [f'Unit-{i}' for i in range(rows)]
+    with ipc.new_file(columnar, ARROW_SCHEMA) as writer:
+        writer.write_batch(dataframe_to_batch(df))
+    with open(summary_path, 'w') as f:
+        json.dump(calculate_summary(df), f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=100_000)
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp()
+    columnar = os.path.join(workdir, 'rows.arrow')
+    summary_path = os.path.join(workdir, 'summary.json')
+    output = os.path.join(workdir, 'report.pdf')
+    
+    child = multiprocessing.get_context('spawn').Process(
+        target=write_dataset, args=(args.rows, columnar, summary_path)
+    )
+    child.start()
+    child.join()
+    with open(summary_path) as f:
+        summary = json.load(f)
+    dataset = SimpleNamespace(
+        id=0,
+        filename='benchmark.csv',
+        upload_timestamp=datetime.now(),
+        summary_json=summary,
+        columnar_path=LocalFile(path=columnar),
+    )
+    
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    render_full_report(dataset, output)
+    elapsed = time.perf_counter() - start
+    
+    print(f"rows:            {args.rows:,}")
+    print(f"render time:     {elapsed:.1f} s")
+    print(f"pdf size:        {os.path.getsize(output) / 1e6:.1f} MB")
+    print(f"peak RSS growth: {peak_rss_mb() - before:.1f} MB")
+    
+    for path in (columnar, summary_path, output):
+        os.unlink(path)
+    os.rmdir(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark the vectorized summary engine against the previous pandas
+implementation.
+
+Usage (from the backend directory):
+    python benchmarks/bench_summary.py
+    python benchmarks/bench_summary.py --sizes 10000 1000000 --repeat 5
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.utils import calculate_summary  # noqa: E402
+
+EQUIPMENT_TYPES = ['Pump', 'Compressor', 'Valve', 'Heat Exchanger', 'Reactor', 'Condenser']
+
+
+def make_dataframe(rows, seed=0):
+    """Build a synthetic equipment dataframe with `rows` rows."""
+    rng = np.random.default_rng(seed)
+    types = np.array(EQUIPMENT_TYPES, dtype=object)
+    return pd.DataFrame({
+        'Equipment Name': 'Equipment',
+        'Type': types[rng.integers(0, len(types), rows)],
+        'Flowrate': rng.normal(150.0, 40.0, rows),
+        'Pressure': rng.normal(6.0, 1.5, rows),
+        'Temperature': rng.normal(110.0, 25.0, rows),
+    })
+
+
+def legacy_summary(df):
+    """The original calculate_summary: one pandas pass per statistic."""
+    return {
+        'total_count': len(df),
+        'avg_flowrate': float(df['Flowrate'].mean()),
+        'avg_pressure': float(df['Pressure'].mean()),
+        'avg_temperature': float(df['Temperature'].mean()),
+        'type_distribution': df['Type'].value_counts().to_dict()
+    }
+
+
+def legacy_full_summary(df):
+    """The same statistics as calculate_summary computed with pandas describe/groupby."""
+    numeric = df[['Flowrate', 'Pressure', 'Temperature']]
+    return {
+        'describe': numeric.describe().to_dict(),
+        'by_type': df.groupby('Type')[['Flowrate', 'Pressure', 'Temperature']]
+        .agg(['mean', 'min', 'max', 'std']).to_dict(),
+        'type_distribution': df['Type'].value_counts().to_dict(),
+    }
+
+
+def best_time(func, df, repeat):
+    """Return the fastest of `repeat` runs, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(df)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    candidates = [
+        ('calculate_summary', calculate_summary),
+        ('legacy (means only)', legacy_summary),
+        ('pandas describe+groupby', legacy_full_summary),
+    ]
+    
+    print(f"{'rows':>12}  {'implementation':<24} {'total ms':>10} {'ns/row':>8}")
+    for rows in args.sizes:
+        df = make_dataframe(rows)
+        for name, func in candidates:
+            elapsed = best_time(func, df, args.repeat)
+            print(f"{rows:>12,}  {name:<24} {elapsed * 1e3:>10.1f} {elapsed / rows * 1e9:>8.1f}")
+        del df
+
+
+if __name__ == '__main__':
+    main()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,6 +46,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Compresses responses for clients that accept gzip; must run before
+    # anything else that reads or changes the response body
+    'django.middleware.gzip.GZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -131,6 +135,35 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are hashed as they stream in so repeated files can be deduplicated
+FILE_UPLOAD_HANDLERS = [
+    'api.uploads.HashingMemoryFileUploadHandler',
+    'api.uploads.HashingTemporaryFileUploadHandler',
+]
+
+# Caches
+# History and summary responses are cached in RESPONSE_CACHE_ALIAS and
+# invalidated when a user's datasets change. Invalidation must reach every
+# server process and `manage.py enforce_retention`, so the responses cache
+# is on disk, shared by all processes on this host. Across several hosts use
+# a network backend, e.g. 'django.core.cache.backends.redis.RedisCache' or
+# 'django.core.cache.backends.db.DatabaseCache' (run createcachetable).
+# The directory is RESPONSE_CACHE_DIR from the environment, by default
+# backend/cache/responses; clear it when the database is reset.
+RESPONSE_CACHE_DIR = os.environ.get('RESPONSE_CACHE_DIR', str(BASE_DIR / 'cache' / 'responses'))
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': RESPONSE_CACHE_DIR,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+RESPONSE_CACHE_ALIAS = 'responses'
+RESPONSE_CACHE_TIMEOUT = 60 * 60
+
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -148,3 +181,73 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 CORS_ALLOW_CREDENTIALS = True
+
+# CSV upload processing
+# Uploads larger than CSV_UPLOAD_MAX_SIZE are rejected. Uploads larger than
+# CSV_STREAMING_THRESHOLD are processed in chunks of CSV_CHUNK_SIZE rows so
+# worker memory stays flat regardless of file size.
+CSV_UPLOAD_MAX_SIZE = 100 * 1024 * 1024
+CSV_STREAMING_THRESHOLD = 10 * 1024 * 1024
+CSV_CHUNK_SIZE = 50000
+
+# Uploads on disk larger than CSV_PARALLEL_THRESHOLD are split at line
+# boundaries and parsed by CSV_PARSE_WORKERS processes (1 disables this)
+CSV_PARSE_WORKERS = os.cpu_count() or 1
+CSV_PARALLEL_THRESHOLD = 32 * 1024 * 1024
+
+# Resumable uploads
+# /api/upload/chunked/ receives a file in chunks so an interrupted upload
+# resumes from the last byte received. Clients are told to send chunks of
+# CHUNKED_UPLOAD_CHUNK_SIZE bytes; uploads not completed within
+# CHUNKED_UPLOAD_EXPIRY_HOURS are removed by `manage.py enforce_retention`.
+CHUNKED_UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024
+CHUNKED_UPLOAD_EXPIRY_HOURS = 24
+
+# Background ingestion
+# Uploads sent with async=true are queued as IngestionJob rows and processed
+# by an in-process pool of INGEST_WORKERS threads. INGEST_JOBS_EAGER runs jobs
+# inline instead (used by tests). `manage.py run_ingestion_jobs` requeues
+# running jobs whose row has not been updated for INGEST_JOB_STALE_SECONDS
+# (their worker died, e.g. in a restart) before draining the queue; keep it
+# well above the time a job takes between progress reports.
+INGEST_WORKERS = 2
+INGEST_JOBS_EAGER = False
+INGEST_JOB_STALE_SECONDS = 30 * 60
+
+# Dataset retention (see api/retention.py); set a rule to None to disable it.
+# Expired records are deleted at upload time; their files are removed by
+# `manage.py enforce_retention`, which should run periodically (e.g. cron)
+# and skips files modified within RETENTION_FILE_GRACE_SECONDS.
+RETENTION_KEEP_LATEST = 5
+RETENTION_MAX_AGE_DAYS = None
+RETENTION_MAX_BYTES_PER_USER = None
+RETENTION_FILE_GRACE_SECONDS = 60 * 60
+
+# Equipment records
+# With EQUIPMENT_RECORDS enabled, ingested rows are also stored as
+# EquipmentRecords (see api/records.py) on the ingestion pool after the
+# upload is committed, in bulk_create batches of EQUIPMENT_RECORD_BATCH_SIZE
+# rows. Once stored, the rows endpoint and aggregates without percentiles
+# are answered in SQL from them. Off by default, as the columnar copy
+# answers the same queries without a second copy of every row.
+EQUIPMENT_RECORDS = False
+EQUIPMENT_RECORD_BATCH_SIZE = 5000
+
+# Batch uploads
+# /api/upload/batch/ accepts up to CSV_BATCH_MAX_FILES CSV files (sent as
+# several 'files' parts or inside a zip archive) adding up to at most
+# CSV_BATCH_MAX_TOTAL_SIZE bytes uncompressed, and parses them on
+# BATCH_UPLOAD_WORKERS threads. Both limits are checked before any archive
+# is extracted.
+CSV_BATCH_MAX_FILES = 50
+CSV_BATCH_MAX_TOTAL_SIZE = 500 * 1024 * 1024
+BATCH_UPLOAD_WORKERS = 4
+
+# PDF reports
+# Reports are rendered once per dataset and stored under MEDIA_ROOT/reports.
+# With PDF_PRERENDER they are rendered on the ingestion thread pool right
+# after ingest, so even the first download is a file stream. Otherwise the
+# first download queues the render there and answers 202 with a Retry-After
+# of REPORT_POLL_SECONDS until the report is stored.
+PDF_PRERENDER = False
+REPORT_POLL_SECONDS = 1
@@ -1,13 +1,100 @@
+import os
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from services.formats import accept_header, decode_rows
+from services.streaming import MultipartStream
 from utils.config import save_token, load_token, clear_token
 
 
+# (connect, read) timeouts in seconds. Uploads and PDF reports are
+# processed by the server before it replies, so they may take longer.
+DEFAULT_TIMEOUT = (5, 30)
+TRANSFER_TIMEOUT = (5, 300)
+
+# Retries of idempotent requests after connection errors and
+# gateway/unavailable responses, with exponential backoff between them
+DEFAULT_RETRIES = 3
+RETRY_BACKOFF = 0.5
+RETRY_STATUSES = (502, 503, 504)
+
+# Kept-alive connections per host; enough for the background thread pool
+POOL_SIZE = 10
+
+# Files at least this large are sent with the resumable chunked protocol
+RESUMABLE_UPLOAD_THRESHOLD = 8 * 1024 * 1024
+# Consecutive failed chunks before a resumable upload gives up; it can be
+# resumed later by uploading the same file again
+MAX_CHUNK_ATTEMPTS = 5
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# A report that is not rendered yet is answered with 202; get_pdf asks again
+# after the server's Retry-After (or this many seconds) for up to
+# REPORT_WAIT_TIMEOUT seconds
+REPORT_POLL_INTERVAL = 1
+REPORT_WAIT_TIMEOUT = 600
+
+
+def create_session(retries=DEFAULT_RETRIES, pool_size=POOL_SIZE):
+    """
+    Create a requests Session with a pool of kept-alive connections.
+    GET and HEAD requests are retried; uploads are not, because the
+    server may already have processed them.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['Accept-Encoding'] = 'gzip, deflate'
+    return session
+
+
 class APIClient:
     """Client for interacting with the Django REST API."""
     
-    def __init__(self, base_url='http://localhost:8000/api'):
+    def __init__(self, base_url='http://localhost:8000/api', timeout=DEFAULT_TIMEOUT,
+                 transfer_timeout=TRANSFER_TIMEOUT, retries=DEFAULT_RETRIES,
+                 resumable_threshold=RESUMABLE_UPLOAD_THRESHOLD, pool_size=POOL_SIZE):
         self.base_url = base_url
         self.token = load_token()
+        self.timeout = timeout
+        self.transfer_timeout = transfer_timeout
+        self.resumable_threshold = resumable_threshold
+        # (path, size, mtime) -> id of an unfinished resumable upload
+        self._resumable_uploads = {}
+        # One session for every request, so connections are reused
+        self.session = create_session(retries, pool_size)
+        # url -> (etag, data) of the last response, for conditional requests
+        self._etag_cache = {}
+    
+    def _get(self, url, **kwargs):
+        """GET through the pooled session with the default timeout."""
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.get(url, **kwargs)
+    
+    def _post(self, url, **kwargs):
+        """POST through the pooled session with the default timeout."""
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.post(url, **kwargs)
+    
+    def _put(self, url, **kwargs):
+        """PUT through the pooled session with the default timeout."""
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.put(url, **kwargs)
+    
+    def close(self):
+        """Close the session's pooled connections."""
+        self.session.close()
     
     def _get_headers(self):
         """Get headers with authentication token."""
@@ -16,13 +103,26 @@ class APIClient:
             headers['Authorization'] = f'Token {self.token}'
         return headers
     
+    def _conditional_headers(self, url):
+        """Get headers that revalidate the cached response for `url`."""
+        headers = self._get_headers()
+        if url in self._etag_cache:
+            headers['If-None-Match'] = self._etag_cache[url][0]
+        return headers
+    
+    def _remember(self, url, response, data):
+        """Cache a response body under its ETag, if it has one."""
+        etag = response.headers.get('ETag')
+        if isinstance(etag, str):
+            self._etag_cache[url] = (etag, data)
+    
     def login(self, username, password):
         """
         Authenticate user and store token.
         Returns: (success: bool, message: str, data: dict)
         """
         try:
-            response = requests.post(
+            response = self._post(
                 f'{self.base_url}/auth/login/',
                 json={'username': username, 'password': password}
             )
@@ -30,49 +130,198 @@ class APIClient:
             if response.status_code == 200:
                 data = response.json()
                 self.token = data['token']
+                self._etag_cache.clear()
                 save_token(self.token)
                 return True, 'Login successful', data
             else:
                 error = response.json().get('error', 'Login failed')
                 return False, error, None
-                
+        
         except requests.exceptions.RequestException as e:
             return False, f'Connection error: {str(e)}', None
     
     def logout(self):
         """Clear authentication token."""
         self.token = None
+        self._etag_cache.clear()
         clear_token()
     
-    def upload_csv(self, filepath):
+    def upload_csv(self, filepath, background=False, row_format='json', progress=None,
+                   include_data=True):
         """
         Upload CSV file.
+        With background=True the server queues the file for processing and
+        `data` describes the job; poll it with get_job().
+        `row_format` chooses how the rows in data['data'] are returned; see
+        services.formats. With include_data=False no rows are returned
+        (fetch them with get_rows). The file is streamed from disk, calling
+        `progress(bytes_sent, total_bytes)` as it goes. Files of at least
+        `resumable_threshold` bytes go through upload_csv_resumable.
         Returns: (success: bool, message: str, data: dict)
         """
         try:
-            headers = {}
-            if self.token:
-                headers['Authorization'] = f'Token {self.token}'
+            if os.path.getsize(filepath) >= self.resumable_threshold:
+                return self.upload_csv_resumable(filepath, background, row_format, progress,
+                                                 include_data=include_data)
             
-            with open(filepath, 'rb') as f:
-                files = {'file': f}
-                response = requests.post(
+            form = {'async': 'true'} if background else {}
+            if not include_data:
+                form['include_data'] = 'false'
+            with MultipartStream(form, 'file', filepath, progress) as body:
+                headers = {'Accept': accept_header(row_format), 'Content-Type': body.content_type}
+                if self.token:
+                    headers['Authorization'] = f'Token {self.token}'
+                response = self._post(
                     f'{self.base_url}/upload/',
                     headers=headers,
-                    files=files
+                    data=body,
+                    timeout=self.transfer_timeout
                 )
+            return self._upload_result(response)
+        
+        except requests.exceptions.RequestException as e:
+            return False, f'Connection error: {str(e)}', None
+        except FileNotFoundError:
+            return False, 'File not found', None
+    
+    def upload_csv_resumable(self, filepath, background=False, row_format='json',
+                             progress=None, chunk_size=None, include_data=True):
+        """
+        Upload a CSV file in chunks that survive dropped connections: a
+        failed chunk is sent again and the server answers with the offset
+        to continue from. If it keeps failing, uploading the same unchanged
+        file again resumes where it stopped.
+        Arguments and return value are as for upload_csv; `chunk_size`
+        defaults to the size the server suggests.
+        Returns: (success: bool, message: str, data: dict)
+        """
+        try:
+            stat = os.stat(filepath)
+            key = (os.path.abspath(filepath), stat.st_size, stat.st_mtime)
             
+            status = None
+            if key in self._resumable_uploads:
+                status = self._chunked_upload_status(self._resumable_uploads[key])
+            if status is None:
+                response = self._post(
+                    f'{self.base_url}/upload/chunked/',
+                    headers=self._get_headers(),
+                    json={'filename': os.path.basename(filepath), 'size': stat.st_size}
+                )
+                if response.status_code != 201:
+                    return False, response.json().get('error', 'Upload failed'), None
+                status = response.json()
+                self._resumable_uploads[key] = status['upload_id']
+            
+            url = f"{self.base_url}/upload/chunked/{status['upload_id']}/"
+            chunk_size = chunk_size or status['chunk_size']
+            offset = status['offset']
+            failures = 0
+            with open(filepath, 'rb') as f:
+                while offset < stat.st_size:
+                    f.seek(offset)
+                    headers = self._get_headers()
+                    headers['Content-Type'] = 'application/offset+octet-stream'
+                    headers['Upload-Offset'] = str(offset)
+                    try:
+                        response = self._put(url, headers=headers, data=f.read(chunk_size),
+                                             timeout=self.transfer_timeout)
+                    except requests.exceptions.RequestException:
+                        failures += 1
+                        if failures >= MAX_CHUNK_ATTEMPTS:
+                            raise
+                        # If part of the chunk arrived, the retry is answered
+                        # with 409 and the offset to continue from
+                        time.sleep(RETRY_BACKOFF * 2 ** (failures - 1))
+                        continue
+                    
+                    if response.status_code in (200, 409):
+                        # 409 carries the offset the server expects instead
+                        offset = response.json()['offset']
+                        failures = 0
+                        if progress:
+                            progress(offset, stat.st_size)
+                    else:
+                        return False, response.json().get('error', 'Upload failed'), None
+            
+            headers = self._get_headers()
+            headers['Accept'] = accept_header(row_format)
+            response = self._post(
+                f'{url}complete/',
+                headers=headers,
+                json={'async': 'true' if background else 'false',
+                      'include_data': 'true' if include_data else 'false'},
+                timeout=self.transfer_timeout
+            )
+            if response.status_code != 409:
+                del self._resumable_uploads[key]
+            return self._upload_result(response)
+        
+        except requests.exceptions.RequestException as e:
+            return False, f'Connection error: {str(e)}', None
+        except FileNotFoundError:
+            return False, 'File not found', None
+    
+    def _chunked_upload_status(self, upload_id):
+        """Return the server's status of a resumable upload, or None if it is gone."""
+        response = self._get(
+            f'{self.base_url}/upload/chunked/{upload_id}/',
+            headers=self._get_headers()
+        )
+        return response.json() if response.status_code == 200 else None
+    
+    def _upload_result(self, response):
+        """Turn an upload response into (success, message, data)."""
+        if response.status_code == 201:
+            data = decode_rows(response, 'data')
+            return True, 'Upload successful', data
+        elif response.status_code == 202:
+            data = response.json()
+            return True, 'Upload queued', data
+        else:
+            error = response.json().get('error', 'Upload failed')
+            return False, error, None
+    
+    def upload_csv_batch(self, filepaths):
+        """
+        Upload several CSV files (or zip archives of CSV files) in one request.
+        `data['results']` has one entry per file with its dataset_id or error.
+        Returns: (success: bool, message: str, data: dict)
+        """
+        headers = {}
+        if self.token:
+            headers['Authorization'] = f'Token {self.token}'
+        
+        handles = []
+        try:
+            files = []
+            for filepath in filepaths:
+                f = open(filepath, 'rb')
+                handles.append(f)
+                files.append(('files', (os.path.basename(filepath), f)))
+            
+            response = self._post(
+                f'{self.base_url}/upload/batch/',
+                headers=headers,
+                files=files,
+                timeout=self.transfer_timeout
+            )
+            
+            data = response.json()
             if response.status_code == 201:
-                data = response.json()
-                return True, 'Upload successful', data
+                return True, f"Uploaded {data['created']} of {len(data['results'])} files", data
             else:
-                error = response.json().get('error', 'Upload failed')
-                return False, error, None
-                
+                # Per-file errors are still returned when the batch was read
+                error = data.get('error', 'Upload failed')
+                return False, error, data if 'results' in data else None
+        
         except requests.exceptions.RequestException as e:
             return False, f'Connection error: {str(e)}', None
         except FileNotFoundError:
             return False, 'File not found', None
+        finally:
+            for f in handles:
+                f.close()
     
     def get_history(self):
         """
@@ -80,18 +329,19 @@ class APIClient:
         Returns: (success: bool, message: str, data: dict)
         """
         try:
-            response = requests.get(
-                f'{self.base_url}/history/',
-                headers=self._get_headers()
-            )
+            url = f'{self.base_url}/history/'
+            response = self._get(url, headers=self._conditional_headers(url))
             
-            if response.status_code == 200:
+            if response.status_code == 304 and url in self._etag_cache:
+                return True, 'History retrieved', self._etag_cache[url][1]
+            elif response.status_code == 200:
                 data = response.json()
+                self._remember(url, response, data)
                 return True, 'History retrieved', data
             else:
                 error = response.json().get('error', 'Failed to get history')
                 return False, error, None
-                
+        
         except requests.exceptions.RequestException as e:
             return False, f'Connection error: {str(e)}', None
     
@@ -101,39 +351,249 @@ class APIClient:
         Returns: (success: bool, message: str, data: dict)
         """
         try:
-            response = requests.get(
-                f'{self.base_url}/summary/{dataset_id}/',
-                headers=self._get_headers()
-            )
+            url = f'{self.base_url}/summary/{dataset_id}/'
+            response = self._get(url, headers=self._conditional_headers(url))
             
-            if response.status_code == 200:
+            if response.status_code == 304 and url in self._etag_cache:
+                return True, 'Summary retrieved', self._etag_cache[url][1]
+            elif response.status_code == 200:
                 data = response.json()
+                self._remember(url, response, data)
                 return True, 'Summary retrieved', data
             else:
                 error = response.json().get('error', 'Failed to get summary')
                 return False, error, None
-                
+        
         except requests.exceptions.RequestException as e:
             return False, f'Connection error: {str(e)}', None
     
-    def get_pdf(self, dataset_id, save_path):
+    def get_job(self, job_id):
         """
-        Download PDF report.
-        Returns: (success: bool, message: str)
+        Get status and progress of a background upload job.
+        Returns: (success: bool, message: str, data: dict)
         """
         try:
-            response = requests.get(
-                f'{self.base_url}/report/pdf/{dataset_id}/',
+            response = self._get(
+                f'{self.base_url}/jobs/{job_id}/',
                 headers=self._get_headers()
             )
             
             if response.status_code == 200:
-                with open(save_path, 'wb') as f:
-                    f.write(response.content)
-                return True, 'PDF downloaded successfully'
+                data = response.json()
+                return True, 'Job retrieved', data
             else:
-                return False, 'Failed to download PDF'
+                error = response.json().get('error', 'Failed to get job')
+                return False, error, None
+        
+        except requests.exceptions.RequestException as e:
+            return False, f'Connection error: {str(e)}', None
+    
+    def compare_datasets(self, dataset_ids=None):
+        """
+        Compare datasets (default: the last 5 uploads) from their summaries.
+        Returns: (success: bool, message: str, data: dict)
+        """
+        try:
+            params = {'ids': ','.join(str(pk) for pk in dataset_ids)} if dataset_ids else None
+            response = self._get(
+                f'{self.base_url}/datasets/compare/',
+                headers=self._get_headers(),
+                params=params
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                return True, 'Comparison retrieved', data
+            else:
+                error = response.json().get('error', 'Failed to compare datasets')
+                return False, error, None
+        
+        except requests.exceptions.RequestException as e:
+            return False, f'Connection error: {str(e)}', None
+    
+    def get_rows(self, dataset_id, offset=0, limit=100, columns=None, ordering=None,
+                 row_format='json', **filters):
+        """
+        Get a page of rows for a dataset.
+        `filters` are passed through as query parameters, e.g. type='Pump'
+        or flowrate_min=100. `row_format` chooses how data['rows'] is
+        returned: 'json' (records), 'columnar' or 'arrow'; see
+        services.formats.
+        Returns: (success: bool, message: str, data: dict)
+        """
+        try:
+            params = {'offset': offset, 'limit': limit}
+            if columns:
+                params['columns'] = ','.join(columns)
+            if ordering:
+                params['ordering'] = ordering
+            params.update(filters)
+            
+            headers = self._get_headers()
+            headers['Accept'] = accept_header(row_format)
+            response = self._get(
+                f'{self.base_url}/datasets/{dataset_id}/rows/',
+                headers=headers,
+                params=params
+            )
+            
+            if response.status_code == 200:
+                data = decode_rows(response, 'rows')
+                return True, 'Rows retrieved', data
+            else:
+                error = response.json().get('error', 'Failed to get rows')
+                return False, error, None
+        
+        except requests.exceptions.RequestException as e:
+            return False, f'Connection error: {str(e)}', None
+    
+    def get_series(self, dataset_id, points=1000, method='lttb', columns=None):
+        """
+        Get the numeric columns downsampled to at most `points` points each,
+        with method 'lttb' or 'minmax'.
+        Returns: (success: bool, message: str, data: dict)
+        """
+        try:
+            params = {'points': points, 'method': method}
+            if columns:
+                params['columns'] = ','.join(columns)
+            
+            response = self._get(
+                f'{self.base_url}/datasets/{dataset_id}/series/',
+                headers=self._get_headers(),
+                params=params
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                return True, 'Series retrieved', data
+            else:
+                error = response.json().get('error', 'Failed to get series')
+                return False, error, None
+        
+        except requests.exceptions.RequestException as e:
+            return False, f'Connection error: {str(e)}', None
+    
+    def get_histograms(self, dataset_id, columns=None, types=None, kind=None):
+        """
+        Get a dataset's precomputed histograms, optionally only some
+        columns, types or one kind ('fixed' or 'quantile').
+        Returns: (success: bool, message: str, data: dict)
+        """
+        try:
+            params = {}
+            if columns:
+                params['columns'] = ','.join(columns)
+            if types:
+                params['type'] = ','.join(types)
+            if kind:
+                params['kind'] = kind
+            
+            response = self._get(
+                f'{self.base_url}/datasets/{dataset_id}/histograms/',
+                headers=self._get_headers(),
+                params=params
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                return True, 'Histograms retrieved', data
+            else:
+                error = response.json().get('error', 'Failed to get histograms')
+                return False, error, None
+        
+        except requests.exceptions.RequestException as e:
+            return False, f'Connection error: {str(e)}', None
+    
+    def aggregate(self, dataset_id, group_by=None, metrics=None, columns=None, filters=None):
+        """
+        Compute statistics over a dataset's rows on the server.
+        e.g. aggregate(1, group_by=['Type'], metrics=['mean', 'p90'],
+        filters={'Flowrate': {'min': 100}})
+        Returns: (success: bool, message: str, data: dict)
+        """
+        try:
+            body = {}
+            if group_by:
+                body['group_by'] = group_by
+            if metrics:
+                body['metrics'] = metrics
+            if columns:
+                body['columns'] = columns
+            if filters:
+                body['filters'] = filters
+            
+            response = self._post(
+                f'{self.base_url}/datasets/{dataset_id}/aggregate/',
+                headers=self._get_headers(),
+                json=body
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                return True, 'Aggregates computed', data
+            else:
+                error = response.json().get('error', 'Failed to compute aggregates')
+                return False, error, None
+        
+        except requests.exceptions.RequestException as e:
+            return False, f'Connection error: {str(e)}', None
+    
+    def get_pdf(self, dataset_id, save_path, full=False, progress=None):
+        """
+        Download PDF report.
+        With full=True the report includes every row, grouped by type.
+        The report is streamed into `save_path`, calling
+        `progress(bytes_received, total_bytes)` as it goes (total is 0 if
+        the server did not send a length, and while waiting for the server
+        to render the report).
+        Returns: (success: bool, message: str)
+        """
+        try:
+            headers = self._get_headers()
+            # A gzipped response has no Content-Length, so progress would
+            # have no total; PDF streams are compressed already
+            headers['Accept-Encoding'] = 'identity'
+            deadline = time.monotonic() + REPORT_WAIT_TIMEOUT
+            while True:
+                response = self._get(
+                    f'{self.base_url}/report/pdf/{dataset_id}/',
+                    headers=headers,
+                    params={'full': 'true'} if full else None,
+                    timeout=self.transfer_timeout,
+                    stream=True
+                )
+                if response.status_code != 202:
+                    break
+                response.close()
+                if time.monotonic() >= deadline:
+                    return False, 'Timed out waiting for the PDF report'
+                if progress:
+                    progress(0, 0)
+                time.sleep(float(response.headers.get('Retry-After') or REPORT_POLL_INTERVAL))
+            try:
+                if response.status_code != 200:
+                    return False, 'Failed to download PDF'
                 
+                total = int(response.headers.get('Content-Length') or 0)
+                received = 0
+                try:
+                    with open(save_path, 'wb') as f:
+                        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                            f.write(chunk)
+                            received += len(chunk)
+                            if progress:
+                                progress(received, total)
+                except Exception:
+                    # Do not leave a truncated report behind, e.g. after a
+                    # dropped connection or a cancelled download
+                    if os.path.exists(save_path):
+                        os.remove(save_path)
+                    raise
+                return True, 'PDF downloaded successfully'
+            finally:
+                response.close()
+        
         except requests.exceptions.RequestException as e:
             return False, f'Connection error: {str(e)}'
         except IOError as e:
@@ -0,0 +1,154 @@
+"""
+asyncio interface to the API, for scripts that push many datasets.
+
+AsyncAPIClient offers APIClient's calls as coroutines with the same
+arguments and (success, message, data) results:
+
+    async with AsyncAPIClient(max_concurrency=8) as client:
+        await client.login('user', 'secret')
+        results = await client.upload_many(paths)
+
+Requests go through the wrapped APIClient's pooled requests Session on a
+thread pool of `max_concurrency` workers; no asyncio HTTP library is
+needed. At most `max_concurrency` calls are in flight at once and the
+session keeps that many connections alive, so all calls share them.
+
+Progress callbacks are called on the event loop. Cancelling an upload or
+a download stops it at its next progress report; other calls finish in
+the background and their result is dropped. Use a client from one event
+loop only.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from services.api_client import APIClient, POOL_SIZE
+
+
+# Calls in flight at once
+DEFAULT_CONCURRENCY = 4
+
+
+class CallCancelled(Exception):
+    """Raised from a progress callback to stop a cancelled transfer."""
+
+
+class AsyncAPIClient:
+    """asyncio client for the Django REST API."""
+    
+    def __init__(self, base_url='http://localhost:8000/api', max_concurrency=DEFAULT_CONCURRENCY,
+                 **kwargs):
+        """Other keyword arguments are passed to APIClient."""
+        self.max_concurrency = max_concurrency
+        # At least one kept-alive connection per call in flight
+        kwargs.setdefault('pool_size', max(max_concurrency, POOL_SIZE))
+        self.client = APIClient(base_url, **kwargs)
+        self._limit = asyncio.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency,
+                                            thread_name_prefix='async-api')
+    
+    @property
+    def token(self):
+        """The authentication token, shared with the wrapped APIClient."""
+        return self.client.token
+    
+    @token.setter
+    def token(self, value):
+        self.client.token = value
+    
+    async def _call(self, fn, *args, **kwargs):
+        """Run the blocking call `fn` on the thread pool, within the concurrency limit."""
+        async with self._limit:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+    
+    async def _transfer(self, fn, *args, progress=None, **kwargs):
+        """
+        Run a call that takes a `progress` callback, so that cancelling it
+        stops the transfer. `progress` is called on the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        cancelled = threading.Event()
+        
+        def report(done, total):
+            if cancelled.is_set():
+                raise CallCancelled()
+            if progress:
+                loop.call_soon_threadsafe(progress, done, total)
+        
+        try:
+            return await self._call(fn, *args, progress=report, **kwargs)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+    
+    async def close(self):
+        """Wait for calls still running on the thread pool, then close the connections."""
+        await asyncio.to_thread(self._executor.shutdown)
+        self.client.close()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.close()
+    
+    async def login(self, username, password):
+        """
+        Authenticate user and store token.
+        Returns: (success: bool, message: str, data: dict)
+        """
+        return await self._call(self.client.login, username, password)
+    
+    def logout(self):
+        """Clear authentication token; no request is made."""
+        self.client.logout()
+    
+    async def upload_csv(self, filepath, background=False, row_format='json', progress=None,
+                         include_data=True):
+        """
+        Upload CSV file; see APIClient.upload_csv.
+        Returns: (success: bool, message: str, data: dict)
+        """
+        return await self._transfer(self.client.upload_csv, filepath, background, row_format,
+                                    progress=progress, include_data=include_data)
+    
+    async def upload_many(self, filepaths, background=False, row_format='json', include_data=True):
+        """
+        Upload CSV files concurrently, up to `max_concurrency` at a time.
+        Returns: list of (success, message, data), in the order of `filepaths`
+        """
+        return await asyncio.gather(*(
+            self.upload_csv(filepath, background, row_format, include_data=include_data)
+            for filepath in filepaths
+        ))
+    
+    async def get_history(self):
+        """
+        Get upload history.
+        Returns: (success: bool, message: str, data: dict)
+        """
+        return await self._call(self.client.get_history)
+    
+    async def get_summary(self, dataset_id):
+        """
+        Get summary for a specific dataset.
+        Returns: (success: bool, message: str, data: dict)
+        """
+        return await self._call(self.client.get_summary, dataset_id)
+    
+    async def get_job(self, job_id):
+        """
+        Get status and progress of a background upload job.
+        Returns: (success: bool, message: str, data: dict)
+        """
+        return await self._call(self.client.get_job, job_id)
+    
+    async def get_pdf(self, dataset_id, save_path, full=False, progress=None):
+        """
+        Download PDF report; see APIClient.get_pdf.
+        Returns: (success: bool, message: str)
+        """
+        return await self._transfer(self.client.get_pdf, dataset_id, save_path, full,
+                                    progress=progress)
@@ -0,0 +1,67 @@
+"""
+Row formats offered by the rows and upload endpoints.
+
+    'json'      rows as a list of records
+    'columnar'  rows as {column: [values]}
+    'arrow'     rows as {column: NumPy array}, decoded from an Arrow IPC
+                stream; needs pyarrow, otherwise 'columnar' is the fastest
+
+In the Arrow format numeric columns arrive as float64 arrays with NaN for
+missing values and text columns as object arrays with None.
+"""
+import json
+
+try:
+    import pyarrow.ipc as ipc
+except ImportError:
+    ipc = None
+
+
+JSON_MEDIA_TYPE = 'application/json'
+COLUMNAR_MEDIA_TYPE = 'application/vnd.equipment.columnar+json'
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+ARROW_METADATA_KEY = b'response'
+
+MEDIA_TYPES = {
+    'json': JSON_MEDIA_TYPE,
+    'columnar': COLUMNAR_MEDIA_TYPE,
+    'arrow': ARROW_MEDIA_TYPE,
+}
+
+# The most compact format this installation can decode
+FASTEST_FORMAT = 'arrow' if ipc is not None else 'columnar'
+
+
+def accept_header(row_format):
+    """
+    Return the Accept header value for a row format.
+    Raises ValueError for unknown formats or 'arrow' without pyarrow.
+    """
+    if row_format not in MEDIA_TYPES:
+        raise ValueError(f"Unknown row format '{row_format}'")
+    if row_format == 'arrow' and ipc is None:
+        raise ValueError("The 'arrow' row format requires pyarrow")
+    return MEDIA_TYPES[row_format]
+
+
+def decode_arrow(content, key):
+    """Decode an Arrow IPC stream body, putting its columns under `key`."""
+    table = ipc.open_stream(content).read_all()
+    data = json.loads(table.schema.metadata[ARROW_METADATA_KEY])
+    data[key] = {
+        name: column.to_numpy(zero_copy_only=False)
+        for name, column in zip(table.column_names, table.columns)
+    }
+    return data
+
+
+def decode_rows(response, key):
+    """
+    Decode a successful response from a rows endpoint, whatever format the
+    server chose. Rows end up under `key`.
+    """
+    content_type = response.headers.get('Content-Type')
+    if isinstance(content_type, str) and content_type.split(';')[0].strip() == ARROW_MEDIA_TYPE:
+        return decode_arrow(response.content, key)
+    return response.json()
+
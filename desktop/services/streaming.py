@@ -0,0 +1,84 @@
+"""
+Streamed request bodies.
+
+requests builds `files=` uploads in memory and gives no progress. A
+MultipartStream is instead read from disk while the request is sent, and
+its length is known up front, so the request still carries a
+Content-Length header.
+"""
+import io
+import os
+import uuid
+
+
+# Report progress at most once per this many bytes
+PROGRESS_STEP = 256 * 1024
+
+
+class MultipartStream:
+    """
+    A multipart/form-data body with text `fields` and one file part.
+    `progress(sent, total)` is called as the body is read; it may raise to
+    abort the request.
+    """
+    
+    def __init__(self, fields, file_field, filepath, progress=None):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={self.boundary}'
+        self.progress = progress
+        
+        head = io.BytesIO()
+        for name, value in (fields or {}).items():
+            head.write(self._part_header(f'name="{name}"'))
+            head.write(f'{value}\r\n'.encode())
+        filename = os.path.basename(filepath).replace('"', '')
+        head.write(self._part_header(f'name="{file_field}"; filename="{filename}"',
+                                     'Content-Type: text/csv\r\n'))
+        tail = f'\r\n--{self.boundary}--\r\n'.encode()
+        
+        self._file = open(filepath, 'rb')
+        self._file.seek(0, os.SEEK_END)
+        file_size = self._file.tell()
+        self._file.seek(0)
+        
+        self._parts = [io.BytesIO(head.getvalue()), self._file, io.BytesIO(tail)]
+        self.len = len(head.getvalue()) + file_size + len(tail)
+        self.sent = 0
+        self._reported = 0
+    
+    def _part_header(self, disposition, extra=''):
+        return (f'--{self.boundary}\r\n'
+                f'Content-Disposition: form-data; {disposition}\r\n'
+                f'{extra}\r\n').encode()
+    
+    def __len__(self):
+        return self.len
+    
+    def read(self, size=-1):
+        """Read up to `size` bytes of the body (all of it if negative)."""
+        chunks = []
+        while self._parts and (size < 0 or size > 0):
+            chunk = self._parts[0].read(size)
+            if not chunk:
+                self._parts.pop(0)
+                continue
+            chunks.append(chunk)
+            if size > 0:
+                size -= len(chunk)
+        data = b''.join(chunks)
+        
+        self.sent += len(data)
+        if data and self.progress and (self.sent - self._reported >= PROGRESS_STEP or self.sent == self.len):
+            self._reported = self.sent
+            self.progress(self.sent, self.len)
+        return data
+    
+    def close(self):
+        """Close the file."""
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,209 @@
+"""
+Background execution of APIClient calls.
+
+Calls run on the global QThreadPool so the GUI thread keeps repainting
+while requests are in flight. Outcomes come back through Qt signals,
+which are delivered on the thread that created the task (the GUI thread).
+
+Cancellation is cooperative. A cancelled task never emits `finished`;
+calls that take a `progress` callback are stopped at their next progress
+report, other calls run to completion and their result is dropped.
+
+Coroutines, such as AsyncAPIClient calls, run the same way as AsyncTasks
+on an AsyncBridge.
+"""
+import asyncio
+import inspect
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+# Tasks whose signals may still be queued for the GUI thread; keeping a
+# reference stops their signal objects being collected before delivery
+_active_tasks = set()
+
+
+class TaskCancelled(Exception):
+    """Raised from a progress callback to stop a cancelled task."""
+
+
+class TaskSignals(QObject):
+    """Signals emitted by an ApiTask."""
+    # The call's return value, e.g. (success, message, data)
+    finished = pyqtSignal(object)
+    # Message of an unexpected exception raised by the call
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+    # (done, total) as reported by the call; total is 0 when unknown
+    progress = pyqtSignal('qint64', 'qint64')
+    # Emitted last, whatever the outcome
+    done = pyqtSignal()
+
+
+def accepts_progress(fn):
+    """Return True if `fn` takes a `progress` keyword argument."""
+    try:
+        return 'progress' in inspect.signature(fn).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+class ApiTask(QRunnable):
+    """
+    Run `fn(*args, **kwargs)` on a worker thread.
+    If `fn` accepts a `progress` callback, the task passes one that emits
+    `signals.progress`.
+    """
+    
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        # The task object stays alive in _active_tasks until `done` is handled
+        self.setAutoDelete(False)
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        if accepts_progress(fn):
+            self.kwargs['progress'] = self.report_progress
+        self.signals = TaskSignals()
+        self._cancelled = threading.Event()
+    
+    def cancel(self):
+        """Ask the task to stop; safe to call from any thread."""
+        self._cancelled.set()
+    
+    def is_cancelled(self):
+        """Return True once cancel() has been called."""
+        return self._cancelled.is_set()
+    
+    def report_progress(self, done, total=0):
+        """Progress callback passed to the call."""
+        if self.is_cancelled():
+            raise TaskCancelled()
+        self.signals.progress.emit(int(done), int(total or 0))
+    
+    def run(self):
+        """Run the call and emit its outcome."""
+        try:
+            if self.is_cancelled():
+                raise TaskCancelled()
+            result = self.fn(*self.args, **self.kwargs)
+            if self.is_cancelled():
+                raise TaskCancelled()
+        except TaskCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(result)
+        finally:
+            self.signals.done.emit()
+
+
+def start_task(task, pool=None):
+    """
+    Start an ApiTask on the thread pool and return it. Connect its signals
+    before starting: a signal emitted before a slot is connected is lost.
+    """
+    _active_tasks.add(task)
+    task.signals.done.connect(lambda: _active_tasks.discard(task))
+    (pool or QThreadPool.globalInstance()).start(task)
+    return task
+
+
+class AsyncTask:
+    """
+    Run the coroutine `fn(*args, **kwargs)` on an AsyncBridge; the asyncio
+    counterpart of ApiTask, with the same signals.
+    If `fn` accepts a `progress` callback, the task passes one that emits
+    `signals.progress`.
+    """
+    
+    def __init__(self, fn, *args, **kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        if accepts_progress(fn):
+            self.kwargs['progress'] = self.report_progress
+        self.signals = TaskSignals()
+        self.loop = None
+        self._task = None
+        self._cancelled = threading.Event()
+    
+    def cancel(self):
+        """Cancel the coroutine; safe to call from any thread."""
+        self._cancelled.set()
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._cancel_task)
+    
+    def is_cancelled(self):
+        """Return True once cancel() has been called."""
+        return self._cancelled.is_set()
+    
+    def report_progress(self, done, total=0):
+        """Progress callback passed to the coroutine."""
+        self.signals.progress.emit(int(done), int(total or 0))
+    
+    def _schedule(self):
+        """Create the asyncio task; runs on the bridge's loop."""
+        self._task = self.loop.create_task(self.fn(*self.args, **self.kwargs))
+        # A done callback also runs for a task cancelled before it started
+        self._task.add_done_callback(self._emit_outcome)
+        if self.is_cancelled():
+            self._task.cancel()
+    
+    def _cancel_task(self):
+        if self._task is not None:
+            self._task.cancel()
+    
+    def _emit_outcome(self, task):
+        """Emit the coroutine's outcome."""
+        try:
+            if task.cancelled() or self.is_cancelled():
+                self.signals.cancelled.emit()
+            elif task.exception() is not None:
+                self.signals.failed.emit(str(task.exception()))
+            else:
+                self.signals.finished.emit(task.result())
+        finally:
+            self.signals.done.emit()
+
+
+class AsyncBridge:
+    """
+    An asyncio event loop for the GUI, in the manner of qasync. The loop
+    runs on its own thread, so Qt's event loop is left alone, and outcomes
+    reach the GUI thread through the tasks' signals.
+    """
+    
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name='asyncio', daemon=True)
+        self._thread.start()
+    
+    def start(self, task):
+        """
+        Start an AsyncTask on the loop and return it. As with start_task,
+        connect its signals before starting.
+        """
+        _active_tasks.add(task)
+        task.signals.done.connect(lambda: _active_tasks.discard(task))
+        task.loop = self.loop
+        self.loop.call_soon_threadsafe(task._schedule)
+        return task
+    
+    def close(self):
+        """Cancel unfinished coroutines and stop the loop."""
+        if self.loop.is_closed():
+            return
+        
+        async def cancel_pending():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        
+        asyncio.run_coroutine_threadsafe(cancel_pending(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
@@ -1,7 +1,11 @@
 import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import Mock, patch, mock_open
-from services.api_client import APIClient
+from services.api_client import APIClient, DEFAULT_TIMEOUT, TRANSFER_TIMEOUT
 import json
+import math
+import requests
+import threading
 
 
 class TestAPIClient:
@@ -22,7 +26,7 @@ class TestAPIClient:
     
     def test_login_success(self, api_client, mock_response):
         """Test successful login."""
-        with patch('requests.post', return_value=mock_response):
+        with patch('requests.Session.post', return_value=mock_response):
             success, message, data = api_client.login('testuser', 'testpass123')
             
             assert success is True
@@ -36,7 +40,7 @@ class TestAPIClient:
         mock_response.status_code = 401
         mock_response.json.return_value = {'error': 'Invalid credentials'}
         
-        with patch('requests.post', return_value=mock_response):
+        with patch('requests.Session.post', return_value=mock_response):
             success, message, data = api_client.login('testuser', 'wrongpass')
             
             assert success is False
@@ -45,14 +49,21 @@ class TestAPIClient:
     
     def test_login_connection_error(self, api_client):
         """Test login with connection error."""
-        with patch('requests.post', side_effect=Exception('Connection failed')):
+        with patch('requests.Session.post', side_effect=requests.exceptions.ConnectionError('Connection failed')):
             success, message, data = api_client.login('testuser', 'testpass123')
             
             assert success is False
             assert 'Connection error' in message
             assert data is None
     
-    def test_upload_csv_success(self, api_client):
+    @pytest.fixture
+    def csv_path(self, tmp_path):
+        """Write a small CSV file to upload."""
+        path = tmp_path / 'test.csv'
+        path.write_bytes(b'Equipment Name,Type,Flowrate,Pressure,Temperature\nP1,Pump,1,2,3\n')
+        return str(path)
+    
+    def test_upload_csv_success(self, api_client, csv_path):
         """Test successful CSV upload."""
         api_client.token = 'test-token'
         
@@ -65,13 +76,116 @@ class TestAPIClient:
             'summary': {}
         }
         
-        with patch('requests.post', return_value=mock_response):
-            with patch('builtins.open', mock_open(read_data=b'test data')):
-                success, message, data = api_client.upload_csv('test.csv')
-                
-                assert success is True
-                assert message == 'Upload successful'
-                assert data['dataset_id'] == 1
+        with patch('requests.Session.post', return_value=mock_response):
+            success, message, data = api_client.upload_csv(csv_path)
+            
+            assert success is True
+            assert message == 'Upload successful'
+            assert data['dataset_id'] == 1
+    
+    def test_upload_csv_background_returns_job(self, api_client, csv_path):
+        """Test background upload returns the queued job."""
+        api_client.token = 'test-token'
+        
+        mock_response = Mock()
+        mock_response.status_code = 202
+        mock_response.json.return_value = {'job_id': 7, 'status': 'queued'}
+        
+        bodies = []
+        def post(url, **kwargs):
+            bodies.append(kwargs['data'].read())
+            return mock_response
+        
+        with patch('requests.Session.post', side_effect=post):
+            success, message, data = api_client.upload_csv(csv_path, background=True)
+            
+            assert success is True
+            assert message == 'Upload queued'
+            assert data['job_id'] == 7
+            assert b'name="async"\r\n\r\ntrue\r\n' in bodies[0]
+    
+    def test_upload_csv_without_data(self, api_client, csv_path):
+        """Test include_data=False asks the server to leave the rows out."""
+        mock_response = Mock()
+        mock_response.status_code = 201
+        mock_response.json.return_value = {'dataset_id': 1, 'data': [], 'summary': {}}
+        
+        bodies = []
+        def post(url, **kwargs):
+            bodies.append(kwargs['data'].read())
+            return mock_response
+        
+        with patch('requests.Session.post', side_effect=post):
+            success, message, data = api_client.upload_csv(csv_path, include_data=False)
+        
+        assert success is True
+        assert b'name="include_data"\r\n\r\nfalse\r\n' in bodies[0]
+    
+    def test_upload_csv_streams_with_progress(self, api_client, csv_path):
+        """Test the multipart body is streamed from disk with its length and progress."""
+        mock_response = Mock()
+        mock_response.status_code = 201
+        mock_response.json.return_value = {'dataset_id': 1}
+        
+        requests_seen = []
+        def post(url, **kwargs):
+            body = kwargs['data']
+            requests_seen.append((len(body), kwargs['headers']['Content-Type'], body.read(10) + body.read()))
+            return mock_response
+        
+        progress = []
+        with patch('requests.Session.post', side_effect=post):
+            api_client.upload_csv(csv_path, progress=lambda sent, total: progress.append((sent, total)))
+        
+        length, content_type, content = requests_seen[0]
+        assert length == len(content)
+        assert content_type.startswith('multipart/form-data; boundary=')
+        boundary = content_type.split('=', 1)[1]
+        assert content.startswith(f'--{boundary}\r\n'.encode())
+        assert b'filename="test.csv"' in content
+        assert b'P1,Pump,1,2,3' in content
+        assert content.endswith(f'--{boundary}--\r\n'.encode())
+        assert progress[-1] == (length, length)
+    
+    def test_large_files_use_resumable_upload(self, api_client, csv_path):
+        """Test files over the threshold go through the chunked protocol."""
+        api_client.resumable_threshold = 10
+        
+        with patch.object(api_client, 'upload_csv_resumable',
+                          return_value=(True, 'Upload successful', {})) as mock_resumable:
+            api_client.upload_csv(csv_path)
+        
+        assert mock_resumable.call_args.args[0] == csv_path
+    
+    def test_upload_csv_batch_success(self, api_client, tmp_path):
+        """Test several files are sent in one batch request."""
+        api_client.token = 'test-token'
+        paths = []
+        for name in ('a.csv', 'b.csv'):
+            path = tmp_path / name
+            path.write_text('Equipment Name,Type,Flowrate,Pressure,Temperature\n')
+            paths.append(str(path))
+        
+        mock_response = Mock()
+        mock_response.status_code = 201
+        mock_response.json.return_value = {
+            'created': 2,
+            'failed': 0,
+            'results': [
+                {'filename': 'a.csv', 'dataset_id': 1, 'error': None},
+                {'filename': 'b.csv', 'dataset_id': 2, 'error': None},
+            ]
+        }
+        
+        with patch('requests.Session.post', return_value=mock_response) as mock_post:
+            success, message, data = api_client.upload_csv_batch(paths)
+            
+            assert success is True
+            assert message == 'Uploaded 2 of 2 files'
+            assert mock_post.call_args.args[0].endswith('/upload/batch/')
+            sent = mock_post.call_args.kwargs['files']
+            assert [field for field, _ in sent] == ['files', 'files']
+            assert [part[0] for _, part in sent] == ['a.csv', 'b.csv']
     
     def test_upload_csv_file_not_found(self, api_client):
         """Test upload with non-existent file."""
@@ -83,7 +197,7 @@ class TestAPIClient:
         assert 'File not found' in message
         assert data is None
     
-    def test_upload_csv_error_response(self, api_client):
+    def test_upload_csv_error_response(self, api_client, csv_path):
         """Test upload with error response."""
         api_client.token = 'test-token'
         
@@ -91,13 +205,12 @@ class TestAPIClient:
         mock_response.status_code = 400
         mock_response.json.return_value = {'error': 'Invalid CSV'}
         
-        with patch('requests.post', return_value=mock_response):
-            with patch('builtins.open', mock_open(read_data=b'test data')):
-                success, message, data = api_client.upload_csv('test.csv')
-                
-                assert success is False
-                assert 'Invalid CSV' in message
-                assert data is None
+        with patch('requests.Session.post', return_value=mock_response):
+            success, message, data = api_client.upload_csv(csv_path)
+            
+            assert success is False
+            assert 'Invalid CSV' in message
+            assert data is None
     
     def test_get_history_success(self, api_client):
         """Test successful history retrieval."""
@@ -111,7 +224,7 @@ class TestAPIClient:
             ]
         }
         
-        with patch('requests.get', return_value=mock_response):
+        with patch('requests.Session.get', return_value=mock_response):
             success, message, data = api_client.get_history()
             
             assert success is True
@@ -126,7 +239,7 @@ class TestAPIClient:
         mock_response.status_code = 500
         mock_response.json.return_value = {'error': 'Server error'}
         
-        with patch('requests.get', return_value=mock_response):
+        with patch('requests.Session.get', return_value=mock_response):
             success, message, data = api_client.get_history()
             
             assert success is False
@@ -144,28 +257,267 @@ class TestAPIClient:
             'summary': {'total_count': 10}
         }
         
-        with patch('requests.get', return_value=mock_response):
+        with patch('requests.Session.get', return_value=mock_response):
             success, message, data = api_client.get_summary(1)
             
             assert success is True
             assert data['id'] == 1
             assert data['summary']['total_count'] == 10
     
+    def test_get_summary_not_modified_uses_cached_body(self, api_client):
+        """Test a 304 response returns the body cached under its ETag."""
+        api_client.token = 'test-token'
+        
+        first = Mock()
+        first.status_code = 200
+        first.headers = {'ETag': '"abc"'}
+        first.json.return_value = {'id': 1, 'summary': {'total_count': 10}}
+        not_modified = Mock()
+        not_modified.status_code = 304
+        
+        with patch('requests.Session.get', side_effect=[first, not_modified]) as mock_get:
+            api_client.get_summary(1)
+            success, message, data = api_client.get_summary(1)
+            
+            assert success is True
+            assert data['summary']['total_count'] == 10
+            assert mock_get.call_args.kwargs['headers']['If-None-Match'] == '"abc"'
+    
+    def test_get_rows_success(self, api_client):
+        """Test page of rows is requested with projection and filters."""
+        api_client.token = 'test-token'
+        
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            'count': 1,
+            'next_offset': None,
+            'rows': [{'Equipment Name': 'Pump-A1'}]
+        }
+        
+        with patch('requests.Session.get', return_value=mock_response) as mock_get:
+            success, message, data = api_client.get_rows(
+                1, limit=50, columns=['Equipment Name'], type='Pump'
+            )
+            
+            assert success is True
+            assert data['rows'][0]['Equipment Name'] == 'Pump-A1'
+            params = mock_get.call_args.kwargs['params']
+            assert params['limit'] == 50
+            assert params['columns'] == 'Equipment Name'
+            assert params['type'] == 'Pump'
+    
+    def test_get_rows_columnar(self, api_client):
+        """Test the columnar format is requested with the Accept header."""
+        api_client.token = 'test-token'
+        
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.headers = {'Content-Type': 'application/vnd.equipment.columnar+json'}
+        mock_response.json.return_value = {'count': 2, 'rows': {'Flowrate': [1.0, 2.0]}}
+        
+        with patch('requests.Session.get', return_value=mock_response) as mock_get:
+            success, message, data = api_client.get_rows(1, row_format='columnar')
+            
+            assert success is True
+            assert data['rows'] == {'Flowrate': [1.0, 2.0]}
+            headers = mock_get.call_args.kwargs['headers']
+            assert headers['Accept'] == 'application/vnd.equipment.columnar+json'
+            assert headers['Authorization'] == 'Token test-token'
+    
+    def test_get_rows_arrow(self, api_client):
+        """Test an Arrow stream is decoded into NumPy columns and metadata."""
+        pa = pytest.importorskip('pyarrow')
+        table = pa.table({'Type': ['Pump', None], 'Flowrate': [150.5, None]})
+        table = table.replace_schema_metadata({b'response': b'{"count": 2, "next_offset": null}'})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.headers = {'Content-Type': 'application/vnd.apache.arrow.stream'}
+        mock_response.content = sink.getvalue().to_pybytes()
+        
+        with patch('requests.Session.get', return_value=mock_response) as mock_get:
+            success, message, data = api_client.get_rows(1, row_format='arrow')
+            
+            assert success is True
+            assert data['count'] == 2
+            assert data['next_offset'] is None
+            assert list(data['rows']['Type']) == ['Pump', None]
+            assert data['rows']['Flowrate'][0] == 150.5
+            assert math.isnan(data['rows']['Flowrate'][1])
+            assert mock_get.call_args.kwargs['headers']['Accept'] == 'application/vnd.apache.arrow.stream'
+    
+    def test_get_rows_unknown_format(self, api_client):
+        """Test an unknown row format is rejected before any request."""
+        with patch('requests.Session.get') as mock_get:
+            with pytest.raises(ValueError):
+                api_client.get_rows(1, row_format='xml')
+            mock_get.assert_not_called()
+    
+    def test_compare_datasets_success(self, api_client):
+        """Test comparison requests the chosen dataset ids."""
+        api_client.token = 'test-token'
+        
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'datasets': [{'id': 1}, {'id': 2}]}
+        
+        with patch('requests.Session.get', return_value=mock_response) as mock_get:
+            success, message, data = api_client.compare_datasets([1, 2])
+            
+            assert success is True
+            assert len(data['datasets']) == 2
+            assert mock_get.call_args.kwargs['params'] == {'ids': '1,2'}
+    
+    def test_get_series_success(self, api_client):
+        """Test downsampled series request parameters."""
+        api_client.token = 'test-token'
+        
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            'total_points': 5000,
+            'columns': {'Flowrate': {'x': [0, 4999], 'y': [1.0, 2.0]}}
+        }
+        
+        with patch('requests.Session.get', return_value=mock_response) as mock_get:
+            success, message, data = api_client.get_series(
+                1, points=500, method='minmax', columns=['Flowrate']
+            )
+            
+            assert success is True
+            assert data['columns']['Flowrate']['x'] == [0, 4999]
+            assert mock_get.call_args.kwargs['params'] == {
+                'points': 500, 'method': 'minmax', 'columns': 'Flowrate'
+            }
+    
+    def test_get_histograms_success(self, api_client):
+        """Test histogram filters are sent as query parameters."""
+        api_client.token = 'test-token'
+        
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            'columns': {'Flowrate': {'count': 2, 'fixed': {'edges': [0, 1, 2], 'counts': [1, 1]}}},
+            'types': {}
+        }
+        
+        with patch('requests.Session.get', return_value=mock_response) as mock_get:
+            success, message, data = api_client.get_histograms(
+                1, columns=['Flowrate'], kind='fixed'
+            )
+            
+            assert success is True
+            assert data['columns']['Flowrate']['fixed']['counts'] == [1, 1]
+            assert mock_get.call_args.kwargs['params'] == {'columns': 'Flowrate', 'kind': 'fixed'}
+    
+    def test_aggregate_success(self, api_client):
+        """Test aggregate query is posted as JSON."""
+        api_client.token = 'test-token'
+        
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            'count': 3,
+            'groups': [{'key': {'Type': 'Pump'}, 'count': 3, 'statistics': {}}]
+        }
+        
+        with patch('requests.Session.post', return_value=mock_response) as mock_post:
+            success, message, data = api_client.aggregate(
+                1, group_by=['Type'], metrics=['mean', 'p90']
+            )
+            
+            assert success is True
+            assert data['groups'][0]['key'] == {'Type': 'Pump'}
+            assert mock_post.call_args.args[0].endswith('/datasets/1/aggregate/')
+            assert mock_post.call_args.kwargs['json'] == {
+                'group_by': ['Type'], 'metrics': ['mean', 'p90']
+            }
+    
     def test_get_pdf_success(self, api_client):
         """Test successful PDF download."""
         api_client.token = 'test-token'
         
         mock_response = Mock()
         mock_response.status_code = 200
-        mock_response.content = b'PDF content'
+        mock_response.headers = {'Content-Length': '11'}
+        mock_response.iter_content.return_value = [b'PDF ', b'content']
         
-        with patch('requests.get', return_value=mock_response):
+        progress = []
+        with patch('requests.Session.get', return_value=mock_response) as mock_get:
             with patch('builtins.open', mock_open()) as mock_file:
-                success, message = api_client.get_pdf(1, 'report.pdf')
+                success, message = api_client.get_pdf(
+                    1, 'report.pdf', progress=lambda done, total: progress.append((done, total))
+                )
                 
                 assert success is True
                 assert 'downloaded successfully' in message
                 mock_file.assert_called_once_with('report.pdf', 'wb')
+                assert [c.args[0] for c in mock_file().write.call_args_list] == [b'PDF ', b'content']
+                assert progress == [(4, 11), (11, 11)]
+                assert mock_get.call_args.kwargs['stream'] is True
+                # Uncompressed, so the response keeps its Content-Length
+                assert mock_get.call_args.kwargs['headers']['Accept-Encoding'] == 'identity'
+                mock_response.close.assert_called_once()
+    
+    def test_get_pdf_waits_for_render(self, api_client):
+        """Test a report still being rendered is requested again after Retry-After."""
+        rendering = Mock()
+        rendering.status_code = 202
+        rendering.headers = {'Retry-After': '2'}
+        ready = Mock()
+        ready.status_code = 200
+        ready.headers = {'Content-Length': '4'}
+        ready.iter_content.return_value = [b'%PDF']
+        
+        progress = []
+        with patch('requests.Session.get', side_effect=[rendering, ready]) as mock_get:
+            with patch('services.api_client.time.sleep') as sleep:
+                with patch('builtins.open', mock_open()):
+                    success, message = api_client.get_pdf(
+                        1, 'report.pdf', progress=lambda done, total: progress.append((done, total))
+                    )
+        
+        assert success is True
+        assert mock_get.call_count == 2
+        sleep.assert_called_once_with(2.0)
+        rendering.close.assert_called_once()
+        assert progress == [(0, 0), (4, 4)]
+    
+    def test_get_pdf_render_timeout(self, api_client):
+        """Test get_pdf gives up when the report is not rendered in time."""
+        rendering = Mock()
+        rendering.status_code = 202
+        rendering.headers = {}
+        
+        with patch('requests.Session.get', return_value=rendering):
+            with patch('services.api_client.REPORT_WAIT_TIMEOUT', 0):
+                success, message = api_client.get_pdf(1, 'report.pdf')
+        
+        assert success is False
+        assert 'Timed out' in message
+    
+    def test_get_pdf_interrupted(self, api_client, tmp_path):
+        """Test a download cut off midway leaves no partial file."""
+        def chunks(chunk_size):
+            yield b'%PDF-1.4 '
+            raise requests.exceptions.ChunkedEncodingError('Connection broken')
+        
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.headers = {}
+        mock_response.iter_content.side_effect = lambda chunk_size: chunks(chunk_size)
+        save_path = tmp_path / 'report.pdf'
+        
+        with patch('requests.Session.get', return_value=mock_response):
+            success, message = api_client.get_pdf(1, str(save_path))
+        
+        assert success is False
+        assert 'Connection error' in message
+        assert not save_path.exists()
     
     def test_get_pdf_error(self, api_client):
         """Test PDF download with error."""
@@ -174,7 +526,7 @@ class TestAPIClient:
         mock_response = Mock()
         mock_response.status_code = 404
         
-        with patch('requests.get', return_value=mock_response):
+        with patch('requests.Session.get', return_value=mock_response):
             success, message = api_client.get_pdf(1, 'report.pdf')
             
             assert success is False
@@ -188,3 +540,220 @@ class TestAPIClient:
             api_client.logout()
             
             assert api_client.token is None
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves queued (status, body) replies and records each request's client port."""
+    protocol_version = 'HTTP/1.1'
+    
+    def reply(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        self.server.requests.append((self.command, self.client_address[1]))
+        status, body = self.server.replies.pop(0) if self.server.replies else (200, {})
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    do_GET = reply
+    do_POST = reply
+    
+    def log_message(self, *args):
+        pass
+
+
+class TestSession:
+    """Tests for connection reuse, timeouts and retries against a local server."""
+    
+    @pytest.fixture
+    def server(self):
+        """Start a stub API server on a free port."""
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        server.requests = []
+        server.replies = []
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server
+        server.shutdown()
+        server.server_close()
+    
+    @pytest.fixture
+    def api_client(self, server):
+        """Create an API client for the stub server."""
+        client = APIClient(base_url=f'http://127.0.0.1:{server.server_port}/api')
+        client.token = 'test-token'
+        yield client
+        client.close()
+    
+    def test_connections_are_reused(self, server, api_client):
+        """Test repeated calls share one kept-alive connection."""
+        server.replies = [(200, {'datasets': []}), (200, {'total_count': 1}), (200, {'datasets': []})]
+        
+        assert api_client.get_history()[0] is True
+        assert api_client.get_summary(1)[0] is True
+        assert api_client.get_history()[0] is True
+        
+        ports = {port for _, port in server.requests}
+        assert len(server.requests) == 3
+        assert len(ports) == 1
+    
+    def test_idempotent_calls_are_retried(self, server, api_client):
+        """Test GETs are retried after 503 responses."""
+        server.replies = [(503, {}), (503, {}), (200, {'datasets': [{'id': 1}]})]
+        
+        success, message, data = api_client.get_history()
+        
+        assert success is True
+        assert data['datasets'] == [{'id': 1}]
+        assert len(server.requests) == 3
+    
+    def test_posts_are_not_retried(self, server, api_client):
+        """Test non-idempotent requests are sent once."""
+        server.replies = [(503, {'error': 'Service unavailable'})]
+        
+        success, message, data = api_client.aggregate(1, group_by=['Type'])
+        
+        assert success is False
+        assert message == 'Service unavailable'
+        assert [method for method, _ in server.requests] == ['POST']
+    
+    def test_timeouts(self, api_client, tmp_path):
+        """Test requests carry the default timeout and uploads the transfer timeout."""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {}
+        
+        with patch('requests.Session.get', return_value=mock_response) as mock_get:
+            api_client.get_history()
+            assert mock_get.call_args.kwargs['timeout'] == DEFAULT_TIMEOUT
+        
+        mock_response.status_code = 201
+        csv_path = tmp_path / 'test.csv'
+        csv_path.write_bytes(b'Equipment Name\n')
+        with patch('requests.Session.post', return_value=mock_response) as mock_post:
+            api_client.upload_csv(str(csv_path))
+            assert mock_post.call_args.kwargs['timeout'] == TRANSFER_TIMEOUT
+
+
+class ChunkedUploadHandler(BaseHTTPRequestHandler):
+    """
+    In-memory version of the resumable upload protocol. The next
+    `server.drop_puts` chunks keep only their first half and the
+    connection is closed without a reply, like a dropped network link.
+    """
+    protocol_version = 'HTTP/1.1'
+    
+    def send_json(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def status_body(self):
+        return {'upload_id': 1, 'size': self.server.size, 'offset': len(self.server.received),
+                'chunk_size': self.server.chunk_size}
+    
+    def read_body(self):
+        return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+    
+    def do_POST(self):
+        body = self.read_body()
+        if self.path == '/api/upload/chunked/':
+            self.server.size = json.loads(body)['size']
+            self.send_json(201, self.status_body())
+        else:
+            self.server.completed = bytes(self.server.received)
+            self.send_json(201, {'dataset_id': 1, 'data': [], 'summary': {}})
+    
+    def do_GET(self):
+        self.send_json(200, self.status_body())
+    
+    def do_PUT(self):
+        body = self.read_body()
+        self.server.sent_bytes += len(body)
+        if int(self.headers['Upload-Offset']) != len(self.server.received):
+            self.send_json(409, self.status_body())
+        elif self.server.drop_puts:
+            self.server.drop_puts -= 1
+            self.server.received += body[:len(body) // 2]
+            self.close_connection = True
+        else:
+            self.server.received += body
+            self.send_json(200, self.status_body())
+    
+    def log_message(self, *args):
+        pass
+
+
+class TestResumableUpload:
+    """Tests for resumable uploads over an unreliable connection."""
+    
+    CSV = b'Equipment Name,Type,Flowrate,Pressure,Temperature\n' + b''.join(
+        f'Pump-{i},Pump,{i}.5,2.0,3.0\n'.encode() for i in range(200)
+    )
+    
+    @pytest.fixture
+    def server(self):
+        """Start a stub chunked upload server."""
+        server = ThreadingHTTPServer(('127.0.0.1', 0), ChunkedUploadHandler)
+        server.received = bytearray()
+        server.chunk_size = 1024
+        server.drop_puts = 0
+        server.sent_bytes = 0
+        server.completed = None
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server
+        server.shutdown()
+        server.server_close()
+    
+    @pytest.fixture
+    def api_client(self, server):
+        """Create an API client for the stub server without retry delays."""
+        client = APIClient(base_url=f'http://127.0.0.1:{server.server_port}/api')
+        client.token = 'test-token'
+        with patch('time.sleep'):
+            yield client
+        client.close()
+    
+    @pytest.fixture
+    def csv_path(self, tmp_path):
+        """Write the CSV file to upload."""
+        path = tmp_path / 'large.csv'
+        path.write_bytes(self.CSV)
+        return str(path)
+    
+    def test_dropped_chunks_resume(self, server, api_client, csv_path):
+        """Test chunks cut off mid-transfer are continued, not restarted."""
+        server.drop_puts = 2
+        progress = []
+        
+        success, message, data = api_client.upload_csv_resumable(
+            csv_path, progress=lambda sent, total: progress.append((sent, total))
+        )
+        
+        assert success is True
+        assert server.completed == self.CSV
+        assert progress[-1] == (len(self.CSV), len(self.CSV))
+    
+    def test_resume_after_giving_up(self, server, api_client, csv_path):
+        """Test uploading the same file again continues from the server's offset."""
+        server.drop_puts = 100
+        success, message, data = api_client.upload_csv_resumable(csv_path)
+        assert success is False
+        assert 'Connection error' in message
+        received = len(server.received)
+        assert 0 < received < len(self.CSV)
+        
+        server.drop_puts = 0
+        server.sent_bytes = 0
+        success, message, data = api_client.upload_csv_resumable(csv_path)
+        
+        assert success is True
+        assert server.completed == self.CSV
+        assert server.sent_bytes == len(self.CSV) - received
@@ -0,0 +1,181 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+from services.async_client import AsyncAPIClient
+
+
+PDF_BYTES = b'%PDF-1.4 ' + b'x' * 200000
+
+
+class APIStubHandler(BaseHTTPRequestHandler):
+    """Answers the endpoints AsyncAPIClient calls and tracks requests in flight."""
+    protocol_version = 'HTTP/1.1'
+    
+    def send_body(self, status, payload, content_type='application/json'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def handle_request(self):
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            server.ports.add(self.client_address[1])
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length)
+            time.sleep(server.delay)
+            
+            if self.path == '/api/auth/login/':
+                reply = {'token': 'stub-token', 'user_id': 1, 'username': 'stub'}
+                self.send_body(200, json.dumps(reply).encode())
+            elif self.path == '/api/upload/':
+                server.uploads.append(body)
+                reply = {'dataset_id': len(server.uploads), 'data': [], 'summary': {}}
+                self.send_body(201, json.dumps(reply).encode())
+            elif self.path == '/api/history/':
+                self.send_body(200, json.dumps({'datasets': [{'id': 1}]}).encode())
+            elif self.path.startswith('/api/summary/'):
+                dataset_id = int(self.path.split('/')[3])
+                self.send_body(200, json.dumps({'total_count': dataset_id}).encode())
+            elif self.path.startswith('/api/report/pdf/'):
+                self.send_body(200, PDF_BYTES, 'application/pdf')
+            else:
+                self.send_body(404, b'{"error": "Not found"}')
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+    
+    do_GET = handle_request
+    do_POST = handle_request
+    
+    def log_message(self, *args):
+        pass
+
+
+class TestAsyncAPIClient:
+    """Tests for the asyncio client against a local stub server."""
+    
+    @pytest.fixture
+    def server(self):
+        """Start a stub API server on a free port."""
+        server = ThreadingHTTPServer(('127.0.0.1', 0), APIStubHandler)
+        server.lock = threading.Lock()
+        server.in_flight = 0
+        server.max_in_flight = 0
+        server.ports = set()
+        server.uploads = []
+        server.delay = 0
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server
+        server.shutdown()
+        server.server_close()
+    
+    @pytest.fixture
+    def base_url(self, server):
+        """API root of the stub server."""
+        return f'http://127.0.0.1:{server.server_port}/api'
+    
+    @pytest.fixture
+    def csv_path(self, tmp_path):
+        """Write a small CSV file to upload."""
+        path = tmp_path / 'test.csv'
+        path.write_bytes(b'Equipment Name,Type,Flowrate,Pressure,Temperature\nP1,Pump,1,2,3\n')
+        return str(path)
+    
+    def test_calls(self, server, base_url, csv_path, tmp_path):
+        """Test each call returns what the blocking client would."""
+        save_path = str(tmp_path / 'report.pdf')
+        progress_threads = []
+        
+        def progress(done, total):
+            progress_threads.append(threading.current_thread())
+        
+        async def run():
+            async with AsyncAPIClient(base_url) as client:
+                with patch('services.api_client.save_token'):
+                    login = await client.login('stub', 'secret')
+                return (login, client.token, await client.upload_csv(csv_path),
+                        await client.get_history(), await client.get_summary(3),
+                        await client.get_pdf(3, save_path, progress=progress))
+        
+        login, token, upload, history, summary, pdf = asyncio.run(run())
+        
+        assert login[0] is True
+        assert token == 'stub-token'
+        assert upload[:2] == (True, 'Upload successful')
+        assert b'filename="test.csv"' in server.uploads[0]
+        assert history == (True, 'History retrieved', {'datasets': [{'id': 1}]})
+        assert summary[2] == {'total_count': 3}
+        assert pdf == (True, 'PDF downloaded successfully')
+        with open(save_path, 'rb') as f:
+            assert f.read() == PDF_BYTES
+        # Progress is reported on the event loop's thread
+        assert progress_threads and set(progress_threads) == {threading.main_thread()}
+    
+    def test_concurrency_limit_and_shared_pool(self, server, base_url):
+        """Test no more than max_concurrency calls are in flight and connections are reused."""
+        server.delay = 0.05
+        
+        async def run():
+            async with AsyncAPIClient(base_url, max_concurrency=3) as client:
+                return await asyncio.gather(*(client.get_summary(i) for i in range(12)))
+        
+        results = asyncio.run(run())
+        
+        assert [data['total_count'] for _, _, data in results] == list(range(12))
+        assert server.max_in_flight == 3
+        assert len(server.ports) <= 3
+    
+    def test_upload_many(self, server, base_url, tmp_path):
+        """Test several files are uploaded and results keep their order."""
+        paths = []
+        for i in range(5):
+            path = tmp_path / f'shift-{i}.csv'
+            path.write_bytes(b'Equipment Name,Type,Flowrate,Pressure,Temperature\n')
+            paths.append(str(path))
+        paths.append(str(tmp_path / 'missing.csv'))
+        
+        async def run():
+            async with AsyncAPIClient(base_url, max_concurrency=2) as client:
+                return await client.upload_many(paths)
+        
+        results = asyncio.run(run())
+        
+        assert [success for success, _, _ in results] == [True] * 5 + [False]
+        assert results[-1][1] == 'File not found'
+        assert len(server.uploads) == 5
+    
+    def test_cancel_stops_transfer(self, base_url, tmp_path):
+        """Test cancelling a download stops it at its next progress report."""
+        reports = []
+        
+        def slow_pdf(dataset_id, save_path, full=False, progress=None):
+            for done in range(1, 200):
+                reports.append(done)
+                progress(done, 200)
+                time.sleep(0.01)
+            return True, 'PDF downloaded successfully'
+        
+        async def run():
+            async with AsyncAPIClient(base_url) as client:
+                client.client.get_pdf = slow_pdf
+                call = asyncio.ensure_future(client.get_pdf(1, str(tmp_path / 'r.pdf')))
+                await asyncio.sleep(0.1)
+                call.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await call
+        
+        asyncio.run(run())
+        
+        # Closing the client waited for the worker thread, which stopped early
+        assert 1 < len(reports) < 199
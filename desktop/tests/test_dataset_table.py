@@ -0,0 +1,170 @@
+import sys
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+from PyQt5.QtCore import QModelIndex, QPersistentModelIndex, Qt
+from PyQt5.QtWidgets import QApplication
+from services.api_client import APIClient
+from services.formats import FASTEST_FORMAT
+from widgets.dataset_table import DatasetTableModel, PAGE_SIZE, sort_order
+
+
+@pytest.fixture(scope='session')
+def qapp():
+    """Create QApplication instance."""
+    app = QApplication.instance()
+    if app is None:
+        app = QApplication(sys.argv)
+    yield app
+
+
+def make_rows(count):
+    """Build `count` rows as columns of arrays, as the Arrow format returns them."""
+    index = np.arange(count)
+    return {
+        'Equipment Name': np.array([f'EQ-{i}' for i in index], dtype=object),
+        'Type': np.array(['Pump' if i % 2 else 'Valve' for i in index], dtype=object),
+        'Flowrate': (index * 7 % 101).astype(float),
+        'Pressure': index.astype(float),
+        'Temperature': np.full(count, 20.0),
+    }
+
+
+class TestDatasetTableModel:
+    """Tests for the lazily loaded dataset table model."""
+    
+    @pytest.fixture
+    def dataset(self):
+        """Rows of a dataset held by the fake server."""
+        return make_rows(2500)
+    
+    @pytest.fixture
+    def api_client(self, dataset):
+        """Create a mock API client serving pages of `dataset`."""
+        def get_rows(dataset_id, offset=0, limit=100, ordering=None, row_format='json'):
+            rows = dataset
+            if ordering:
+                keys = dataset[ordering.lstrip('-')]
+                # Ties stay in file order either way
+                order = np.lexsort((np.arange(len(keys)), -keys if ordering.startswith('-') else keys))
+                rows = {name: values[order] for name, values in dataset.items()}
+            page = {name: values[offset:offset + limit] for name, values in rows.items()}
+            return True, 'Rows retrieved', {'count': len(dataset['Pressure']), 'rows': page}
+        
+        client = Mock(spec=APIClient)
+        client.get_rows.side_effect = get_rows
+        return client
+    
+    @pytest.fixture
+    def model(self, qapp, api_client):
+        """Create the table model."""
+        model = DatasetTableModel(api_client)
+        yield model
+        model.cancel()
+    
+    def test_records_are_displayed(self, model):
+        """Test rows from the upload response are shown without a request."""
+        model.set_dataset(1, [
+            {'Equipment Name': 'Pump-A1', 'Type': 'Pump', 'Flowrate': 150.5,
+             'Pressure': None, 'Temperature': 85.3},
+        ], 1)
+        
+        assert model.rowCount() == 1
+        assert model.columnCount() == 5
+        assert model.index(0, 0).data() == 'Pump-A1'
+        assert model.index(0, 2).data() == '150.5'
+        assert model.index(0, 3).data() == ''
+        assert model.index(0, 2).data(Qt.TextAlignmentRole) == int(Qt.AlignRight | Qt.AlignVCenter)
+        assert model.headerData(4, Qt.Horizontal) == 'Temperature'
+        assert not model.canFetchMore(QModelIndex())
+        model.api_client.get_rows.assert_not_called()
+    
+    def test_pages_are_fetched_on_demand(self, model, qtbot, dataset):
+        """Test rows arrive page by page and fetching stops at the total."""
+        model.set_dataset(1, [], 2500)
+        
+        qtbot.waitUntil(lambda: model.rowCount() == PAGE_SIZE)
+        call = model.api_client.get_rows.call_args
+        assert call.kwargs['row_format'] == FASTEST_FORMAT
+        assert call.kwargs['offset'] == 0
+        
+        while model.canFetchMore(QModelIndex()):
+            rows = model.rowCount()
+            model.fetchMore(QModelIndex())
+            # Only one page is requested at a time
+            assert not model.canFetchMore(QModelIndex())
+            qtbot.waitUntil(lambda: model.rowCount() > rows)
+        
+        assert model.rowCount() == 2500
+        assert model.index(2499, 0).data() == 'EQ-2499'
+        assert model.api_client.get_rows.call_count == 3
+        # Pages are copied into arrays grown by doubling, up to the total
+        assert len(model._arrays['Pressure']) == 2500
+        assert np.array_equal(model._arrays['Pressure'], dataset['Pressure'])
+    
+    def test_sort_in_memory_when_loaded(self, model):
+        """Test sorting a fully loaded dataset reorders rows with missing values last."""
+        rows = make_rows(5)
+        rows['Flowrate'] = np.array([3.0, np.nan, 1.0, 2.0, 5.0])
+        model.set_dataset(1, rows, 5)
+        tracked = QPersistentModelIndex(model.index(4, 0))
+        
+        model.sort(2, Qt.AscendingOrder)
+        assert [model.index(r, 2).data() for r in range(5)] == ['1.0', '2.0', '3.0', '5.0', '']
+        # The row that was last (EQ-4, flowrate 5.0) is followed
+        assert tracked.row() == 3
+        assert model.index(tracked.row(), 0).data() == 'EQ-4'
+        
+        model.sort(2, Qt.DescendingOrder)
+        assert [model.index(r, 2).data() for r in range(5)] == ['5.0', '3.0', '2.0', '1.0', '']
+        model.api_client.get_rows.assert_not_called()
+    
+    def test_sort_on_server_when_partly_loaded(self, model, qtbot, dataset):
+        """Test sorting a partly loaded dataset pages through it in the server's order."""
+        model.set_dataset(1, [], 2500)
+        qtbot.waitUntil(lambda: model.rowCount() == PAGE_SIZE)
+        
+        model.sort(2, Qt.DescendingOrder)
+        
+        assert model.rowCount() == 0
+        qtbot.waitUntil(lambda: model.rowCount() == PAGE_SIZE)
+        assert model.api_client.get_rows.call_args.kwargs['ordering'] == '-Flowrate'
+        assert model.index(0, 2).data() == str(dataset['Flowrate'].max())
+    
+    def test_failed_page_stops_fetching(self, model, qtbot):
+        """Test a failed page is reported once and not retried."""
+        model.api_client.get_rows.side_effect = None
+        model.api_client.get_rows.return_value = (False, 'Dataset not found', None)
+        
+        with qtbot.waitSignal(model.fetch_failed) as blocker:
+            model.set_dataset(1, [], 2500)
+        
+        assert blocker.args == ['Dataset not found']
+        assert not model.canFetchMore(QModelIndex())
+    
+    def test_stale_page_is_dropped(self, model, qtbot):
+        """Test a page of a previous dataset does not reach the new one."""
+        model.set_dataset(1, [], 2500)
+        model.set_dataset(2, [{'Equipment Name': 'Pump-A1', 'Type': 'Pump', 'Flowrate': 1.0,
+                               'Pressure': 2.0, 'Temperature': 3.0}], 1)
+        
+        qtbot.wait(100)
+        assert model.rowCount() == 1
+        assert model.index(0, 0).data() == 'Pump-A1'
+    
+    def test_sort_order_text(self):
+        """Test text columns sort as strings with missing values last."""
+        values = np.array(['b', None, 'a', 'c'], dtype=object)
+        
+        assert list(sort_order(values)) == [2, 0, 3, 1]
+        assert list(sort_order(values, descending=True)) == [3, 0, 2, 1]
+    
+    def test_sort_order_descending_keeps_ties_in_order(self):
+        """Test rows with equal keys keep their order when sorting descending."""
+        numbers = np.array([1.0, 2.0, np.nan, 2.0, 1.0])
+        text = np.array(['a', 'b', None, 'b', 'a'], dtype=object)
+        
+        for values in (numbers, text):
+            assert list(sort_order(values, descending=True)) == [1, 3, 0, 4, 2]
+            assert list(sort_order(values)) == [0, 4, 1, 3, 2]
@@ -6,6 +6,7 @@ from windows.login_window import LoginWindow
 from windows.main_window import MainWindow
 from services.api_client import APIClient
 import sys
+import threading
 
 
 @pytest.fixture(scope='session')
@@ -52,8 +53,8 @@ class TestLoginWindow:
         with patch.object(window.api_client, 'login', return_value=(True, 'Success', {'token': 'test'})):
             qtbot.mouseClick(window.login_button, Qt.LeftButton)
             
-            # Window should be accepted
-            assert window.result() == LoginWindow.Accepted
+            # Window should be accepted once the background login returns
+            qtbot.waitUntil(lambda: window.result() == LoginWindow.Accepted)
     
     def test_login_failure_shows_error(self, qapp, qtbot):
         """Test login failure shows error message."""
@@ -66,7 +67,9 @@ class TestLoginWindow:
         with patch.object(window.api_client, 'login', return_value=(False, 'Invalid credentials', None)):
             with patch('PyQt5.QtWidgets.QMessageBox.critical') as mock_error:
                 qtbot.mouseClick(window.login_button, Qt.LeftButton)
+                qtbot.waitUntil(lambda: mock_error.called)
                 mock_error.assert_called_once()
+                assert window.login_button.isEnabled()
 
 
 class TestMainWindow:
@@ -77,6 +80,8 @@ class TestMainWindow:
         """Create mock API client."""
         client = Mock(spec=APIClient)
         client.token = 'test-token'
+        client.get_series.return_value = (False, 'Not available', None)
+        client.get_rows.return_value = (False, 'Not available', None)
         return client
     
     def test_main_window_initialization(self, qapp, qtbot, api_client):
@@ -86,7 +91,7 @@ class TestMainWindow:
         
         assert window.windowTitle() == 'Chemical Equipment Parameter Visualizer'
         assert window.upload_button is not None
-        assert window.table_widget is not None
+        assert window.table_view is not None
         assert window.chart_widget is not None
     
     def test_upload_button_opens_file_dialog(self, qapp, qtbot, api_client):
@@ -128,12 +133,126 @@ class TestMainWindow:
         window.display_dataset(mock_data)
         
         # Check table is populated
-        assert window.table_widget.rowCount() == 1
-        assert window.table_widget.item(0, 0).text() == 'Pump-A1'
+        assert window.table_model.rowCount() == 1
+        assert window.table_model.index(0, 0).data() == 'Pump-A1'
         
         # Check info label is updated
         assert 'test.csv' in window.info_label.text()
     
+    def test_display_dataset_without_average(self, qapp, qtbot, api_client):
+        """Test a column with no values shows n/a instead of failing."""
+        window = MainWindow(api_client)
+        qtbot.addWidget(window)
+        
+        window.display_dataset({
+            'dataset_id': 1,
+            'filename': 'test.csv',
+            'timestamp': '2025-11-22T18:30:00Z',
+            'data': [{'Equipment Name': 'Pump-A1', 'Type': 'Pump', 'Flowrate': 150.5,
+                      'Pressure': None, 'Temperature': 85.3}],
+            'summary': {
+                'total_count': 1,
+                'avg_flowrate': 150.5,
+                'avg_pressure': None,
+                'avg_temperature': 85.3,
+                'type_distribution': {'Pump': 1}
+            }
+        })
+        
+        assert 'Avg Pressure: n/a' in window.summary_label.text()
+        assert 'Avg Flowrate: 150.50' in window.summary_label.text()
+    
+    def test_display_dataset_plots_downsampled_series(self, qapp, qtbot, api_client):
+        """Test the line chart is drawn from the series endpoint."""
+        window = MainWindow(api_client)
+        qtbot.addWidget(window)
+        api_client.get_series.return_value = (True, 'Series retrieved', {
+            'total_points': 5000,
+            'columns': {
+                'Flowrate': {'x': [0, 2500, 4999], 'y': [150.5, 160.0, 140.0]},
+                'Pressure': {'x': [0, 4999], 'y': [45.2, 44.0]},
+            }
+        })
+        
+        window.display_dataset({
+            'dataset_id': 7,
+            'filename': 'test.csv',
+            'timestamp': '2025-11-22T18:30:00Z',
+            'data': [],
+            'summary': {
+                'total_count': 5000,
+                'avg_flowrate': 150.5,
+                'avg_pressure': 45.2,
+                'avg_temperature': 85.3,
+                'type_distribution': {'Pump': 5000}
+            }
+        })
+        
+        qtbot.waitUntil(lambda: len(window.chart_widget.ax_series.get_lines()) == 2)
+        assert api_client.get_series.call_args.args[0] == 7
+        lines = window.chart_widget.ax_series.get_lines()
+        assert [line.get_label() for line in lines] == ['Flowrate', 'Pressure']
+        assert list(lines[0].get_xdata()) == [0, 2500, 4999]
+    
+    def test_upload_runs_in_background(self, qapp, qtbot, api_client):
+        """Test the window stays responsive and shows progress during an upload."""
+        window = MainWindow(api_client)
+        qtbot.addWidget(window)
+        release = threading.Event()
+        
+        def upload(filepath, include_data=True):
+            release.wait(5)
+            return True, 'Upload successful', {
+                'dataset_id': 3,
+                'filename': 'test.csv',
+                'timestamp': '2025-11-22T18:30:00Z',
+                'data': [],
+                'summary': {'total_count': 1, 'avg_flowrate': 1.0, 'avg_pressure': 2.0,
+                            'avg_temperature': 3.0, 'type_distribution': {'Pump': 1}}
+            }
+        
+        api_client.upload_csv.side_effect = upload
+        api_client.get_rows.return_value = (True, 'Rows retrieved', {'count': 1, 'rows': {
+            'Equipment Name': ['Pump-A1'], 'Type': ['Pump'], 'Flowrate': [1.0],
+            'Pressure': [2.0], 'Temperature': [3.0]
+        }})
+        with patch('PyQt5.QtWidgets.QFileDialog.getOpenFileName', return_value=('test.csv', '')):
+            qtbot.mouseClick(window.upload_button, Qt.LeftButton)
+        
+        # The click returned while the upload is still blocked
+        assert not window.upload_button.isEnabled()
+        assert window.progress_bar.isVisibleTo(window)
+        assert window.cancel_button.isVisibleTo(window)
+        
+        release.set()
+        qtbot.waitUntil(lambda: window.upload_button.isEnabled())
+        # Rows are not sent with the upload but paged in by the table
+        assert api_client.upload_csv.call_args.kwargs['include_data'] is False
+        qtbot.waitUntil(lambda: window.table_model.rowCount() == 1)
+        assert window.table_model.index(0, 0).data() == 'Pump-A1'
+        assert window.pdf_action.isEnabled()
+        assert not window.progress_bar.isVisibleTo(window)
+    
+    def test_cancel_upload(self, qapp, qtbot, api_client):
+        """Test a cancelled upload's result is dropped."""
+        window = MainWindow(api_client)
+        qtbot.addWidget(window)
+        release = threading.Event()
+        
+        def upload(filepath, include_data=True):
+            release.wait(5)
+            return True, 'Upload successful', {'dataset_id': 3}
+        
+        api_client.upload_csv.side_effect = upload
+        with patch('PyQt5.QtWidgets.QFileDialog.getOpenFileName', return_value=('test.csv', '')):
+            qtbot.mouseClick(window.upload_button, Qt.LeftButton)
+        qtbot.mouseClick(window.cancel_button, Qt.LeftButton)
+        release.set()
+        
+        qtbot.waitUntil(lambda: window.upload_button.isEnabled())
+        assert window.current_dataset is None
+        assert window.status_bar.currentMessage() == 'Cancelled'
+    
     def test_menu_actions_exist(self, qapp, qtbot, api_client):
         """Test menu actions are created."""
         window = MainWindow(api_client)
@@ -0,0 +1,162 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from PyQt5.QtWidgets import QApplication
+from services.workers import ApiTask, AsyncBridge, AsyncTask, accepts_progress, start_task
+import sys
+
+
+@pytest.fixture(scope='session')
+def qapp():
+    """Create QApplication instance."""
+    app = QApplication.instance()
+    if app is None:
+        app = QApplication(sys.argv)
+    yield app
+
+
+class TestApiTask:
+    """Tests for running API calls on the thread pool."""
+    
+    def test_finished_delivers_result(self, qapp, qtbot):
+        """Test the call's return value arrives on the GUI thread."""
+        calling_threads = []
+        
+        def call(dataset_id, full=False):
+            calling_threads.append(threading.current_thread())
+            return True, 'ok', {'id': dataset_id, 'full': full}
+        
+        task = ApiTask(call, 4, full=True)
+        with qtbot.waitSignal(task.signals.finished) as blocker:
+            start_task(task)
+        
+        assert blocker.args == [(True, 'ok', {'id': 4, 'full': True})]
+        assert calling_threads[0] is not threading.main_thread()
+    
+    def test_exception_emits_failed(self, qapp, qtbot):
+        """Test an unexpected exception is reported instead of raised."""
+        def call():
+            raise ValueError('bad response')
+        
+        task = ApiTask(call)
+        with qtbot.waitSignal(task.signals.failed) as blocker:
+            start_task(task)
+        
+        assert blocker.args == ['bad response']
+    
+    def test_progress_and_cancel(self, qapp, qtbot):
+        """Test progress is reported and cancelling stops the call at the next report."""
+        stopped_at = []
+        
+        def call(progress=None):
+            for done in range(1, 1000):
+                try:
+                    progress(done, 1000)
+                except Exception:
+                    stopped_at.append(done)
+                    raise
+                time.sleep(0.01)
+            return 'complete'
+        
+        task = ApiTask(call)
+        progress = []
+        finished = []
+        task.signals.progress.connect(lambda done, total: progress.append((done, total)))
+        task.signals.finished.connect(finished.append)
+        start_task(task)
+        
+        qtbot.waitUntil(lambda: len(progress) >= 2)
+        with qtbot.waitSignal(task.signals.cancelled):
+            task.cancel()
+        
+        assert progress[0] == (1, 1000)
+        assert stopped_at and stopped_at[0] < 999
+        assert finished == []
+    
+    def test_result_dropped_after_cancel(self, qapp, qtbot):
+        """Test a call without a progress callback has its result dropped when cancelled."""
+        release = threading.Event()
+        task = ApiTask(lambda: release.wait(5))
+        finished = []
+        task.signals.finished.connect(finished.append)
+        start_task(task)
+        
+        with qtbot.waitSignal(task.signals.cancelled):
+            task.cancel()
+            release.set()
+        
+        assert finished == []
+    
+    def test_accepts_progress(self):
+        """Test progress callbacks are only passed to calls that take one."""
+        assert accepts_progress(lambda progress=None: None)
+        assert not accepts_progress(lambda dataset_id: None)
+
+
+
+class TestAsyncBridge:
+    """Tests for running coroutines from the GUI."""
+    
+    @pytest.fixture
+    def bridge(self):
+        """Start an asyncio loop beside the Qt loop."""
+        bridge = AsyncBridge()
+        yield bridge
+        bridge.close()
+    
+    def test_finished_delivers_result(self, qapp, qtbot, bridge):
+        """Test a coroutine's result arrives through the task's signal."""
+        async def call(dataset_id):
+            await asyncio.sleep(0.01)
+            return True, 'ok', {'id': dataset_id}
+        
+        task = AsyncTask(call, 4)
+        with qtbot.waitSignal(task.signals.finished) as blocker:
+            bridge.start(task)
+        
+        assert blocker.args == [(True, 'ok', {'id': 4})]
+    
+    def test_exception_emits_failed(self, qapp, qtbot, bridge):
+        """Test an exception raised by the coroutine is reported."""
+        async def call():
+            raise ValueError('bad response')
+        
+        task = AsyncTask(call)
+        with qtbot.waitSignal(task.signals.failed) as blocker:
+            bridge.start(task)
+        
+        assert blocker.args == ['bad response']
+    
+    def test_progress_and_cancel(self, qapp, qtbot, bridge):
+        """Test progress is reported and cancelling stops the coroutine."""
+        async def call(progress=None):
+            for done in range(1, 1000):
+                progress(done, 1000)
+                await asyncio.sleep(0.01)
+            return 'complete'
+        
+        task = AsyncTask(call)
+        progress = []
+        finished = []
+        task.signals.progress.connect(lambda done, total: progress.append((done, total)))
+        task.signals.finished.connect(finished.append)
+        bridge.start(task)
+        
+        qtbot.waitUntil(lambda: len(progress) >= 2)
+        with qtbot.waitSignal(task.signals.cancelled):
+            task.cancel()
+        
+        assert progress[0] == (1, 1000)
+        assert finished == []
+    
+    def test_cancel_before_start(self, qapp, qtbot, bridge):
+        """Test a task cancelled before it runs still reports cancelled and done."""
+        async def call():
+            return 'complete'
+        
+        task = AsyncTask(call)
+        task.cancel()
+        with qtbot.waitSignals([task.signals.cancelled, task.signals.done]):
+            bridge.start(task)
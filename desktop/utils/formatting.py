@@ -0,0 +1,3 @@
+def format_average(value):
+    """Format a summary average; a column with no values has none ('n/a')."""
+    return 'n/a' if value is None else f'{value:.2f}'
@@ -2,6 +2,7 @@ from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 import matplotlib.pyplot as plt
+from utils.formatting import format_average
 
 
 class ChartWidget(QWidget):
@@ -15,13 +16,14 @@ class ChartWidget(QWidget):
         """Initialize the user interface."""
         layout = QHBoxLayout()
         
-        # Create figure with two subplots
-        self.figure = Figure(figsize=(12, 4))
+        # Create figure with three subplots
+        self.figure = Figure(figsize=(15, 4))
         self.canvas = FigureCanvas(self.figure)
         
         # Create subplots
-        self.ax_pie = self.figure.add_subplot(121)
-        self.ax_bar = self.figure.add_subplot(122)
+        self.ax_pie = self.figure.add_subplot(131)
+        self.ax_bar = self.figure.add_subplot(132)
+        self.ax_series = self.figure.add_subplot(133)
         
         layout.addWidget(self.canvas)
         self.setLayout(layout)
@@ -29,6 +31,7 @@ class ChartWidget(QWidget):
         # Initial empty charts
         self.ax_pie.text(0.5, 0.5, 'No data', ha='center', va='center')
         self.ax_bar.text(0.5, 0.5, 'No data', ha='center', va='center')
+        self.ax_series.text(0.5, 0.5, 'No data', ha='center', va='center')
         self.canvas.draw()
     
     def update_charts(self, summary):
@@ -49,25 +52,50 @@ class ChartWidget(QWidget):
         
         # Bar chart - Average parameters
         parameters = ['Flowrate', 'Pressure', 'Temperature']
-        values = [
+        averages = [
             summary['avg_flowrate'],
             summary['avg_pressure'],
             summary['avg_temperature']
         ]
         bar_colors = ['#36a2eb', '#ff6384', '#ffce56']
         
+        # A column with no values has no average and gets an empty bar
+        values = [0.0 if value is None else value for value in averages]
         bars = self.ax_bar.bar(parameters, values, color=bar_colors)
         self.ax_bar.set_title('Average Parameters', fontsize=12, fontweight='bold')
         self.ax_bar.set_ylabel('Value')
         self.ax_bar.grid(axis='y', alpha=0.3)
         
         # Add value labels on bars
-        for bar in bars:
+        for bar, average in zip(bars, averages):
             height = bar.get_height()
             self.ax_bar.text(bar.get_x() + bar.get_width()/2., height,
-                           f'{height:.2f}',
+                           format_average(average),
                            ha='center', va='bottom', fontsize=9)
         
         # Adjust layout and redraw
         self.figure.tight_layout()
         self.canvas.draw()
+    
+    def update_series_chart(self, series):
+        """
+        Plot parameters against row number from a downsampled series
+        response (see APIClient.get_series).
+        """
+        self.ax_series.clear()
+        
+        colors = {'Flowrate': '#36a2eb', 'Pressure': '#ff6384', 'Temperature': '#ffce56'}
+        for name, points in series['columns'].items():
+            self.ax_series.plot(points['x'], points['y'], label=name,
+                                color=colors.get(name), linewidth=1)
+        
+        self.ax_series.set_title(
+            f"Parameters by Row ({series['total_points']} rows)",
+            fontsize=12, fontweight='bold'
+        )
+        self.ax_series.set_xlabel('Row')
+        self.ax_series.legend(fontsize=8)
+        self.ax_series.grid(alpha=0.3)
+        
+        self.figure.tight_layout()
+        self.canvas.draw()
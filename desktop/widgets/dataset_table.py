@@ -0,0 +1,236 @@
+"""
+Table model for a dataset's rows.
+
+Rows are held as one NumPy array per column and the view asks only for
+the cells it paints, so large datasets cost no widget items. Rows the
+upload response did not include are fetched page by page from the rows
+endpoint as the view scrolls down (canFetchMore/fetchMore), on the thread
+pool. Sorting reorders the arrays once every row is here; before that the
+server sorts the whole dataset and paging starts again.
+"""
+import numpy as np
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+
+from services.formats import FASTEST_FORMAT
+from services.workers import ApiTask, start_task
+
+
+COLUMNS = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+NUMERIC_COLUMNS = {'Flowrate', 'Pressure', 'Temperature'}
+
+# Rows per request; the server's largest page
+PAGE_SIZE = 1000
+
+
+def column_arrays(rows):
+    """
+    Turn rows as records, columns of lists or columns of arrays into one
+    NumPy array per column: float64 with NaN for missing numbers, object
+    with None for missing text.
+    """
+    if not isinstance(rows, dict):
+        rows = {name: [row.get(name) for row in rows] for name in COLUMNS}
+    return {
+        name: np.asarray(rows[name], dtype=float if name in NUMERIC_COLUMNS else object)
+        for name in COLUMNS
+    }
+
+
+def sort_order(values, descending=False):
+    """
+    Return the row order that sorts `values`, missing values last and ties
+    in their current order, as the server does.
+    """
+    if values.dtype.kind == 'f':
+        keys = values
+        missing = np.isnan(values)
+    else:
+        keys = np.array(['' if v is None else str(v) for v in values])
+        missing = np.array([v is None for v in values], dtype=bool)
+    if descending:
+        # Reversing an ascending order would reverse ties too; text keys
+        # cannot be negated, but their ranks can
+        keys = -np.unique(keys, return_inverse=True)[1]
+    order = np.argsort(keys, kind='stable')
+    return np.concatenate([order[~missing[order]], order[missing[order]]])
+
+
+class DatasetTableModel(QAbstractTableModel):
+    """Rows of one dataset, loaded lazily from the API."""
+    
+    # Message of a page that could not be fetched
+    fetch_failed = pyqtSignal(str)
+    
+    def __init__(self, api_client, parent=None):
+        super().__init__(parent)
+        self.api_client = api_client
+        self.dataset_id = None
+        self.total = 0
+        # Column arrays with room for more rows; the first _loaded are filled
+        self._arrays = column_arrays([])
+        self._loaded = 0
+        # Server-side ordering of the pages, e.g. '-Flowrate'
+        self._ordering = None
+        # The page request in flight, if any
+        self._task = None
+        self._failed = False
+    
+    def set_dataset(self, dataset_id, rows, total):
+        """
+        Show a dataset of `total` rows, starting with the `rows` already at
+        hand (the first rows in file order); the rest are fetched on demand.
+        """
+        self.cancel()
+        self.beginResetModel()
+        self.dataset_id = dataset_id
+        self._arrays = column_arrays(rows)
+        self._loaded = len(self._arrays[COLUMNS[0]])
+        self.total = max(total, self._loaded)
+        self._ordering = None
+        self._failed = False
+        self.endResetModel()
+        self._fetch_first_page()
+    
+    def loaded_rows(self):
+        """Return the number of rows fetched so far."""
+        return self._loaded
+    
+    def _reserve(self, rows):
+        """
+        Make room for at least `rows` rows, keeping the loaded ones. Capacity
+        doubles (up to the total) so filling page by page copies each row a
+        bounded number of times.
+        """
+        capacity = len(self._arrays[COLUMNS[0]])
+        if rows <= capacity:
+            return
+        capacity = max(rows, min(2 * capacity, self.total))
+        for name in COLUMNS:
+            values = self._arrays[name]
+            grown = np.full(capacity, np.nan if name in NUMERIC_COLUMNS else None,
+                            dtype=values.dtype)
+            grown[:self._loaded] = values[:self._loaded]
+            self._arrays[name] = grown
+    
+    def cancel(self):
+        """Drop the page request in flight, if any."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded_rows()
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        name = COLUMNS[index.column()]
+        if role == Qt.DisplayRole:
+            value = self._arrays[name][index.row()]
+            if value is None or (name in NUMERIC_COLUMNS and np.isnan(value)):
+                return ''
+            return str(value)
+        if role == Qt.TextAlignmentRole and name in NUMERIC_COLUMNS:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return COLUMNS[section]
+        return str(section + 1)
+    
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.dataset_id is None or self._failed:
+            return False
+        return self._task is None and self.loaded_rows() < self.total
+    
+    def fetchMore(self, parent=QModelIndex()):
+        """Request the next page of rows in the background."""
+        if not self.canFetchMore(parent):
+            return
+        task = ApiTask(
+            self.api_client.get_rows, self.dataset_id,
+            offset=self.loaded_rows(), limit=PAGE_SIZE,
+            ordering=self._ordering, row_format=FASTEST_FORMAT
+        )
+        task.signals.finished.connect(lambda result: self._page_loaded(task, result))
+        task.signals.failed.connect(lambda message: self._page_failed(task, message))
+        self._task = task
+        start_task(task)
+    
+    def _fetch_first_page(self):
+        # Views only ask for more rows once some are shown
+        if self.loaded_rows() == 0:
+            self.fetchMore()
+    
+    def _page_loaded(self, task, result):
+        """Append a fetched page, unless it belongs to an abandoned request."""
+        if task is not self._task:
+            return
+        success, message, data = result
+        if not success:
+            self._page_failed(task, message)
+            return
+        self._task = None
+        
+        page = column_arrays(data['rows'])
+        count = len(page[COLUMNS[0]])
+        if count == 0:
+            # The dataset is shorter than expected; stop asking
+            self.total = self.loaded_rows()
+            return
+        self.total = data['count']
+        start = self._loaded
+        self._reserve(start + count)
+        self.beginInsertRows(QModelIndex(), start, start + count - 1)
+        for name in COLUMNS:
+            self._arrays[name][start:start + count] = page[name]
+        self._loaded = start + count
+        self.endInsertRows()
+    
+    def _page_failed(self, task, message):
+        """Stop fetching after a failed page; reloading the dataset tries again."""
+        if task is not self._task:
+            return
+        self._task = None
+        self._failed = True
+        self.fetch_failed.emit(message)
+    
+    def sort(self, column, order=Qt.AscendingOrder):
+        """Sort by a column; column -1 (no sort indicator) leaves the rows as they are."""
+        if not 0 <= column < len(COLUMNS):
+            return
+        name = COLUMNS[column]
+        descending = order == Qt.DescendingOrder
+        
+        if self.loaded_rows() >= self.total:
+            self.layoutAboutToBeChanged.emit()
+            loaded = self._loaded
+            rows = sort_order(self._arrays[name][:loaded], descending)
+            for key in COLUMNS:
+                self._arrays[key] = self._arrays[key][:loaded][rows]
+            # Keep selections and the current cell on the same rows
+            position = np.empty_like(rows)
+            position[rows] = np.arange(len(rows))
+            old = self.persistentIndexList()
+            self.changePersistentIndexList(
+                old, [self.index(int(position[i.row()]), i.column()) for i in old]
+            )
+            self.layoutChanged.emit()
+            return
+        
+        # Only part of the dataset is here: page through it again in the
+        # server's order
+        self.cancel()
+        self.beginResetModel()
+        self._arrays = column_arrays([])
+        self._loaded = 0
+        self._ordering = ('-' if descending else '') + name
+        self._failed = False
+        self.endResetModel()
+        self._fetch_first_page()
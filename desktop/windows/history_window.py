@@ -1,6 +1,8 @@
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QListWidget, QListWidgetItem,
                              QLabel, QMessageBox, QPushButton)
 from PyQt5.QtCore import Qt
+from services.workers import ApiTask, start_task
+from utils.formatting import format_average
 
 
 class HistoryWindow(QDialog):
@@ -9,6 +11,7 @@ class HistoryWindow(QDialog):
     def __init__(self, api_client, parent=None):
         super().__init__(parent)
         self.api_client = api_client
+        self.history_task = None
         self.init_ui()
         self.load_history()
     
@@ -64,8 +67,23 @@ class HistoryWindow(QDialog):
         self.setLayout(layout)
     
     def load_history(self):
-        """Load and display history."""
-        success, message, data = self.api_client.get_history()
+        """Load history in the background; it is shown by show_history."""
+        self.list_widget.clear()
+        item = QListWidgetItem('Loading history...')
+        item.setFlags(Qt.NoItemFlags)
+        self.list_widget.addItem(item)
+        
+        self.history_task = ApiTask(self.api_client.get_history)
+        self.history_task.signals.finished.connect(self.show_history)
+        self.history_task.signals.failed.connect(
+            lambda message: QMessageBox.critical(self, 'Error', message)
+        )
+        start_task(self.history_task)
+    
+    def show_history(self, result):
+        """Display the result of a history request."""
+        success, message, data = result
+        self.list_widget.clear()
         
         if not success:
             QMessageBox.critical(self, 'Error', message)
@@ -87,9 +105,9 @@ class HistoryWindow(QDialog):
                 f"Filename: {dataset['filename']}\n"
                 f"Upload Time: {dataset['timestamp']}\n"
                 f"Total Equipment: {summary['total_count']} | "
-                f"Avg Flowrate: {summary['avg_flowrate']:.2f} | "
-                f"Avg Pressure: {summary['avg_pressure']:.2f} | "
-                f"Avg Temperature: {summary['avg_temperature']:.2f}\n"
+                f"Avg Flowrate: {format_average(summary['avg_flowrate'])} | "
+                f"Avg Pressure: {format_average(summary['avg_pressure'])} | "
+                f"Avg Temperature: {format_average(summary['avg_temperature'])}\n"
                 f"Equipment Types: "
             )
             
@@ -100,3 +118,9 @@ class HistoryWindow(QDialog):
             item = QListWidgetItem(info_text)
             item.setFlags(Qt.ItemIsEnabled)
             self.list_widget.addItem(item)
+    
+    def done(self, result):
+        """Drop a history request still running when the dialog closes."""
+        if self.history_task is not None:
+            self.history_task.cancel()
+        super().done(result)
@@ -3,6 +3,7 @@ from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont
 from services.api_client import APIClient
+from services.workers import ApiTask, start_task
 
 
 class LoginWindow(QDialog):
@@ -94,12 +95,23 @@ class LoginWindow(QDialog):
             QMessageBox.warning(self, 'Error', 'Please enter both username and password')
             return
         
+        # A login is already running
+        if not self.login_button.isEnabled():
+            return
+        
         # Disable button during login
         self.login_button.setEnabled(False)
         self.login_button.setText('Logging in...')
         
-        # Attempt login
-        success, message, data = self.api_client.login(username, password)
+        # Log in on a worker thread so the dialog keeps repainting
+        task = ApiTask(self.api_client.login, username, password)
+        task.signals.finished.connect(self.login_finished)
+        task.signals.failed.connect(lambda message: self.login_finished((False, message, None)))
+        start_task(task)
+    
+    def login_finished(self, result):
+        """Accept the dialog or show the error from a background login."""
+        success, message, data = result
         
         # Re-enable button
         self.login_button.setEnabled(True)
@@ -1,13 +1,20 @@
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QPushButton, QLabel, QFileDialog, QMessageBox,
-                             QTableWidget, QTableWidgetItem, QMenuBar, QAction,
-                             QStatusBar)
+                             QTableView, QHeaderView, QMenuBar, QAction,
+                             QStatusBar, QProgressBar)
 from PyQt5.QtCore import Qt
 from services.api_client import APIClient
+from services.workers import ApiTask, start_task
 from widgets.chart_widget import ChartWidget
+from widgets.dataset_table import DatasetTableModel
+from utils.formatting import format_average
 from windows.history_window import HistoryWindow
 
 
+# Points per parameter requested for the line chart
+SERIES_POINTS = 1000
+
+
 class MainWindow(QMainWindow):
     """Main application window."""
     
@@ -15,6 +22,9 @@ class MainWindow(QMainWindow):
         super().__init__()
         self.api_client = api_client
         self.current_dataset = None
+        # The upload or PDF download in progress, if any
+        self.current_task = None
+        self.series_task = None
         self.init_ui()
     
     def init_ui(self):
@@ -72,14 +82,19 @@ class MainWindow(QMainWindow):
         ''')
         main_layout.addWidget(self.summary_label)
         
-        # Table widget
-        self.table_widget = QTableWidget()
-        self.table_widget.setColumnCount(5)
-        self.table_widget.setHorizontalHeaderLabels([
-            'Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature'
-        ])
-        self.table_widget.horizontalHeader().setStretchLastSection(True)
-        main_layout.addWidget(self.table_widget)
+        # Table of rows; the model pages them in as the view scrolls
+        self.table_model = DatasetTableModel(self.api_client, self)
+        self.table_model.fetch_failed.connect(
+            lambda message: self.status_bar.showMessage(f'Could not load rows: {message}')
+        )
+        self.table_view = QTableView()
+        self.table_view.setModel(self.table_model)
+        self.table_view.horizontalHeader().setStretchLastSection(True)
+        # Fixed row heights, so the view never measures every row
+        self.table_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table_view.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.table_view.setSortingEnabled(True)
+        main_layout.addWidget(self.table_view)
         
         # Chart widget
         self.chart_widget = ChartWidget()
@@ -91,6 +106,17 @@ class MainWindow(QMainWindow):
         self.status_bar = QStatusBar()
         self.setStatusBar(self.status_bar)
         self.status_bar.showMessage('Ready')
+        
+        # Transfer progress, shown while a task runs
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setMaximumWidth(200)
+        self.progress_bar.hide()
+        self.status_bar.addPermanentWidget(self.progress_bar)
+        
+        self.cancel_button = QPushButton('Cancel')
+        self.cancel_button.clicked.connect(self.cancel_task)
+        self.cancel_button.hide()
+        self.status_bar.addPermanentWidget(self.cancel_button)
     
     def create_menu_bar(self):
         """Create menu bar."""
@@ -99,9 +125,9 @@ class MainWindow(QMainWindow):
         # File menu
         file_menu = menubar.addMenu('File')
         
-        upload_action = QAction('Upload CSV', self)
-        upload_action.triggered.connect(self.handle_upload)
-        file_menu.addAction(upload_action)
+        self.upload_action = QAction('Upload CSV', self)
+        self.upload_action.triggered.connect(self.handle_upload)
+        file_menu.addAction(self.upload_action)
         
         file_menu.addSeparator()
         
@@ -136,22 +162,71 @@ class MainWindow(QMainWindow):
         if not filepath:
             return
         
-        self.status_bar.showMessage('Uploading...')
-        self.upload_button.setEnabled(False)
-        
-        success, message, data = self.api_client.upload_csv(filepath)
-        
-        self.upload_button.setEnabled(True)
-        
+        # The table pages rows in as it scrolls, so the upload returns none
+        task = ApiTask(self.api_client.upload_csv, filepath, include_data=False)
+        task.signals.finished.connect(self.upload_finished)
+        self.start_transfer(task, 'Uploading...')
+    
+    def upload_finished(self, result):
+        """Show the outcome of a background upload."""
+        success, message, data = result
         if success:
             self.current_dataset = data
             self.display_dataset(data)
             self.status_bar.showMessage('Upload successful')
-            self.pdf_action.setEnabled(True)
         else:
             QMessageBox.critical(self, 'Upload Failed', message)
             self.status_bar.showMessage('Upload failed')
     
+    def start_transfer(self, task, message):
+        """
+        Run an upload or download task in the background, showing its
+        progress and a cancel button until it ends. Only one runs at a time.
+        """
+        self.current_task = task
+        task.signals.progress.connect(self.update_progress)
+        task.signals.failed.connect(self.task_failed)
+        task.signals.cancelled.connect(lambda: self.status_bar.showMessage('Cancelled'))
+        task.signals.done.connect(self.transfer_done)
+        
+        self.set_transfer_controls(busy=True)
+        # Indeterminate until the first progress report
+        self.progress_bar.setRange(0, 0)
+        self.status_bar.showMessage(message)
+        start_task(task)
+    
+    def set_transfer_controls(self, busy):
+        """Show transfer progress and disable actions that start another transfer."""
+        self.upload_button.setEnabled(not busy)
+        self.upload_action.setEnabled(not busy)
+        self.pdf_action.setEnabled(not busy and self.current_dataset is not None)
+        self.progress_bar.setVisible(busy)
+        self.cancel_button.setVisible(busy)
+        self.cancel_button.setEnabled(True)
+    
+    def update_progress(self, done, total):
+        """Show a transfer's progress as a percentage when its total is known."""
+        if total > 0:
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setValue(int(done * 100 / total))
+    
+    def task_failed(self, message):
+        """Report an unexpected error from a background call."""
+        QMessageBox.critical(self, 'Error', message)
+        self.status_bar.showMessage('Request failed')
+    
+    def transfer_done(self):
+        """Restore the controls once a transfer has ended."""
+        self.current_task = None
+        self.set_transfer_controls(busy=False)
+    
+    def cancel_task(self):
+        """Cancel the running transfer."""
+        if self.current_task is not None:
+            self.current_task.cancel()
+            self.cancel_button.setEnabled(False)
+            self.status_bar.showMessage('Cancelling...')
+    
     def display_dataset(self, data):
         """Display dataset in table and charts."""
         # Update info label
@@ -164,25 +239,37 @@ class MainWindow(QMainWindow):
         summary = data['summary']
         summary_text = (
             f"Total Equipment: {summary['total_count']} | "
-            f"Avg Flowrate: {summary['avg_flowrate']:.2f} | "
-            f"Avg Pressure: {summary['avg_pressure']:.2f} | "
-            f"Avg Temperature: {summary['avg_temperature']:.2f}"
+            f"Avg Flowrate: {format_average(summary['avg_flowrate'])} | "
+            f"Avg Pressure: {format_average(summary['avg_pressure'])} | "
+            f"Avg Temperature: {format_average(summary['avg_temperature'])}"
         )
         self.summary_label.setText(summary_text)
         
-        # Populate table
-        equipment_data = data['data']
-        self.table_widget.setRowCount(len(equipment_data))
-        
-        for row, item in enumerate(equipment_data):
-            self.table_widget.setItem(row, 0, QTableWidgetItem(str(item['Equipment Name'])))
-            self.table_widget.setItem(row, 1, QTableWidgetItem(str(item['Type'])))
-            self.table_widget.setItem(row, 2, QTableWidgetItem(str(item['Flowrate'])))
-            self.table_widget.setItem(row, 3, QTableWidgetItem(str(item['Pressure'])))
-            self.table_widget.setItem(row, 4, QTableWidgetItem(str(item['Temperature'])))
+        # Populate table; rows the upload did not return are fetched as
+        # the table scrolls
+        self.table_view.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.table_model.set_dataset(data.get('dataset_id'), data['data'], summary['total_count'])
         
         # Update charts
         self.chart_widget.update_charts(summary)
+        
+        # Line chart from a server-side downsample, so large datasets plot
+        # at screen resolution
+        if 'dataset_id' in data:
+            # A newer dataset replaces a series still loading for an older one
+            if self.series_task is not None:
+                self.series_task.cancel()
+            self.series_task = ApiTask(
+                self.api_client.get_series, data['dataset_id'], points=SERIES_POINTS
+            )
+            self.series_task.signals.finished.connect(self.series_loaded)
+            start_task(self.series_task)
+    
+    def series_loaded(self, result):
+        """Draw the line chart from a background series request."""
+        success, _, series = result
+        if success:
+            self.chart_widget.update_series_chart(series)
     
     def show_history(self):
         """Show history window."""
@@ -205,16 +292,28 @@ class MainWindow(QMainWindow):
         if not filepath:
             return
         
-        self.status_bar.showMessage('Generating PDF...')
-        
-        success, message = self.api_client.get_pdf(
+        task = ApiTask(
+            self.api_client.get_pdf,
             self.current_dataset['dataset_id'],
             filepath
         )
-        
+        task.signals.finished.connect(self.pdf_finished)
+        self.start_transfer(task, 'Generating PDF...')
+    
+    def pdf_finished(self, result):
+        """Show the outcome of a background PDF download."""
+        success, message = result
         if success:
             QMessageBox.information(self, 'Success', 'PDF report downloaded successfully')
             self.status_bar.showMessage('PDF downloaded')
         else:
             QMessageBox.critical(self, 'Error', message)
             self.status_bar.showMessage('PDF download failed')
+    
+    def closeEvent(self, event):
+        """Cancel background calls when the window closes."""
+        for task in (self.current_task, self.series_task):
+            if task is not None:
+                task.cancel()
+        self.table_model.cancel()
+        super().closeEvent(event)
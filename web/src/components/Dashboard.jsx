@@ -3,11 +3,14 @@ import { useNavigate } from 'react-router-dom';
 import DataTable from './DataTable';
 import PieChart from './PieChart';
 import BarChart from './BarChart';
+import SeriesChart from './SeriesChart';
 import { datasetAPI } from '../services/api';
+import { formatAverage } from '../utils/format';
 import '../styles/Dashboard.css';
 
 const Dashboard = () => {
   const [dataset, setDataset] = useState(null);
+  const [series, setSeries] = useState(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
   const navigate = useNavigate();
@@ -23,6 +26,15 @@ const Dashboard = () => {
     }
   }, [navigate]);
 
+  useEffect(() => {
+    if (!dataset) return;
+
+    // Downsampled on the server so large datasets plot at screen resolution
+    datasetAPI.getSeries(dataset.dataset_id, { points: 1000 })
+      .then((response) => setSeries(response.data))
+      .catch(() => setSeries(null));
+  }, [dataset]);
+
   const handleDownloadPDF = async () => {
     if (!dataset) return;
 
@@ -74,15 +86,15 @@ const Dashboard = () => {
         </div>
         <div className="summary-card">
           <h3>Avg Flowrate</h3>
-          <p className="summary-value">{summary.avg_flowrate.toFixed(2)}</p>
+          <p className="summary-value">{formatAverage(summary.avg_flowrate)}</p>
         </div>
         <div className="summary-card">
           <h3>Avg Pressure</h3>
-          <p className="summary-value">{summary.avg_pressure.toFixed(2)}</p>
+          <p className="summary-value">{formatAverage(summary.avg_pressure)}</p>
         </div>
         <div className="summary-card">
           <h3>Avg Temperature</h3>
-          <p className="summary-value">{summary.avg_temperature.toFixed(2)}</p>
+          <p className="summary-value">{formatAverage(summary.avg_temperature)}</p>
         </div>
       </div>
 
@@ -95,6 +107,11 @@ const Dashboard = () => {
         <div className="chart-box">
           <BarChart summary={summary} />
         </div>
+        {series && (
+          <div className="chart-box">
+            <SeriesChart series={series} />
+          </div>
+        )}
       </div>
     </div>
   );
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { datasetAPI } from '../services/api';
+import { formatAverage } from '../utils/format';
 import '../styles/HistoryPage.css';
 
 const HistoryPage = () => {
@@ -74,15 +75,15 @@ const HistoryPage = () => {
                 </div>
                 <div className="summary-item">
                   <span className="label">Avg Flowrate:</span>
-                  <span className="value">{dataset.summary.avg_flowrate.toFixed(2)}</span>
+                  <span className="value">{formatAverage(dataset.summary.avg_flowrate)}</span>
                 </div>
                 <div className="summary-item">
                   <span className="label">Avg Pressure:</span>
-                  <span className="value">{dataset.summary.avg_pressure.toFixed(2)}</span>
+                  <span className="value">{formatAverage(dataset.summary.avg_pressure)}</span>
                 </div>
                 <div className="summary-item">
                   <span className="label">Avg Temperature:</span>
-                  <span className="value">{dataset.summary.avg_temperature.toFixed(2)}</span>
+                  <span className="value">{formatAverage(dataset.summary.avg_temperature)}</span>
                 </div>
               </div>
               <div className="history-types">
@@ -0,0 +1,74 @@
+import React from 'react';
+import { Line } from 'react-chartjs-2';
+import {
+  Chart as ChartJS,
+  LinearScale,
+  PointElement,
+  LineElement,
+  Title,
+  Tooltip,
+  Legend
+} from 'chart.js';
+
+ChartJS.register(
+  LinearScale,
+  PointElement,
+  LineElement,
+  Title,
+  Tooltip,
+  Legend
+);
+
+const COLORS = {
+  Flowrate: 'rgba(54, 162, 235, 1)',
+  Pressure: 'rgba(255, 99, 132, 1)',
+  Temperature: 'rgba(255, 206, 86, 1)',
+};
+
+// Plots a response from datasetAPI.getSeries: each parameter already
+// downsampled on the server to a few hundred or thousand points
+const SeriesChart = ({ series }) => {
+  const chartData = {
+    datasets: Object.entries(series.columns).map(([name, points]) => ({
+      label: name,
+      data: points.x.map((x, i) => ({ x, y: points.y[i] })),
+      borderColor: COLORS[name],
+      backgroundColor: COLORS[name],
+      borderWidth: 1,
+      pointRadius: 0,
+    })),
+  };
+
+  const options = {
+    responsive: true,
+    maintainAspectRatio: false,
+    animation: false,
+    parsing: false,
+    plugins: {
+      title: {
+        display: true,
+        text: `Parameters by Row (${series.total_points} rows)`,
+        font: {
+          size: 16,
+        },
+      },
+    },
+    scales: {
+      x: {
+        type: 'linear',
+        title: {
+          display: true,
+          text: 'Row',
+        },
+      },
+    },
+  };
+
+  return (
+    <div style={{ height: '400px' }}>
+      <Line data={chartData} options={options} />
+    </div>
+  );
+};
+
+export default SeriesChart;
@@ -17,8 +17,8 @@ const UploadPage = () => {
         setFile(null);
         return;
       }
-      if (selectedFile.size > 10 * 1024 * 1024) {
-        setError('File size must be less than 10MB');
+      if (selectedFile.size > 100 * 1024 * 1024) {
+        setError('File size must be less than 100MB');
         setFile(null);
         return;
       }
@@ -42,9 +42,16 @@ export const authAPI = {
 };
 
 export const datasetAPI = {
-  upload: (file) => {
+  // options: { includeData: false } to skip rows, { background: true } to queue
+  upload: (file, options = {}) => {
     const formData = new FormData();
     formData.append('file', file);
+    if (options.includeData === false) {
+      formData.append('include_data', 'false');
+    }
+    if (options.background) {
+      formData.append('async', 'true');
+    }
     return api.post('/upload/', formData, {
       headers: {
         'Content-Type': 'multipart/form-data',
@@ -52,14 +59,58 @@ export const datasetAPI = {
     });
   },
   
+  // files: CSV files and/or zip archives of CSV files
+  uploadBatch: (files) => {
+    const formData = new FormData();
+    for (const file of files) {
+      formData.append('files', file);
+    }
+    return api.post('/upload/batch/', formData, {
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+    });
+  },
+  
   getHistory: () => api.get('/history/'),
   
   getSummary: (datasetId) => api.get(`/summary/${datasetId}/`),
   
-  downloadPDF: (datasetId) => 
-    api.get(`/report/pdf/${datasetId}/`, {
-      responseType: 'blob',
-    }),
+  getJob: (jobId) => api.get(`/jobs/${jobId}/`),
+  
+  // ids: dataset ids to compare (default: the last 5 uploads)
+  compare: (ids = []) =>
+    api.get('/datasets/compare/', { params: ids.length ? { ids: ids.join(',') } : {} }),
+  
+  // params: offset, limit, columns, ordering, type, <column>_min/_max
+  getRows: (datasetId, params = {}) =>
+    api.get(`/datasets/${datasetId}/rows/`, { params }),
+  
+  // params: points, method ('lttb' or 'minmax'), columns
+  getSeries: (datasetId, params = {}) =>
+    api.get(`/datasets/${datasetId}/series/`, { params }),
+  
+  // params: columns, type (comma-separated), kind ('fixed' or 'quantile')
+  getHistograms: (datasetId, params = {}) =>
+    api.get(`/datasets/${datasetId}/histograms/`, { params }),
+  
+  // query: { group_by, metrics, columns, filters }
+  aggregate: (datasetId, query = {}) =>
+    api.post(`/datasets/${datasetId}/aggregate/`, query),
+  
+  // full: include every row, grouped by equipment type. A report that is
+  // still being rendered is answered with 202; ask again after Retry-After
+  downloadPDF: async (datasetId, { full = false } = {}) => {
+    for (;;) {
+      const response = await api.get(`/report/pdf/${datasetId}/`, {
+        params: full ? { full: 'true' } : {},
+        responseType: 'blob',
+      });
+      if (response.status !== 202) return response;
+      const seconds = Number(response.headers['retry-after']) || 1;
+      await new Promise((resolve) => setTimeout(resolve, seconds * 1000));
+    }
+  },
 };
 
 export default api;
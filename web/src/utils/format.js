@@ -0,0 +1,2 @@
+// Format a summary average; a column with no values has none
+export const formatAverage = (value) => (value == null ? 'n/a' : value.toFixed(2));